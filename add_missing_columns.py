@@ -2,38 +2,32 @@ from app import app, db
 from sqlalchemy import text
 import sys
 
+# Columns this script adds to 'users' if they are missing
+MISSING_COLUMNS = [
+    ('bio', 'TEXT'),
+    ('school', 'VARCHAR(255)'),
+]
+
 with app.app_context():
     print("Adding missing columns to 'users' table...")
-    
+
     with db.engine.connect() as conn:
         trans = conn.begin()
         try:
-            # Add 'bio' column
-            try:
-                conn.execute(text("ALTER TABLE users ADD COLUMN bio TEXT"))
-                print("- Added 'bio' column.")
-            except Exception as e:
-                # Check for various forms of "column already exists" errors across DB drivers
-                err_str = str(e).lower()
-                if "duplicate column" in err_str or "already exists" in err_str:
-                    print("- 'bio' column already exists.")
-                else:
-                    print(f"- Error adding 'bio': {e}")
+            # Read the existing column names once up front instead of
+            # attempting each ALTER and parsing the "already exists" error
+            existing = {row[1] for row in conn.execute(text("PRAGMA table_info(users)"))}
+
+            for column, column_type in MISSING_COLUMNS:
+                if column in existing:
+                    print(f"- '{column}' column already exists.")
+                    continue
+                conn.execute(text(f"ALTER TABLE users ADD COLUMN {column} {column_type}"))
+                print(f"- Added '{column}' column.")
 
-            # Add 'school' column
-            try:
-                conn.execute(text("ALTER TABLE users ADD COLUMN school VARCHAR(255)"))
-                print("- Added 'school' column.")
-            except Exception as e:
-                err_str = str(e).lower()
-                if "duplicate column" in err_str or "already exists" in err_str:
-                    print("- 'school' column already exists.")
-                else:
-                    print(f"- Error adding 'school': {e}")
-            
             trans.commit()
             print("Database update complete.")
-            
+
         except Exception as e:
             trans.rollback()
             print(f"Transaction failed: {e}")
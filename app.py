@@ -12,14 +12,25 @@ Description: This is the entry point for the Flask application. It:
              - Provides the main route (index/landing page)
 """
 
-from flask import Flask, render_template, session, redirect, url_for, request
+from flask import Flask, render_template, session, redirect, url_for, request, g, has_app_context
 from flask_socketio import SocketIO, emit, join_room, leave_room
-from config import get_config
-from models import db
-from utils import filter_text
-from datetime import timedelta
-from sqlalchemy import text
+from flask_sqlalchemy.record_queries import get_recorded_queries
+from config import Config, get_config, orjson
+from models import (
+    db, User, Story, StoryReaction, StoryComment, Message, Pair, ChatReport, Community, CommunityPost,
+    CommunityMember, EventParticipant, Notification, Streak, GameSession, GameHistory,
+    SELECT_UNREAD_NOTIFICATIONS
+)
+from utils import (
+    filter_text, build_unkind_automaton, build_unkind_glob_matcher, contains_unkind_words, cache,
+    invalidate_conversation_cache, SG_OFFSET, CHAT_TIME_FORMAT, OrjsonProvider, get_user
+)
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session as OrmSession, load_only, object_session
+from pathlib import Path
 import os
+import sqlite3
 
 # Initialize Flask application
 app = Flask(__name__)
@@ -28,22 +39,67 @@ app = Flask(__name__)
 config_name = os.environ.get('FLASK_ENV', 'development')
 app.config.from_object(get_config(config_name))
 
+# Dict returns and jsonify are serialised with orjson instead of the stdlib
+# (Flask's default provider stays in place if orjson isn't installed)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
+
 # Initialize SocketIO
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet')
 
 # Initialize database with app
 db.init_app(app)
 
+
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Tunes every new SQLite connection from the pool:
+    - WAL lets readers (chat polls, page loads) run while a write commits,
+      and synchronous=NORMAL is safe in WAL with far fewer fsyncs
+    - temp tables/sorts stay in memory, the file is memory-mapped (256MB)
+      and the page cache is ~20MB instead of the 2MB default
+    - foreign keys are enforced once startup has confirmed the schema carries
+      the ON DELETE actions (see DATABASE INITIALIZATION), so CASCADE / SET
+      NULL clean up child rows in the same statement as the parent delete
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.execute("PRAGMA cache_size=-20000")
+    if foreign_keys_enforced:
+        cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+# Switched on by the startup block below. The models' passive_deletes leave
+# child rows to the database's ON DELETE actions, which only exist (and only
+# run with enforcement on) once the child tables have been rebuilt with them
+foreign_keys_enforced = False
+
+# Initialize cache with app
+cache.init_app(app)
+
+# Ensure upload folder exists once at startup (upload handlers assume it does)
+Path(app.config['UPLOAD_FOLDER']).mkdir(parents=True, exist_ok=True)
+
+# Unkind-word matchers, built once so message checks are a single scan
+# (glob patterns, if any are configured, get their own compiled regex)
+app.extensions['unkind_ac'] = build_unkind_automaton(app.config.get('UNKIND_WORDS', []))
+app.extensions['unkind_globs'] = build_unkind_glob_matcher(app.config.get('UNKIND_WORDS', []))
+
 # ==================== ELO CALCULATION ====================
 def calculate_elo(winner_id, p1_id, p2_id, is_draw=False):
     """
     Calculate new ELO ratings for players.
     K-factor is fixed at 32 for simplicity.
     """
-    from models import User, GameHistory, db
     
-    p1 = User.query.get(p1_id)
-    p2 = User.query.get(p2_id)
+    p1 = get_user(p1_id)
+    p2 = get_user(p2_id)
     
     if not p1 or not p2:
         return
@@ -69,18 +125,18 @@ def calculate_elo(winner_id, p1_id, p2_id, is_draw=False):
     p1.elo = round(p1.elo + k * (actual_p1 - expected_p1))
     p2.elo = round(p2.elo + k * (actual_p2 - expected_p2))
     
-    db.session.commit()
+    # No commit here: handle_game_over commits the ratings together with the
+    # session result, history row and streaks in one transaction
     return p1_old_elo, p1.elo, p2_old_elo, p2.elo
 
 def handle_game_over(session_id, winner_id=None, winner_color=None, is_draw=False):
-    from models import GameSession, GameHistory, Streak, db, User
     
     gs = GameSession.query.get(session_id)
     if not gs or gs.status == 'completed':
         return None
         
     if not winner_id and winner_color:
-        if winner_color in ['w', 'red', 'X']:
+        if winner_color in {'w', 'red', 'X'}: # Player 1's colour in chess/xiangqi/tic-tac-toe
             winner_id = gs.player1_id
         else:
             winner_id = gs.player2_id
@@ -152,7 +208,6 @@ def on_game_over(data):
 
 @socketio.on('join')
 def on_join(data):
-    from models import GameSession
     game_id = data.get('game_id')
     if game_id is not None:
         try:
@@ -188,7 +243,6 @@ def on_challenge(data):
 
 @socketio.on('ready')
 def on_ready(data):
-    from models import GameSession, db
     session_id = data.get('session_id')
     user_id = session.get('user_id')
     
@@ -210,19 +264,20 @@ def on_ready(data):
     elif gs.player2_id == user_id:
         gs.player2_ready = True
     
+    # Ready flag and (if both are ready) the status change share one commit
+    both_ready = gs.player1_ready and gs.player2_ready
+    if both_ready:
+        gs.status = 'active'
     db.session.commit()
     
     room = f"game_{session_id}"
-    if gs.player1_ready and gs.player2_ready:
-        gs.status = 'active'
-        db.session.commit()
+    if both_ready:
         socketio.emit('game_start', {'session_id': session_id}, room=room)
     else:
         socketio.emit('player_ready', {'user_id': user_id}, room=room)
 
 @socketio.on('forfeit')
 def on_forfeit(data):
-    from models import GameSession, User, db
     session_id = data.get('session_id')
     if session_id is not None:
         try:
@@ -263,7 +318,6 @@ def on_forfeit(data):
 
 @socketio.on('move')
 def on_move(data):
-    from models import GameSession, db
     game_id = data.get('game_id')
     room = f"game_{game_id}"
     
@@ -282,7 +336,6 @@ def on_move(data):
 
 @socketio.on('game_chat')
 def on_game_chat(data):
-    from models import Message, User, db
     
     sender_id = session.get('user_id')
     recipient_id = data.get('recipient_id')
@@ -291,27 +344,17 @@ def on_game_chat(data):
     
     if not sender_id or not recipient_id or not content:
         return
+    # The recipient comes from the client; an unknown id would fail the
+    # messages foreign key
+    if get_user(recipient_id) is None:
+        return
 
     # Filter content
     content = filter_text(content)
 
-    # Check for unkind words (flagging logic remains useful for admins even if filtered)
-    is_flagged = False
-    unkind_words = app.config.get('UNKIND_WORDS', [])
-    for word in unkind_words:
-        if word.lower() in content.lower(): # Note: filtered content might not trigger this if replaced
-             pass # Logic needs adjustment if we filter first. 
-             # If we filter first, the words are gone. 
-             # So we should check flag BEFORE filter, or just rely on filter.
-             # Let's flag based on original content if needed, but user asked to FILTER.
-             # If filtered, maybe we don't need to flag as urgently, or flag the ATTEMPT.
-             
-    # Better approach: Check flag on ORIGINAL content, then save FILTERED content.
-    original_content = data.get('content')
-    for word in unkind_words:
-        if word.lower() in original_content.lower():
-            is_flagged = True
-            break
+    # Check flag on ORIGINAL content (the filtered text no longer contains
+    # the words), then save FILTERED content
+    is_flagged = contains_unkind_words(data.get('content'))
             
     # Save message to database
     new_msg = Message(
@@ -322,6 +365,7 @@ def on_game_chat(data):
     )
     db.session.add(new_msg)
     db.session.commit()
+    invalidate_conversation_cache(sender_id, recipient_id)
 
     # Broadcast to the game room
     room = f"game_{game_id}"
@@ -330,7 +374,7 @@ def on_game_chat(data):
         'sender_id': sender_id,
         'content': content,
         'is_flagged': is_flagged,
-        'created_at': (new_msg.created_at + timedelta(hours=8)).strftime('%I:%M %p'),
+        'created_at': (new_msg.created_at + SG_OFFSET).strftime(CHAT_TIME_FORMAT),
         'is_me': False # Frontend will check this
     }, room=room)
 
@@ -346,20 +390,18 @@ def on_leave_community(data):
 
 @socketio.on('community_message')
 def on_community_message(data):
-    from models import CommunityPost, User, db
     from datetime import datetime
     
     user_id = session.get('user_id')
     if not user_id: return
+    # The community comes from the client; ignore posts to one that doesn't exist
+    community_id = data.get('community_id')
+    if not community_id or not db.session.get(Community, community_id, options=[load_only(Community.id)]):
+        return
 
     # Check for unkind words (Flagging)
     original_content = data.get('content', '')
-    is_flagged = False
-    unkind_words = app.config.get('UNKIND_WORDS', [])
-    for word in unkind_words:
-        if word.lower() in original_content.lower():
-            is_flagged = True
-            break
+    is_flagged = contains_unkind_words(original_content)
             
     # Notify sender if flagged
     if is_flagged:
@@ -381,7 +423,7 @@ def on_community_message(data):
     db.session.add(new_post)
     db.session.commit()
     
-    user = User.query.get(user_id)
+    user = get_user(user_id)
     
     avatar = user.profile_picture
     if avatar and not avatar.startswith('images/'):
@@ -396,7 +438,7 @@ def on_community_message(data):
         'avatar': avatar,
         'content': new_post.content,
         'photo_url': new_post.photo_url,
-        'created_at': (new_post.created_at + timedelta(hours=8)).strftime('%I:%M %p'),
+        'created_at': (new_post.created_at + SG_OFFSET).strftime(CHAT_TIME_FORMAT),
         'is_me': False,
         'is_flagged': is_flagged
     }, room=room)
@@ -413,35 +455,82 @@ def on_disconnect():
 
 
 # ==================== NOTIFICATION EVENT LISTENER ====================
-from sqlalchemy import event
-from models import Notification
 
 def push_notification(mapper, connection, target):
     """
-    SQLAlchemy event listener to push notifications via Socket.IO
-    whenever a new Notification record is inserted.
+    SQLAlchemy event listener that queues a Socket.IO push whenever a new
+    Notification record is inserted.
+
+    after_insert fires during the flush, inside the still-open transaction,
+    so the payload is only stashed on the session here and sent once the
+    transaction has committed (see send_pending_notifications). A rolled
+    back notification is never pushed.
     """
     try:
-        # target is the Notification instance
-        room = f"user_{target.user_id}"
-        
-        # Prepare data matching the API response format
-        notif_data = {
-            'id': target.id,
-            'title': target.title,
-            'message': target.message,
-            'type': target.type,
-            'link': target.link,
-            'timeAgo': 'Just now',
-            'created_at': target.created_at.isoformat()
-        }
-        
-        socketio.emit('new_notification', notif_data, room=room)
+        stash_notification_push(object_session(target), target)
     except Exception as e:
-        print(f"ERROR: Failed to push notification: {e}")
+        print(f"ERROR: Failed to queue notification: {e}")
+
+
+def stash_notification_push(db_session, notif):
+    """
+    Stashes the Socket.IO payload for a newly inserted notification (an ORM
+    object or a row returned by Notification.bulk_create) on the session,
+    to be pushed once the transaction commits.
+    """
+    # Prepare data matching the API response format
+    notif_data = {
+        'id': notif.id,
+        'title': notif.title,
+        'message': notif.message,
+        'type': notif.type,
+        'link': notif.link,
+        'timeAgo': 'Just now',
+        'created_at': notif.created_at.isoformat()
+    }
+    pending = db_session.info.setdefault('pending_notifications', [])
+    pending.append((f"user_{notif.user_id}", notif_data))
+
+
+def emit_in_background(event_name, data, room):
+    """
+    Hands a Socket.IO emit to a background task so the request (and any
+    database work after it) doesn't wait on delivery.
+    """
+    socketio.start_background_task(socketio.emit, event_name, data, room=room)
+
+
+def send_pending_notifications(db_session):
+    """Pushes the notifications queued during a transaction after it commits."""
+    for room, notif_data in db_session.info.pop('pending_notifications', ()):
+        emit_in_background('new_notification', notif_data, room)
 
-# Register the event listener
+
+def drop_pending_notifications(db_session):
+    """Discards queued pushes for a rolled back transaction."""
+    db_session.info.pop('pending_notifications', None)
+
+
+def add_queued_notifications(db_session):
+    """
+    Writes the request's queued notifications (utils.queue_notification) as
+    the session commits, in the same transaction as the route's own changes.
+    They go in as one multi-row INSERT via Notification.bulk_create, and each
+    returned row is stashed for the after-commit push.
+    """
+    if not has_app_context():
+        return
+    queued = g.pop('queued_notifications', None)
+    if queued:
+        for row in Notification.bulk_create(queued, session=db_session):
+            stash_notification_push(db_session, row)
+
+
+# Register the event listeners
 event.listen(Notification, 'after_insert', push_notification)
+event.listen(OrmSession, 'before_commit', add_queued_notifications)
+event.listen(OrmSession, 'after_commit', send_pending_notifications)
+event.listen(OrmSession, 'after_rollback', drop_pending_notifications)
 
 
 # ==================== BLUEPRINT REGISTRATION ====================
@@ -467,6 +556,84 @@ app.register_blueprint(youth_bp, url_prefix='/youth')
 app.register_blueprint(admin_bp, url_prefix='/admin')
 
 
+# Fills games.kind for rows created before the column existed
+GAME_KIND_BACKFILL = (
+    "UPDATE games SET kind = CASE "
+    "WHEN title LIKE '%Xiangqi%' THEN 'xiangqi' "
+    "WHEN title LIKE '%Tic%Tac%Toe%' THEN 'tictactoe' "
+    "ELSE 'chess' END "
+    "WHERE kind IS NULL"
+)
+
+# Packs the old languages_json arrays into users.languages_mask, then clears
+# the JSON so the backfill only ever runs once per row
+LANGUAGES_BACKFILL = (
+    "UPDATE users SET languages_mask = "
+    + " | ".join(
+        f"(CASE WHEN EXISTS (SELECT 1 FROM json_each(languages_json) WHERE value = '{name}') "
+        f"THEN {bit} ELSE 0 END)"
+        for name, bit in User.LANGUAGE_BITS.items()
+    )
+    + ", languages_json = NULL "
+    "WHERE languages_json IS NOT NULL AND json_valid(languages_json)"
+)
+
+# Fills stories.reaction_counts from the story_reactions rows for stories
+# that predate the column (NULL); afterwards the counters are kept up to date
+# by the react endpoint. Matches reaction_type both as the old string and as
+# its EnumCode, so it works before and after ENUM_CODE_BACKFILLS
+REACTION_COUNTS_BACKFILL = (
+    "UPDATE stories SET reaction_counts = ("
+    "SELECT COALESCE(SUM(CASE "
+    + " ".join(f"WHEN reaction_type IN ('{reaction_type}', {code}) "
+               f"THEN {Story.reaction_delta(reaction_type)}"
+               for code, reaction_type in enumerate(Story.REACTION_TYPES))
+    + " ELSE 0 END), 0) FROM story_reactions WHERE story_reactions.story_id = stories.id) "
+    "WHERE reaction_counts IS NULL"
+)
+
+# Copies translations from the old messages.translated_content column into
+# message_translations (as the default language, the only one it held).
+# Fails harmlessly once fix_database has dropped the column
+TRANSLATIONS_BACKFILL = (
+    "INSERT OR IGNORE INTO message_translations (message_id, lang, content) "
+    f"SELECT id, '{Config.DEFAULT_LANGUAGE}', translated_content FROM messages "
+    "WHERE translated_content IS NOT NULL"
+)
+
+# Rewrites the strings in columns that became EnumCode columns as their
+# integer codes. Only rows still holding a known string are touched, so the
+# statements are safe to re-run
+ENUM_CODE_BACKFILLS = [
+    f"UPDATE {column.table.name} SET {column.name} = CASE {column.name} "
+    + " ".join(f"WHEN '{value}' THEN {code}" for code, value in enumerate(column.type.values))
+    + f" END WHERE {column.name} IN ("
+    + ", ".join(f"'{value}'" for value in column.type.values) + ")"
+    for column in (StoryReaction.__table__.c.reaction_type,
+                   Pair.__table__.c.status,
+                   ChatReport.__table__.c.status)
+]
+
+
+# Child tables whose foreign keys carry ON DELETE actions. Databases created
+# before those were declared get the tables rebuilt by fix_database.py
+# (SQLite can't alter a foreign key in place)
+DELETE_ACTION_MODELS = (StoryReaction, StoryComment, EventParticipant, CommunityMember,
+                        CommunityPost, ChatReport)
+
+
+def missing_delete_actions(conn, models=DELETE_ACTION_MODELS):
+    """Returns the models whose table lacks an ON DELETE action the model declares."""
+    stale = []
+    for model in models:
+        table = model.__table__
+        actual = {(row[3], row[6]) for row in conn.execute(text(f"PRAGMA foreign_key_list({table.name})"))}
+        declared = {(fk.parent.name, fk.ondelete.upper()) for fk in table.foreign_keys if fk.ondelete}
+        if not declared <= actual:
+            stale.append(model)
+    return stale
+
+
 def patch_db(sql_command, success_msg=""):
     """Helper to run database patches safely."""
     try:
@@ -508,6 +675,34 @@ with app.app_context():
     
     patch_db("ALTER TABLE game_sessions ADD COLUMN winner_id INTEGER REFERENCES users(id)", "Added winner_id to game_sessions")
     patch_db("ALTER TABLE game_sessions ADD COLUMN game_state TEXT", "Added game_state to game_sessions")
+    patch_db("ALTER TABLE games ADD COLUMN kind VARCHAR(16)", "Added kind to games")
+    patch_db(GAME_KIND_BACKFILL)
+    patch_db("ALTER TABLE users ADD COLUMN languages_mask INTEGER NOT NULL DEFAULT 0", "Added languages_mask to users")
+    patch_db(LANGUAGES_BACKFILL)
+    patch_db("ALTER TABLE stories ADD COLUMN reaction_counts BIGINT", "Added reaction_counts to stories")
+    patch_db(REACTION_COUNTS_BACKFILL)
+    for backfill in ENUM_CODE_BACKFILLS:
+        patch_db(backfill)
+    patch_db(TRANSLATIONS_BACKFILL)
+
+    # Indexes (create_all only adds these to brand new tables)
+    patch_db("CREATE INDEX IF NOT EXISTS ix_msg_conv ON messages (sender_id, recipient_id, created_at)")
+    patch_db("CREATE INDEX IF NOT EXISTS ix_story_cat_created ON stories (category, created_at DESC)")
+    patch_db("CREATE INDEX IF NOT EXISTS ix_pair_youth_status ON pairs (youth_id, status)")
+    patch_db("CREATE INDEX IF NOT EXISTS ix_pair_senior_status ON pairs (senior_id, status)")
+    patch_db("CREATE INDEX IF NOT EXISTS ix_cpost_comm_time ON community_posts (community_id, created_at)")
+    patch_db("CREATE INDEX IF NOT EXISTS ix_chat_reports_status ON chat_reports (status)")
+    patch_db("CREATE INDEX IF NOT EXISTS ix_games_kind ON games (kind)")
+    patch_db("CREATE INDEX IF NOT EXISTS ix_gs_p1_status_created ON game_sessions (player1_id, status, created_at DESC)")
+    patch_db("CREATE INDEX IF NOT EXISTS ix_gs_p2_status_created ON game_sessions (player2_id, status, created_at DESC)")
+    patch_db("CREATE INDEX IF NOT EXISTS ix_gs_open ON game_sessions (player1_id, player2_id, created_at DESC) "
+             "WHERE status IN ('active', 'waiting')")
+    patch_db("CREATE INDEX IF NOT EXISTS ix_stories_user_created ON stories (user_id, created_at DESC)")
+    patch_db("CREATE INDEX IF NOT EXISTS ix_story_reactions_story_type ON story_reactions (story_id, reaction_type)")
+    patch_db("CREATE INDEX IF NOT EXISTS ix_chat_reports_status_created ON chat_reports (status, created_at DESC)")
+    patch_db("DROP INDEX IF EXISTS ix_notifications_user_isread_created")
+    patch_db("CREATE INDEX IF NOT EXISTS ix_notifications_unread "
+             "ON notifications (user_id, created_at DESC) WHERE is_read = 0")
 
     try:
         with db.engine.connect() as conn:
@@ -516,6 +711,21 @@ with app.app_context():
         print("Creating game_history table...")
         db.create_all()
 
+    # Foreign keys are only enforced once the child tables carry their ON
+    # DELETE actions - added to older databases by fix_database.py, never
+    # here (a table rebuild is no import side effect). This is a read-only
+    # PRAGMA check
+    with db.engine.connect() as conn:
+        stale = missing_delete_actions(conn)
+    if stale:
+        app.logger.warning(
+            "Foreign keys not enforced: %s lack their ON DELETE actions; run python fix_database.py",
+            ", ".join(model.__tablename__ for model in stale))
+    else:
+        foreign_keys_enforced = True
+        # Pooled connections were opened without the pragma
+        db.engine.dispose()
+
     print("Database tables created successfully")
 
 
@@ -533,7 +743,6 @@ def inject_user():
     """
     user_streak = 0
     if 'user_id' in session:
-        from models import Streak
         streak = Streak.query.filter_by(user_id=session['user_id']).first()
         if streak:
             user_streak = streak.current_streak
@@ -580,6 +789,29 @@ def add_security_headers(response):
     return response
 
 
+@app.after_request
+def commit_queued_notifications(response):
+    """Writes notifications queued after the route's last commit, if any."""
+    if g.get('queued_notifications'):
+        db.session.commit()
+    return response
+
+
+@app.after_request
+def warn_on_query_count(response):
+    """
+    Log requests that ran an unusually high number of SQL queries.
+
+    Only active when SQLALCHEMY_RECORD_QUERIES is on (development). A high
+    count is usually a lazy load inside a loop (N+1).
+    """
+    if app.config.get('SQLALCHEMY_RECORD_QUERIES'):
+        query_count = len(get_recorded_queries())
+        if query_count > app.config.get('QUERY_COUNT_WARNING', 20):
+            app.logger.warning(f"{request.method} {request.path} ran {query_count} queries")
+    return response
+
+
 # ==================== ERROR HANDLERS ====================
 @app.errorhandler(404)
 def not_found_error(error):
@@ -658,7 +890,7 @@ def timeago_filter(date):
         days = int(seconds / 86400)
         return f'{days} day{"s" if days != 1 else ""} ago'
     else:
-        return (date + timedelta(hours=8)).strftime('%B %d, %Y')
+        return (date + SG_OFFSET).strftime('%B %d, %Y')
 
 
 @app.template_filter('format_date')
@@ -674,7 +906,7 @@ def format_date_filter(date, format='%B %d, %Y'):
         str: Formatted date string
     """
     if date:
-        return (date + timedelta(hours=8)).strftime(format)
+        return (date + SG_OFFSET).strftime(format)
     return ''
 
 
@@ -706,10 +938,10 @@ def date_filter(value, format='%B %d, %Y'):
 
     # If value is the string "now", use current datetime
     if value == "now":
-        value = datetime.utcnow() + timedelta(hours=8)
+        value = datetime.utcnow() + SG_OFFSET
     elif value:
         # Assume it's a UTC datetime object from DB
-        value = value + timedelta(hours=8)
+        value = value + SG_OFFSET
 
     # Format the datetime object
     if value:
@@ -738,21 +970,15 @@ def get_notifications():
     if 'user_id' not in session:
         return {'count': 0, 'notifications': []}
     
-    from models import Notification
     user_id = session['user_id']
     
     # Get unread notifications
-    notifs = Notification.query.filter_by(user_id=user_id, is_read=False)\
-        .order_by(Notification.created_at.desc()).all()
+    notifs = db.session.scalars(SELECT_UNREAD_NOTIFICATIONS, {'user_id': user_id}).all()
     
     return {
         'count': len(notifs),
         'notifications': [{
-            'id': n.id,
-            'title': n.title,
-            'message': n.message,
-            'type': n.type,
-            'link': n.link,
+            **n.as_dict(),
             'timeAgo': timeago_filter(n.created_at)
         } for n in notifs]
     }
@@ -762,7 +988,6 @@ def dismiss_notification(notification_id):
     if 'user_id' not in session:
         return {'success': False}, 403
     
-    from models import Notification, db
     notif = Notification.query.get_or_404(notification_id)
     
     if notif.user_id != session['user_id']:
@@ -777,11 +1002,11 @@ def mark_all_notifications_read():
     if 'user_id' not in session:
         return {'success': False}, 403
     
-    from models import Notification, db
     user_id = session['user_id']
     
     # Update all unread notifications for this user
-    Notification.query.filter_by(user_id=user_id, is_read=False).update({'is_read': True})
+    Notification.query.filter(Notification.user_id == user_id, Notification.is_unread())\
+        .update({'is_read': True})
     db.session.commit()
     
     return {'success': True}
@@ -802,7 +1027,6 @@ def get_streak():
     if 'user_id' not in session:
         return {'currentStreak': 0}
     
-    from models import Streak
     user_id = session['user_id']
     
     streak = Streak.query.filter_by(user_id=user_id).first()
@@ -829,9 +1053,6 @@ if __name__ == '__main__':
 
     Command line: python app.py
     """
-    # Ensure upload folder exists
-    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-
     print("="* 60)
     print("Starting GenCon SG Application")
     print("="* 60)
@@ -9,12 +9,18 @@ Description: Handles all administrative functions including user moderation,
              pair monitoring, event creation, and chat report management
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app, abort
 from models import db, User, Pair, Event, Community, ChatReport, Story, Message, CommunityPost, CommunityMember, RegistrationCode, EventParticipant
 from datetime import datetime, timedelta
+from sqlalchemy import false, func, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import load_only
 from functools import wraps
 from werkzeug.utils import secure_filename
+from utils import delete_upload_async, get_current_user
 import os
+import random
+import string
 
 # Create admin blueprint
 admin_bp = Blueprint('admin', __name__)
@@ -87,8 +93,13 @@ def users():
     role_filter = request.args.get('role', 'all')
     status_filter = request.args.get('status', 'all')
 
-    # Build query
-    query = User.query.filter(User.role != 'admin')
+    # Build query. Only the columns the table shows are loaded, which keeps
+    # each of the (potentially hundreds of) User instances small - no
+    # password hash, bio or JSON profile fields per row
+    query = User.query.options(load_only(
+        User.id, User.username, User.full_name, User.email, User.role, User.age,
+        User.profile_picture, User.created_at, User.last_active, User.is_active
+    )).filter(User.role != 'admin')
 
     if role_filter != 'all':
         query = query.filter_by(role=role_filter)
@@ -232,6 +243,9 @@ def create_pair():
         if not all([senior_id, youth_id]):
             flash('Please select both a senior and youth volunteer', 'danger')
             return redirect(url_for('admin.create_pair'))
+        if User.query.filter(User.id.in_([senior_id, youth_id])).count() != 2:
+            flash('Selected user no longer exists', 'danger')
+            return redirect(url_for('admin.create_pair'))
 
         # Create pair
         new_pair = Pair(
@@ -246,13 +260,14 @@ def create_pair():
         flash('Buddy pair created successfully!', 'success')
         return redirect(url_for('admin.pairs'))
 
-    # Get unpaired seniors and youth
-    unpaired_seniors = User.query.filter(
+    # Get unpaired seniors and youth (only the columns the picker cards show)
+    card_columns = load_only(User.id, User.full_name, User.age, User.email, User.profile_picture)
+    unpaired_seniors = User.query.options(card_columns).filter(
         User.role == 'senior',
         ~User.id.in_(db.session.query(Pair.senior_id).filter_by(status='active'))
     ).all()
 
-    unpaired_youth = User.query.filter(
+    unpaired_youth = User.query.options(card_columns).filter(
         User.role == 'youth',
         ~User.id.in_(db.session.query(Pair.youth_id).filter_by(status='active'))
     ).all()
@@ -295,7 +310,14 @@ def send_pair_reminder(pair_id):
 @admin_required
 def events():
     """Display all events."""
-    all_events = Event.query.order_by(Event.date.desc()).all()
+    # Participant counts come from one grouped query and are attached to each
+    # event, instead of the template running participants.count() per row
+    all_events = []
+    for event, participants_count in db.session.query(Event, func.count(EventParticipant.user_id)).outerjoin(
+        EventParticipant, EventParticipant.event_id == Event.id
+    ).group_by(Event.id).order_by(Event.date.desc()):
+        event.participants_count = participants_count
+        all_events.append(event)
 
     return render_template('admin/events.html', events=all_events, now=datetime.utcnow())
 
@@ -403,7 +425,14 @@ def communities():
     """Display all communities."""
     all_communities = Community.query.order_by(Community.created_at.desc()).all()
 
-    return render_template('admin/communities.html', communities=all_communities)
+    # Post counts for every card in one grouped query
+    post_counts = dict(
+        db.session.query(CommunityPost.community_id, func.count(CommunityPost.id))
+        .group_by(CommunityPost.community_id).all()
+    )
+
+    return render_template('admin/communities.html', communities=all_communities,
+                           post_counts=post_counts)
 
 
 @admin_bp.route('/communities/create', methods=['GET', 'POST'])
@@ -418,7 +447,8 @@ def create_community():
         banner_class = request.form.get('banner_class')
         tags = request.form.get('tags')
 
-        if Community.query.filter_by(name=name).first():
+        # EXISTS lets SQLite stop at the first match without building a row
+        if db.session.query(Community.query.filter_by(name=name).exists()).scalar():
             flash('Community with this name already exists', 'danger')
             return redirect(url_for('admin.create_community'))
 
@@ -430,8 +460,6 @@ def create_community():
                 filename = secure_filename(file.filename)
                 ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
                 if ext in current_app.config['ALLOWED_EXTENSIONS']:
-                    os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
-                    
                     timestamp = datetime.now().strftime('%Y%m%d%H%M%S_')
                     unique_filename = f"comm_new_{timestamp}{filename}"
                     
@@ -465,18 +493,13 @@ def delete_community(community_id):
     community = Community.query.get_or_404(community_id)
     
     try:
-        # Clean up photo if exists
-        if community.photo_url:
-            try:
-                old_filename = os.path.basename(community.photo_url)
-                old_path = os.path.join(current_app.config['UPLOAD_FOLDER'], old_filename)
-                if os.path.exists(old_path):
-                    os.remove(old_path)
-            except Exception:
-                pass
-
+        photo_url = community.photo_url
         db.session.delete(community)
         db.session.commit()
+
+        # Clean up photo if exists (background thread, after the commit)
+        if photo_url:
+            delete_upload_async(os.path.join(current_app.config['UPLOAD_FOLDER'], os.path.basename(photo_url)))
         flash('Community deleted successfully.', 'success')
     except Exception as e:
         db.session.rollback()
@@ -496,14 +519,15 @@ def manage_community(community_id):
         .order_by(CommunityPost.created_at.desc()).all()
         
     # Get members
-    members = community.members.all()
+    members = CommunityMember.query.filter_by(community_id=community_id).all()
     member_user_ids = [m.user_id for m in members]
     
-    # Get non-members for the "Add Member" dropdown
+    # Get non-members for the "Add Member" dropdown (id, name and role only)
+    dropdown = User.query.options(load_only(User.id, User.full_name, User.role))
     if member_user_ids:
-        non_members = User.query.filter(User.role != 'admin', ~User.id.in_(member_user_ids)).all()
+        non_members = dropdown.filter(User.role != 'admin', ~User.id.in_(member_user_ids)).all()
     else:
-        non_members = User.query.filter(User.role != 'admin').all()
+        non_members = dropdown.filter(User.role != 'admin').all()
         
     return render_template('admin/manage_community.html', 
                            community=community, 
@@ -533,17 +557,9 @@ def update_community(community_id):
             filename = secure_filename(file.filename)
             ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
             if ext in current_app.config['ALLOWED_EXTENSIONS']:
-                os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
-                
-                # Clean up old photo if exists
+                # Clean up old photo if exists (off the request thread)
                 if community.photo_url:
-                    try:
-                        old_filename = os.path.basename(community.photo_url)
-                        old_path = os.path.join(current_app.config['UPLOAD_FOLDER'], old_filename)
-                        if os.path.exists(old_path):
-                            os.remove(old_path)
-                    except Exception:
-                        pass
+                    delete_upload_async(os.path.join(current_app.config['UPLOAD_FOLDER'], os.path.basename(community.photo_url)))
 
                 timestamp = datetime.now().strftime('%Y%m%d%H%M%S_')
                 unique_filename = f"comm_{community.id}_{timestamp}{filename}"
@@ -579,11 +595,18 @@ def delete_community_post(post_id):
 @admin_required
 def remove_community_member(community_id, user_id):
     """Remove a user from the community."""
-    member = CommunityMember.query.filter_by(community_id=community_id, user_id=user_id).first_or_404()
-    
-    db.session.delete(member)
-    community = Community.query.get(community_id)
-    community.member_count = max(0, community.member_count - 1)
+    # Delete by key and adjust the counter in SQL - no rows are loaded, and
+    # a concurrent join/leave can't lose an update to member_count
+    removed = CommunityMember.query.filter_by(
+        community_id=community_id, user_id=user_id
+    ).delete(synchronize_session=False)
+    if not removed:
+        abort(404)
+    db.session.execute(
+        update(Community)
+        .where(Community.id == community_id)
+        .values(member_count=func.max(Community.member_count - 1, 0))
+    )
     db.session.commit()
     
     flash('Member removed from community.', 'success')
@@ -594,19 +617,32 @@ def remove_community_member(community_id, user_id):
 @admin_required
 def add_community_member(community_id):
     """Add a user to the community."""
-    user_id = request.form.get('user_id')
-    if user_id:
-        # Logic reuses the join_community logic but forced by admin
-        # We can just create the record directly
-        if not CommunityMember.query.filter_by(community_id=community_id, user_id=user_id).first():
-            new_member = CommunityMember(community_id=community_id, user_id=user_id)
-            db.session.add(new_member)
-            
-            community = Community.query.get(community_id)
-            community.member_count += 1
+    # 404 guard - only the primary key is loaded
+    if not db.session.get(Community, community_id, options=[load_only(Community.id)]):
+        abort(404)
+    user_id = request.form.get('user_id', type=int)
+    if user_id and not db.session.get(User, user_id, options=[load_only(User.id)]):
+        flash('User not found.', 'danger')
+    elif user_id:
+        # Same as join_community but forced by admin: INSERT ... ON CONFLICT
+        # DO NOTHING lets the primary key decide, and member_count is
+        # incremented in SQL only when a row was actually added
+        joined = db.session.execute(
+            sqlite_insert(CommunityMember)
+            .values(community_id=community_id, user_id=user_id)
+            .on_conflict_do_nothing()
+            .returning(CommunityMember.user_id)
+        ).scalar()
+        if joined:
+            db.session.execute(
+                update(Community)
+                .where(Community.id == community_id)
+                .values(member_count=Community.member_count + 1)
+            )
             db.session.commit()
             flash('User added to community.', 'success')
         else:
+            db.session.rollback()
             flash('User is already a member.', 'warning')
             
     return redirect(url_for('admin.manage_community', community_id=community_id))
@@ -623,8 +659,11 @@ def reports():
     # Query reports
     query = ChatReport.query
 
-    if status_filter != 'all':
+    if status_filter in ChatReport.STATUSES:
         query = query.filter_by(status=status_filter)
+    elif status_filter != 'all':
+        # Unknown status (statuses are stored as codes) - nothing matches
+        query = query.filter(false())
 
     all_reports = query.order_by(ChatReport.created_at.desc()).all()
 
@@ -755,15 +794,13 @@ def analytics():
 def codes():
     """Manage registration codes."""
     if request.method == 'POST':
-        import random
-        import string
         
         # Generate random 8-character code
         chars = string.ascii_uppercase + string.digits
         code = ''.join(random.choices(chars, k=8))
         
         # Ensure uniqueness
-        while RegistrationCode.query.filter_by(code=code).first():
+        while db.session.query(RegistrationCode.query.filter_by(code=code).exists()).scalar():
             code = ''.join(random.choices(chars, k=8))
             
         new_code = RegistrationCode(code=code)
@@ -784,5 +821,5 @@ def codes():
 @admin_required
 def profile():
     """Admin profile page."""
-    user = User.query.get(session['user_id'])
+    user = get_current_user()
     return render_template('admin/profile.html', user=user)
@@ -6,9 +6,10 @@ Date: December 2025
 Feature: Authentication & User Management
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash
-from models import db, User, Streak, RegistrationCode
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app
+from models import db, User, Streak, RegistrationCode, Badge, SELECT_USER_BY_USERNAME
 from forms import LoginForm, RegistrationForm
+from utils import get_current_user
 from werkzeug.utils import secure_filename
 from datetime import datetime
 import os
@@ -35,7 +36,7 @@ def login():
         remember = form.remember.data
 
         # Query database for user
-        user = User.query.filter_by(username=username).first()
+        user = db.session.scalars(SELECT_USER_BY_USERNAME, {'username': username}).first()
 
         # Check if user exists and password is correct
         if user and user.check_password(password):
@@ -57,6 +58,11 @@ def login():
             # Update last active timestamp
             user.last_active = datetime.utcnow()
 
+            # Upgrade hashes made with an older method while we have the
+            # plain password (saved by the commit below)
+            if user.password_needs_rehash():
+                user.set_password(password)
+
             # Update or create streak
             update_user_streak(user)
 
@@ -84,7 +90,7 @@ def setup():
     if request.method == 'POST':
         interests = request.form.getlist('interests')
         
-        user = User.query.get(session['user_id'])
+        user = get_current_user()
         if user:
             user.interests = interests
             db.session.commit()
@@ -130,14 +136,10 @@ def register():
         if form.profile_picture.data:
             file = form.profile_picture.data
             if file:
-                from flask import current_app
                 filename = secure_filename(file.filename)
                 ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
                 
                 if ext in current_app.config['ALLOWED_EXTENSIONS']:
-                    # Ensure upload directory exists
-                    os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
-                    
                     # Create unique filename: profile_username_timestamp.ext
                     timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
                     unique_filename = f"profile_{username}_{timestamp}.{ext}"
@@ -238,7 +240,7 @@ def change_password():
     if not current_password or not new_password:
         return {'success': False, 'message': 'Missing required fields'}, 400
         
-    user = User.query.get(session['user_id'])
+    user = get_current_user()
     
     if not user.check_password(current_password):
         return {'success': False, 'message': 'Incorrect current password'}, 400
@@ -254,64 +256,32 @@ def update_user_streak(user):
     """
     Update user's daily streak on login.
     """
-    from datetime import date, timedelta
-
-    # Get or create streak record
-    streak = Streak.query.filter_by(user_id=user.id).first()
-    if not streak:
-        streak = Streak(user_id=user.id, current_streak=1, longest_streak=1, points=10)
-        db.session.add(streak)
-        return
-
-    today = date.today()
-
-    # Check if already logged in today
-    if streak.last_login == today:
-        return
-
-    yesterday = today - timedelta(days=1)
+    # Create, extend or reset the streak in a single statement
+    current_streak = Streak.bump(user.id)
 
-    if streak.last_login == yesterday:
-        # Consecutive day - increment streak
-        streak.current_streak += 1
-        streak.points += 10 * streak.current_streak
-
-        if streak.current_streak > streak.longest_streak:
-            streak.longest_streak = streak.current_streak
-
-        check_streak_badges(user, streak.current_streak)
-
-    else:
-        # Streak broken - reset to 1
-        streak.current_streak = 1
-        streak.points += 10
-
-    streak.last_login = today
+    # Only an extended streak (consecutive day) can reach a new milestone;
+    # None means the user already logged in today
+    if current_streak and current_streak > 1:
+        check_streak_badges(user, current_streak)
 
 
 def check_streak_badges(user, streak_days):
     """
     Award badges for streak milestones.
     """
-    from models import Badge
-    from flask import current_app
-
-    milestones = current_app.config.get('STREAK_MILESTONES', {
-        7: 'Week Warrior',
-        30: 'Month Master',
-        100: 'Century Champion',
-        365: 'Year Legend'
-    })
+    # Defined once on Config - no fallback dict rebuilt on every login
+    milestones = current_app.config['STREAK_MILESTONES']
 
     if streak_days in milestones:
         badge_name = milestones[streak_days]
         
-        existing_badge = Badge.query.filter_by(
+        # Existence check only - no need to load the Badge row
+        has_badge = db.session.query(Badge.query.filter_by(
             user_id=user.id,
             badge_type=badge_name
-        ).first()
+        ).exists()).scalar()
 
-        if not existing_badge:
+        if not has_badge:
             new_badge = Badge(user_id=user.id, badge_type=badge_name)
             db.session.add(new_badge)
             flash(f'🎉 Congratulations! You earned the {badge_name} badge!', 'success')
\ No newline at end of file
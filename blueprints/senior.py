@@ -8,13 +8,26 @@ Description: Handles all routes for senior users including story creation,
              messaging with youth buddies, event registration, and accessibility features
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app
-from models import db, User, Story, Message, Event, Community, Pair, EventParticipant, CommunityMember, Game, GameSession, CommunityPost, ChatReport
-from forms import StoryForm, MessageForm
-from datetime import datetime, timedelta
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app, abort
+from models import (
+    db, User, Story, StoryReaction, StoryComment, Message, Event, Community, Pair, EventParticipant,
+    CommunityMember, Game, GameSession, CommunityPost, ChatReport, Badge, Streak, GameHistory,
+    Checkin
+)
+from forms import StoryForm, MessageForm, ProfileForm
+from datetime import datetime
 from functools import wraps
 from werkzeug.utils import secure_filename
-from utils import filter_text
+from sqlalchemy import and_, case, delete, desc, func, select, update
+from sqlalchemy.orm import joinedload, selectinload
+from utils import (
+    cache, filter_text, strict_loading, get_current_user, get_current_pair, get_current_buddy,
+    no_autoflush, save_upload_hashed, release_upload, contains_unkind_words, conversation_select,
+    get_story_feed, get_user_stories, invalidate_story_cache, get_story_engagement, invalidate_conversation_cache,
+    get_message_translations, delete_upload_async, BADGE_ICONS, player_sessions_select, get_game_summary,
+    get_user, queue_notification, message_poll_response, get_game_session_or_404, GAME_PAGES,
+    toggle_event_registration, toggle_community_membership, toggle_story_reaction
+)
 import os
 
 # Create senior blueprint
@@ -29,36 +42,49 @@ def login_required(f):
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
+        # Fast path: a logged-in senior user goes straight through on one
+        # role lookup; url_for/flash are only reached on the failure branches
+        sess = session
+        if sess.get('role') == 'senior' and 'user_id' in sess:
+            return f(*args, **kwargs)
+        if 'user_id' not in sess:
             flash('Please login to access this page', 'warning')
             return redirect(url_for('auth.login', role='senior'))
-        if session.get('role') != 'senior':
-            flash('Access denied. Senior account required.', 'danger')
-            return redirect(url_for('index'))
-        return f(*args, **kwargs)
+        flash('Access denied. Senior account required.', 'danger')
+        return redirect(url_for('index'))
     return decorated_function
 
 
 # ==================== DASHBOARD ====================
 @senior_bp.route('/dashboard')
 @login_required
+@no_autoflush
 def dashboard():
     """
     Senior dashboard - main page after login.
     Shows stats, recent activity, and quick actions.
     """
-    user = User.query.get(session['user_id'])
+    user = get_current_user()
 
     # Get user statistics
     stories_count = Story.query.filter_by(user_id=user.id).count()
+    messages_sent = Message.query.filter_by(sender_id=user.id).count()
 
     # Get buddy information (paired youth)
-    pair = Pair.query.filter_by(senior_id=user.id, status='active').first()
-    buddy = User.query.get(pair.youth_id) if pair else None
-
-    # Get recent stories
-    recent_stories = Story.query.filter_by(user_id=user.id)\
-        .order_by(Story.created_at.desc()).limit(5).all()
+    pair = get_current_pair()
+    buddy = get_current_buddy()
+
+    # Get recent stories (author eager-loaded, reaction/comment counts grouped)
+    recent_stories = get_user_stories(user.id, 5)
+
+    # Which of those the user has liked - one query rather than one per card
+    liked_story_ids = {
+        story_id for (story_id,) in db.session.query(StoryReaction.story_id).filter(
+            StoryReaction.story_id.in_([story['id'] for story in recent_stories]),
+            StoryReaction.user_id == user.id,
+            StoryReaction.reaction_type == 'heart'
+        )
+    }
 
     # Get upcoming events
     upcoming_events = Event.query.filter(Event.date >= datetime.utcnow())\
@@ -67,33 +93,43 @@ def dashboard():
     return render_template('senior/dashboard.html',
                          user=user,
                          stories_count=stories_count,
+                         messages_sent=messages_sent,
                          buddy=buddy,
                          recent_stories=recent_stories,
+                         liked_story_ids=liked_story_ids,
                          upcoming_events=upcoming_events)
 
 
 # ==================== STORIES ====================
 @senior_bp.route('/story_feed')
 @login_required
+@no_autoflush
 def story_feed():
     """Instagram-style story feed with all stories."""
     # Get filters from query parameters
     category_filter = request.args.get('category', 'all')
     role_filter = request.args.get('role', 'all')
 
-    # Query stories with user join for role filtering
-    query = Story.query.join(User)
-
-    if category_filter != 'all':
-        query = query.filter(Story.category == category_filter)
-    
-    if role_filter != 'all':
-        query = query.filter(User.role == role_filter)
-
-    stories = query.order_by(Story.created_at.desc()).all()
+    # Stories are the same for everyone (cached); only the viewer's own
+    # likes are per-user, fetched as one set instead of a query per card
+    # ?before=<id> is the keyset cursor for older pages
+    before = request.args.get('before', type=int)
+    stories = get_story_feed(category_filter, role_filter, before)
+    # A full page means there may be more; the last id is the next cursor
+    next_cursor = stories[-1]['id'] if len(stories) >= current_app.config['STORY_FEED_LIMIT'] else None
+    # Which stories on this page the user has liked (not every heart ever given)
+    liked_story_ids = {
+        story_id for (story_id,) in db.session.query(StoryReaction.story_id).filter(
+            StoryReaction.story_id.in_([story['id'] for story in stories]),
+            StoryReaction.user_id == session['user_id'],
+            StoryReaction.reaction_type == 'heart'
+        )
+    }
 
     return render_template('senior/story_feed.html',
                          stories=stories,
+                         liked_story_ids=liked_story_ids,
+                         next_cursor=next_cursor,
                          current_category=category_filter,
                          current_role=role_filter)
 
@@ -102,9 +138,32 @@ def story_feed():
 @login_required
 def story_detail(story_id):
     """Full story view with reactions and comments."""
-    story = Story.query.get_or_404(story_id)
+    # Comments (and their authors) are loaded up front - Story.comments is
+    # lazy='raise', so the template can't trigger a query per comment
+    story = db.session.get(Story, story_id, options=[
+        joinedload(Story.user),
+        selectinload(Story.comments).joinedload(StoryComment.user)
+    ]) or abort(404)
+
+    # SELECT EXISTS(...) - short-circuits without building a reaction object
+    user_liked = db.session.query(StoryReaction.query.filter_by(
+        story_id=story_id,
+        user_id=session['user_id'],
+        reaction_type='heart'
+    ).exists()).scalar()
 
-    return render_template('senior/story_detail.html', story=story)
+    return render_template('senior/story_detail.html', story=story, user_liked=user_liked)
+
+
+@senior_bp.route('/api/stories/<int:story_id>/react', methods=['POST'])
+@login_required
+def api_react_story(story_id):
+    """
+    API endpoint to handle story reactions.
+    Toggles reaction if same type exists, or updates/creates new one.
+    """
+    data = request.get_json()
+    return toggle_story_reaction(story_id, session['user_id'], data.get('reaction_type'))
 
 
 @senior_bp.route('/stories')
@@ -114,8 +173,9 @@ def stories():
     user_id = session['user_id']
     stories = Story.query.filter_by(user_id=user_id)\
         .order_by(Story.created_at.desc()).all()
+    engagement = get_story_engagement(stories)
 
-    return render_template('senior/stories.html', stories=stories)
+    return render_template('senior/stories.html', stories=stories, engagement=engagement)
 
 
 @senior_bp.route('/create_story', methods=['GET', 'POST'])
@@ -141,9 +201,6 @@ def create_story():
                 # Check extension
                 ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
                 if ext in current_app.config['ALLOWED_EXTENSIONS']:
-                    # Ensure upload directory exists
-                    os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
-                    
                     # Save file with unique name
                     timestamp = datetime.now().strftime('%Y%m%d%H%M%S_')
                     unique_filename = timestamp + filename
@@ -153,6 +210,7 @@ def create_story():
 
         db.session.add(new_story)
         db.session.commit()
+        invalidate_story_cache()
 
         flash('Story created successfully!', 'success')
         return redirect(url_for('senior.stories'))
@@ -191,23 +249,18 @@ def edit_story(story_id):
                 filename = secure_filename(file.filename)
                 ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
                 if ext in current_app.config['ALLOWED_EXTENSIONS']:
-                    os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
                     timestamp = datetime.now().strftime('%Y%m%d%H%M%S_')
                     unique_filename = timestamp + filename
                     file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename))
                     
-                    # Delete old photo if exists
+                    # Delete old photo if exists (off the request thread)
                     if story.photo_url:
-                        old_path = os.path.join(current_app.config['UPLOAD_FOLDER'], story.photo_url)
-                        if os.path.exists(old_path):
-                            try:
-                                os.remove(old_path)
-                            except OSError:
-                                pass
+                        delete_upload_async(os.path.join(current_app.config['UPLOAD_FOLDER'], story.photo_url))
                                 
                     story.photo_url = unique_filename
         
         db.session.commit()
+        invalidate_story_cache()
         flash('Story updated successfully!', 'success')
         return redirect(url_for('senior.stories'))
 
@@ -224,14 +277,14 @@ def delete_story(story_id):
         return {'success': False, 'message': 'Unauthorized'}, 403
         
     try:
-        # Delete photo file if exists
-        if story.photo_url:
-            path = os.path.join(current_app.config['UPLOAD_FOLDER'], story.photo_url)
-            if os.path.exists(path):
-                os.remove(path)
-                
+        photo_url = story.photo_url
         db.session.delete(story)
         db.session.commit()
+
+        # Delete photo file if exists - once the row is gone, off the request thread
+        if photo_url:
+            delete_upload_async(os.path.join(current_app.config['UPLOAD_FOLDER'], photo_url))
+        invalidate_story_cache()
         return {'success': True}
     except Exception as e:
         db.session.rollback()
@@ -246,12 +299,12 @@ def messages():
     user_id = session['user_id']
 
     # Get paired youth buddy
-    pair = Pair.query.filter_by(senior_id=user_id, status='active').first()
+    pair = get_current_pair()
     if not pair:
         flash('You are not currently paired with a youth volunteer', 'info')
         return render_template('senior/messages.html', buddy=None, messages=[])
 
-    buddy = User.query.get(pair.youth_id)
+    buddy = get_current_buddy()
     
     form = MessageForm()
 
@@ -259,12 +312,7 @@ def messages():
         original_content = form.message.data
         
         # Check for unkind words (Flagging based on original)
-        is_flagged = False
-        unkind_words = current_app.config.get('UNKIND_WORDS', [])
-        for word in unkind_words:
-            if word.lower() in original_content.lower():
-                is_flagged = True
-                break
+        is_flagged = contains_unkind_words(original_content)
         
         # Filter content
         content = filter_text(original_content)
@@ -283,6 +331,7 @@ def messages():
         pair.last_interaction = datetime.utcnow()
         
         db.session.commit()
+        invalidate_conversation_cache(user_id, buddy.id)
         
         if is_flagged:
             flash('Your message was sent but flagged for review due to potentially unkind language.', 'warning')
@@ -290,12 +339,20 @@ def messages():
         return redirect(url_for('senior.messages'))
 
     # Get messages between senior and youth
-    messages = Message.query.filter(
-        ((Message.sender_id == user_id) & (Message.recipient_id == buddy.id)) |
-        ((Message.sender_id == buddy.id) & (Message.recipient_id == user_id))
-    ).order_by(Message.created_at).all()
+    # (shared UNION ALL over ix_msg_conv). The template only reads Message
+    # columns; strict_loading makes any future relationship access fail
+    # fast in debug rather than quietly lazy-loading per message.
+    messages = db.session.scalars(
+        select(Message).options(*strict_loading())
+        .from_statement(conversation_select(user_id, buddy.id, Message).order_by('created_at'))
+    ).all()
+
+    # Stored translations for the page, fetched together (none to fetch
+    # when the whole conversation is in the default language)
+    translations = get_message_translations((m.id, m.original_language) for m in messages)
 
-    return render_template('senior/messages.html', buddy=buddy, messages=messages, form=form)
+    return render_template('senior/messages.html', buddy=buddy, messages=messages,
+                           translations=translations, form=form)
 
 
 @senior_bp.route('/api/messages')
@@ -306,34 +363,12 @@ def get_messages_json():
     Used by the frontend polling script (chat.js) to update the chat window
     without reloading the entire page.
     """
-    user_id = session['user_id']
-    
     # Check if user has a buddy
-    pair = Pair.query.filter_by(senior_id=user_id, status='active').first()
+    pair = get_current_pair()
     if not pair:
         return {'messages': []}
 
-    buddy_id = pair.youth_id
-
-    # Query all messages between the user and their buddy
-    # Ordered by creation time to show conversation history
-    messages = Message.query.filter(
-        ((Message.sender_id == user_id) & (Message.recipient_id == buddy_id)) |
-        ((Message.sender_id == buddy_id) & (Message.recipient_id == user_id))
-    ).order_by(Message.created_at).all()
-
-    # Convert message objects to a list of dictionaries (JSON-serializable)
-    messages_data = [{
-        'id': msg.id,
-        'content': msg.content,
-        'sender_id': msg.sender_id,
-        'is_me': msg.sender_id == user_id,
-        'created_at': (msg.created_at + timedelta(hours=8)).strftime('%I:%M %p'), # Format: 02:30 PM
-        'is_flagged': msg.is_flagged,
-        'translated_content': msg.translated_content if msg.original_language != 'en' else None
-    } for msg in messages]
-
-    return {'messages': messages_data}
+    return message_poll_response(session['user_id'], pair.youth_id)
 
 
 @senior_bp.route('/api/messages/<int:message_id>/report', methods=['POST'])
@@ -387,19 +422,25 @@ def report_community_post(post_id):
 # ==================== EVENTS ====================
 @senior_bp.route('/events')
 @login_required
+@no_autoflush
 def events():
     """Display all available events."""
     user_id = session['user_id']
     
-    # Get all upcoming events
-    upcoming_events = Event.query.filter(Event.date >= datetime.utcnow()).order_by(Event.date).all()
+    # Get all upcoming events together with their participant counts
+    # (one grouped query instead of two COUNTs per event)
+    upcoming_events = db.session.query(Event, func.count(EventParticipant.user_id)).outerjoin(
+        EventParticipant, EventParticipant.event_id == Event.id
+    ).filter(Event.date >= datetime.utcnow()).group_by(Event.id).order_by(Event.date).all()
     
-    # Get IDs of events user is registered for
-    registered_event_ids = [p.event_id for p in EventParticipant.query.filter_by(user_id=user_id).all()]
+    # Get IDs of events user is registered for (set for O(1) lookups)
+    registered_event_ids = {
+        event_id for (event_id,) in db.session.query(EventParticipant.event_id).filter_by(user_id=user_id)
+    }
     
     # Process events for display
     events_data = []
-    for event in upcoming_events:
+    for event, participants_count in upcoming_events:
         is_registered = event.id in registered_event_ids
         
         event_dict = {
@@ -410,9 +451,9 @@ def events():
             'location': event.location,
             'date': event.date,
             'capacity': event.capacity,
-            'participants_count': event.participants.count(),
+            'participants_count': participants_count,
             'is_registered': is_registered,
-            'is_full': event.capacity is not None and event.participants.count() >= event.capacity
+            'is_full': event.capacity is not None and participants_count >= event.capacity
         }
         events_data.append(event_dict)
 
@@ -423,71 +464,48 @@ def events():
 @login_required
 def register_event(event_id):
     """Toggle event registration for the user."""
-    
-    event = Event.query.get_or_404(event_id)
-    user_id = session['user_id']
-    
-    registration = EventParticipant.query.filter_by(
-        event_id=event_id,
-        user_id=user_id
-    ).first()
-    
-    status = ''
-    
-    if registration:
-        # Unregister
-        db.session.delete(registration)
-        status = 'unregistered'
-    else:
-        # Check capacity
-        if event.capacity is not None and event.participants.count() >= event.capacity:
-            return {'success': False, 'message': 'Event is full'}, 400
-        
-        # Register
-        new_registration = EventParticipant(event_id=event_id, user_id=user_id)
-        db.session.add(new_registration)
-        status = 'registered'
-        
-    db.session.commit()
-    
-    return {
-        'success': True,
-        'status': status,
-        'participant_count': event.participants.count()
-    }
+    return toggle_event_registration(event_id, session['user_id'])
 
 
 # ==================== COMMUNITIES ====================
 @senior_bp.route('/communities')
 @login_required
+@no_autoflush
 def communities():
     """Display all communities with search and unread counts."""
     search_query = request.args.get('q', '')
     user_id = session['user_id']
     
-    query = Community.query
+    # One aggregated query for every card: the user's membership (outer join
+    # on their own CommunityMember row), total posts, and unread posts since
+    # they last viewed. Cards only use Community columns - strict_loading
+    # fails fast in debug if that changes.
+    last_seen = func.coalesce(CommunityMember.last_viewed_at, CommunityMember.joined_at)
+    query = db.session.query(
+        Community,
+        CommunityMember.user_id.isnot(None).label('joined'),
+        func.count(CommunityPost.id).label('stat_count'),
+        func.sum(case((CommunityPost.created_at > last_seen, 1), else_=0)).label('unread')
+    ).outerjoin(
+        CommunityMember,
+        and_(CommunityMember.community_id == Community.id, CommunityMember.user_id == user_id)
+    ).outerjoin(
+        CommunityPost, CommunityPost.community_id == Community.id
+    ).options(*strict_loading()).group_by(Community.id, CommunityMember.user_id)
+
     if search_query:
         query = query.filter(Community.name.ilike(f'%{search_query}%') | 
                              Community.description.ilike(f'%{search_query}%'))
     
-    all_communities = query.all()
-    
     my_communities = []
     other_communities = []
     
-    for comm in all_communities:
-        member = CommunityMember.query.filter_by(community_id=comm.id, user_id=user_id).first()
-        comm.is_joined = member is not None
-        comm.post_count = comm.posts.count()
+    for comm, joined, stat_count, unread in query.all():
+        comm.is_joined = joined
+        comm.post_count = stat_count
         
         if comm.is_joined:
-            # Calculate unread posts
-            last_viewed = member.last_viewed_at or member.joined_at
-            unread = CommunityPost.query.filter(
-                CommunityPost.community_id == comm.id,
-                CommunityPost.created_at > last_viewed
-            ).count()
-            comm.unread_count = unread
+            comm.unread_count = unread or 0
             my_communities.append(comm)
         else:
             other_communities.append(comm)
@@ -505,25 +523,43 @@ def view_community(community_id):
     community = Community.query.get_or_404(community_id)
     user_id = session['user_id']
     
-    # Check membership
-    member = CommunityMember.query.filter_by(
-        community_id=community_id, 
-        user_id=user_id
+    # Membership check plus "anything posted since the last visit?" in one
+    # read. last_viewed_at only feeds the unread counts, so it is written
+    # only when there is something new to mark read - re-opening a quiet
+    # chat stays a read-only request.
+    last_seen = func.coalesce(CommunityMember.last_viewed_at, CommunityMember.joined_at)
+    membership = db.session.query(
+        CommunityMember.joined_at,
+        select(CommunityPost.id).where(
+            CommunityPost.community_id == community_id,
+            CommunityPost.created_at > last_seen
+        ).exists()
+    ).filter(
+        CommunityMember.community_id == community_id, CommunityMember.user_id == user_id
     ).first()
-    
-    if not member:
+    if membership is None:
         flash('You must join this community to view the chat.', 'warning')
         return redirect(url_for('senior.communities'))
-        
-    # Update last_viewed_at
-    member.last_viewed_at = datetime.utcnow()
-    db.session.commit()
+
+    _, has_unread = membership
+    if has_unread:
+        db.session.execute(
+            update(CommunityMember)
+            .where(CommunityMember.community_id == community_id,
+                   CommunityMember.user_id == user_id)
+            .values(last_viewed_at=datetime.utcnow())
+        )
+        db.session.commit()
         
     # Get recent posts for the chat history
-    posts = CommunityPost.query.filter_by(community_id=community_id)\
+    # Authors are loaded up front (the template shows each poster's avatar
+    # and name); anything else touched lazily raises in debug
+    posts = CommunityPost.query.options(*strict_loading(selectinload(CommunityPost.user)))\
+        .filter_by(community_id=community_id)\
         .order_by(CommunityPost.created_at.asc()).all()
         
-    members = community.members.all()
+    members = CommunityMember.query.options(*strict_loading(selectinload(CommunityMember.user)))\
+        .filter_by(community_id=community_id).all()
     return render_template('senior/community_chat.html', community=community, posts=posts, user_id=user_id, members=members)
 
 
@@ -539,12 +575,10 @@ def upload_community_photo(community_id):
         return {'error': 'No selected file'}, 400
         
     if file and file.filename:
-        filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S_')
-        unique_filename = f"chat_{community_id}_{timestamp}{filename}"
-        
-        os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
-        file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename))
+        # Streamed to a temp file in chunks and atomically renamed to its
+        # content hash, so the photo is never held in memory whole and a
+        # half-written file is never visible under its final name
+        unique_filename = save_upload_hashed(file, current_app.config['UPLOAD_FOLDER'])
         
         return {'url': f"images/uploads/{unique_filename}"}
     
@@ -555,40 +589,7 @@ def upload_community_photo(community_id):
 @login_required
 def join_community(community_id):
     """Toggle community membership."""
-    
-    community = Community.query.get_or_404(community_id)
-    user_id = session['user_id']
-    
-    # Check existing membership
-    membership = CommunityMember.query.filter_by(
-        community_id=community_id,
-        user_id=user_id
-    ).first()
-    
-    status = 'joined'
-    
-    if membership:
-        # Leave community
-        db.session.delete(membership)
-        community.member_count = max(0, community.member_count - 1)
-        status = 'left'
-    else:
-        # Join community
-        new_member = CommunityMember(
-            community_id=community_id,
-            user_id=user_id
-        )
-        db.session.add(new_member)
-        community.member_count += 1
-        status = 'joined'
-        
-    db.session.commit()
-    
-    return {
-        'success': True,
-        'status': status,
-        'member_count': community.member_count
-    }
+    return toggle_community_membership(community_id, session['user_id'])
 
 
 # ==================== GAMES ====================
@@ -599,20 +600,20 @@ def games():
     user_id = session['user_id']
     
     # Get paired youth buddy for online status
-    pair = Pair.query.filter_by(senior_id=user_id, status='active').first()
-    buddy = User.query.get(pair.youth_id) if pair else None
+    pair = get_current_pair()
+    buddy = get_current_buddy()
 
     # Get active game session
-    active_session = GameSession.query.filter(
-        ((GameSession.player1_id == user_id) | (GameSession.player2_id == user_id)),
-        GameSession.status == 'active'
+    active_session = db.session.scalars(
+        select(GameSession).from_statement(
+            player_sessions_select(user_id, GameSession, statuses=('active',)).limit(1)
+        )
     ).first()
 
     # Get streak info
-    from models import Streak
     streak_info = Streak.query.filter_by(user_id=user_id).first()
     
-    user = User.query.get(user_id)
+    user = get_current_user()
 
     # Stats
     stats = {
@@ -620,12 +621,19 @@ def games():
         'won': streak_info.games_won if streak_info else 0,
         'points': streak_info.points if streak_info else 0,
         'streak': streak_info.current_streak if streak_info else 0,
-        'elo': user.elo
+        'elo': user.elo,
+        'stories': Story.query.filter_by(user_id=user_id).count()
     }
 
     # Get recent game history
-    from models import GameHistory
-    game_history = GameHistory.query.filter(
+    # The template shows each record's opponent: both seats are JOINed into
+    # this query (many-to-one, so LIMIT still applies to history rows)
+    # instead of a lazy load per row. record.game needs nothing:
+    # Game.query.all() below puts every game in the identity map before the
+    # template runs, as it does for the active session's game and players.
+    game_history = GameHistory.query.options(
+        joinedload(GameHistory.player1), joinedload(GameHistory.player2)
+    ).filter(
         (GameHistory.player1_id == user_id) | (GameHistory.player2_id == user_id)
     ).order_by(GameHistory.completed_at.desc()).limit(5).all()
 
@@ -636,6 +644,7 @@ def games():
         games_data.append({
             'id': g.id,
             'name': g.title,
+            'kind': g.kind,
             'image_class': 'game-image',
             'image_style': g.bg_gradient,
             'icon': g.icon,
@@ -662,9 +671,10 @@ def games():
 @login_required
 def challenge_buddy(game_id):
     """Create a new game session and challenge buddy."""
-    from app import socketio
+    # Flask-SocketIO registers itself on the app; no circular import needed
+    socketio = current_app.extensions['socketio']
     user_id = session['user_id']
-    pair = Pair.query.filter_by(senior_id=user_id, status='active').first()
+    pair = get_current_pair()
     if not pair:
         flash('You need a buddy to play!', 'warning')
         return redirect(url_for('senior.games'))
@@ -672,35 +682,39 @@ def challenge_buddy(game_id):
     # Check for ANY existing waiting or active session for this game between the pair
     # This ensures that if the buddy already created a session, we join it instead of creating a duplicate
     # Also allows rejoining an already active match
-    existing_sessions = GameSession.query.filter(
+    pair_sessions = (
         GameSession.game_id == game_id,
-        GameSession.status.in_(['waiting', 'active']),
+        GameSession.is_open(),
         ((GameSession.player1_id == user_id) & (GameSession.player2_id == pair.youth_id)) |
         ((GameSession.player1_id == pair.youth_id) & (GameSession.player2_id == user_id))
-    ).order_by(GameSession.created_at.desc()).all()
-
-    # Fetch game details first to determine type
-    game = Game.query.get_or_404(game_id)
-
-    # Determine target URL based on game type
-    target_url = 'senior.chess_game'
-    buddy_url = 'youth.chess_game'
-    
-    if 'Xiangqi' in game.title:
-        target_url = 'senior.xiangqi_game'
-        buddy_url = 'youth.xiangqi_game'
-    elif 'Tic Tac Toe' in game.title or 'Tic-Tac-Toe' in game.title:
-        target_url = 'senior.tictactoe_game'
-        buddy_url = 'youth.tictactoe_game'
+    )
+    # Only the latest session's id and status are needed, so just that row
+    # is fetched (one seek on ix_gs_open); duplicates are deleted in SQL below
+    session_to_use = db.session.execute(
+        select(GameSession.id, GameSession.status).where(*pair_sessions)
+        .order_by(GameSession.created_at.desc()).limit(1)
+    ).first()
 
-    if existing_sessions:
-        # Use the most recent one
-        session_to_use = existing_sessions[0]
-        
-        # Clean up any duplicates to keep DB clean
-        for gs in existing_sessions[1:]:
-            db.session.delete(gs)
-        db.session.commit()
+    # Fetch the game title/kind first to determine type (memoized reference data)
+    game = get_game_summary(game_id)
+    if game is None:
+        abort(404)
+    game_title, game_kind = game
+
+    # Determine target URLs (ours, then the buddy's) from the game kind
+    page = GAME_PAGES.get(game_kind, GAME_PAGES['chess'])
+    target_url, buddy_url = f'senior.{page}', f'youth.{page}'
+
+    if session_to_use:
+        # Clean up any older duplicates with one bulk DELETE, and only commit
+        # when there was actually something to remove
+        removed = db.session.execute(
+            delete(GameSession)
+            .where(*pair_sessions, GameSession.id != session_to_use.id)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if removed:
+            db.session.commit()
         
         # Check if the game is already active or waiting
         if session_to_use.status == 'active':
@@ -719,28 +733,28 @@ def challenge_buddy(game_id):
         current_turn_id=user_id # Challenger starts
     )
     db.session.add(new_session)
-    db.session.commit()
-    
-    # EMIT CHALLENGE TO BUDDY
-    socketio.emit('game_challenge', {
-        'challenger_name': session.get('full_name'),
-        'game_title': game.title,
-        'session_id': new_session.id
-    }, room=f"user_{pair.youth_id}")
+    # Flush (no commit) so new_session.id is available for the notification link
+    db.session.flush()
 
-    # CREATE NOTIFICATION RECORD
-    from models import Notification
-        
-    notif = Notification(
+    # CREATE NOTIFICATION RECORD (written by the commit below, together with the session)
+    queue_notification(
         user_id=pair.youth_id,
         title='Game Challenge!',
-        message=f"{session.get('full_name')} has challenged you to a game of {game.title}!",
+        message=f"{session.get('full_name')} has challenged you to a game of {game_title}!",
         type='game',
         link=url_for(buddy_url, session_id=new_session.id)
     )
-    db.session.add(notif)
+    # Session + notification land in a single transaction / single commit
     db.session.commit()
-    
+
+    # EMIT CHALLENGE (after commit so the buddy can load the session straight away).
+    # Delivered from a background task so the redirect doesn't wait on it.
+    socketio.start_background_task(socketio.emit, 'game_challenge', {
+        'challenger_name': session.get('full_name'),
+        'game_title': game_title,
+        'session_id': new_session.id
+    }, room=f"user_{pair.youth_id}")
+
     return redirect(url_for(target_url, session_id=new_session.id))
 
 
@@ -749,15 +763,15 @@ def challenge_buddy(game_id):
 def chess_game():
     """Render the chess game page."""
     user_id = session['user_id']
-    session_id = request.args.get('session_id')
+    session_id = request.args.get('session_id', type=int)
     
-    if session_id:
-        active_session = GameSession.query.get_or_404(session_id)
-    else:
-        active_session = GameSession.query.filter(
-            ((GameSession.player1_id == user_id) | (GameSession.player2_id == user_id)),
-            GameSession.status.in_(['active', 'waiting'])
-        ).order_by(GameSession.created_at.desc()).first()
+    if not session_id:
+        # Latest open session id from either seat (UNION ALL over the per-seat indexes)
+        session_id = db.session.scalar(
+            player_sessions_select(user_id, GameSession.id, GameSession.created_at)
+            .order_by(desc('created_at')).limit(1)
+        )
+    active_session = get_game_session_or_404(session_id) if session_id else None
     
     if not active_session:
         flash('No active game session found. Please challenge your buddy!', 'warning')
@@ -765,8 +779,7 @@ def chess_game():
         
     color = 'white' if active_session.player1_id == user_id else 'black'
     
-    player1 = User.query.get(active_session.player1_id)
-    player2 = User.query.get(active_session.player2_id)
+    player1, player2 = active_session.player1, active_session.player2
     
     return render_template('senior/chess.html', 
                          color=color, 
@@ -781,11 +794,11 @@ def chess_game():
 def xiangqi_game():
     """Render the Chinese chess (Xiangqi) game page."""
     user_id = session['user_id']
-    session_id = request.args.get('session_id')
+    session_id = request.args.get('session_id', type=int)
     
     active_session = None
     if session_id:
-        active_session = GameSession.query.get_or_404(session_id)
+        active_session = get_game_session_or_404(session_id)
         # Validate user participation
         if active_session.player1_id != user_id and active_session.player2_id != user_id:
             flash('You are not part of this game.', 'danger')
@@ -797,8 +810,7 @@ def xiangqi_game():
     player2 = None
     if active_session:
         color = 'red' if active_session.player1_id == user_id else 'black'
-        player1 = User.query.get(active_session.player1_id)
-        player2 = User.query.get(active_session.player2_id)
+        player1, player2 = active_session.player1, active_session.player2
 
     return render_template('senior/xiangqi.html', 
                          active_session=active_session, 
@@ -812,11 +824,11 @@ def xiangqi_game():
 def tictactoe_game():
     """Render the Tic Tac Toe game page."""
     user_id = session['user_id']
-    session_id = request.args.get('session_id')
+    session_id = request.args.get('session_id', type=int)
     
     active_session = None
     if session_id:
-        active_session = GameSession.query.get_or_404(session_id)
+        active_session = get_game_session_or_404(session_id)
         # Validate user participation
         if active_session.player1_id != user_id and active_session.player2_id != user_id:
             flash('You are not part of this game.', 'danger')
@@ -828,8 +840,7 @@ def tictactoe_game():
     player2 = None
     if active_session:
         color = 'X' if active_session.player1_id == user_id else 'O'
-        player1 = User.query.get(active_session.player1_id)
-        player2 = User.query.get(active_session.player2_id)
+        player1, player2 = active_session.player1, active_session.player2
 
     return render_template('senior/tictactoe.html', 
                          active_session=active_session, 
@@ -843,11 +854,12 @@ def tictactoe_game():
 @senior_bp.route('/profile', methods=['GET', 'POST'])
 @login_required
 def profile():
-    user = User.query.get(session['user_id'])
-    from forms import ProfileForm
+    user = get_current_user()
     form = ProfileForm(obj=user)
 
     if form.validate_on_submit():
+        old_picture = user.profile_picture
+
         # 1. Update basic information from Form
         user.full_name = form.full_name.data
         session['full_name'] = user.full_name
@@ -871,26 +883,11 @@ def profile():
             
             filename = secure_filename(file.filename)
             if filename: # Ensure filename is not empty
-                # Ensure upload directory exists
-                os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
-                
-                # Create unique filename
-                timestamp = datetime.now().strftime('%Y%m%d%H%M%S_')
-                unique_filename = f"profile_{user.id}_{timestamp}{filename}"
-                
-                # Save the physical file to static/images/uploads/
-                file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename))
-                
-                # DELETE OLD PICTURE
-                if user.profile_picture and 'default-avatar' not in user.profile_picture:
-                    old_filename = os.path.basename(user.profile_picture)
-                    old_path = os.path.join(current_app.config['UPLOAD_FOLDER'], old_filename)
-                    if os.path.exists(old_path):
-                        try:
-                            os.remove(old_path)
-                        except OSError:
-                            pass 
-                            
+                # Stream to disk under a content-hashed name. The old picture
+                # is released after the commit below (hashed files may be
+                # shared, so only once nothing else references it)
+                unique_filename = save_upload_hashed(file, current_app.config['UPLOAD_FOLDER'])
+
                 # SAVE TO DB WITH 'uploads/' PREFIX
                 user.profile_picture = f"images/uploads/{unique_filename}"
                 session['profile_picture'] = user.profile_picture
@@ -898,6 +895,8 @@ def profile():
         # 5. Commit changes
         try:
             db.session.commit()
+            if old_picture != user.profile_picture:
+                release_upload(old_picture)
             flash('Profile updated successfully!', 'success')
         except Exception as e:
             db.session.rollback()
@@ -913,17 +912,21 @@ def profile():
                 flash(f"{getattr(form, field).label.text}: {error}", 'danger')
 
     # Get paired youth buddy info for display
-    pair = Pair.query.filter_by(senior_id=user.id, status='active').first()
-    buddy = User.query.get(pair.youth_id) if pair else None
+    pair = get_current_pair()
+    buddy = get_current_buddy()
+
+    stories_count = Story.query.filter_by(user_id=user.id).count()
+    messages_sent = Message.query.filter_by(sender_id=user.id).count()
 
-    return render_template('senior/profile.html', user=user, form=form, buddy=buddy)
+    return render_template('senior/profile.html', user=user, form=form, buddy=buddy,
+                           stories_count=stories_count, messages_sent=messages_sent)
 
 
 @senior_bp.route('/users/<int:user_id>')
 @login_required
 def public_profile(user_id):
     """View another user's public profile."""
-    user = User.query.get_or_404(user_id)
+    user = get_user(user_id) or abort(404)
     
     # Get public stats
     stories_count = Story.query.filter_by(user_id=user.id).count()
@@ -932,12 +935,6 @@ def public_profile(user_id):
     badges = []
     if user.role == 'youth':
         earned_badges = Badge.query.filter_by(user_id=user.id).all()
-        BADGE_ICONS = {
-            'First Steps': '🌟', 'Story Keeper': '📖', 'Tech Wizard': '💻',
-            'Game Master': '🎮', 'Community Builder': '🏘️', 'Event Organizer': '📅',
-            'Heritage Champion': '🏛️', 'Conversation Partner': '💬',
-            'Week Warrior': '🔥', 'Month Master': '🏆', 'Century Champion': '💯', 'Year Legend': '👑'
-        }
         badges = [{'title': b.badge_type, 'icon': BADGE_ICONS.get(b.badge_type, '🏅')} for b in earned_badges]
     
     # Get recent stories
@@ -955,8 +952,6 @@ def public_profile(user_id):
 def checkin():
     """Weekly mood check-in for seniors."""
     if request.method == 'POST':
-        from models import Checkin
-
         mood = request.form.get('mood')
         notes = request.form.get('notes')
 
@@ -983,7 +978,7 @@ def save_accessibility_settings():
     API to save accessibility preferences.
     """
     data = request.get_json()
-    user = User.query.get(session['user_id'])
+    user = get_current_user()
     
     settings = {
         'font_size': data.get('font_size', 'normal'),
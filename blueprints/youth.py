@@ -8,19 +8,42 @@ Description: Handles all routes for youth volunteers including story engagement,
              messaging with senior buddies, badge tracking, and theme customization
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app
-from models import db, User, Story, Message, Event, Community, Pair, Badge, StoryReaction, StoryComment, EventParticipant, CommunityMember, Game, GameSession, CommunityPost, ChatReport
-from forms import MessageForm, StoryForm
-from datetime import datetime, timedelta
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app, abort
+from models import (
+    db, User, Story, Message, Event, Community, Pair, Badge, StoryReaction, StoryComment,
+    EventParticipant, CommunityMember, Game, GameSession, CommunityPost, ChatReport, Streak,
+    GameHistory
+)
+from forms import MessageForm, StoryForm, ProfileForm
+from datetime import datetime
 from functools import wraps
 from werkzeug.utils import secure_filename
-from utils import filter_text
+from sqlalchemy import and_, case, delete, desc, distinct, func, select, update
+from sqlalchemy.orm import joinedload, load_only, selectinload
+from utils import (
+    cache, filter_text, strict_loading, get_current_user, get_current_pair, get_current_buddy,
+    no_autoflush, save_upload_hashed, release_upload, contains_unkind_words, conversation_select,
+    get_recent_stories, get_story_feed, invalidate_story_cache, get_story_engagement, invalidate_conversation_cache,
+    get_message_translations, delete_upload_async, BADGE_ICONS, player_sessions_select, get_game_summary,
+    get_user, queue_notification, message_poll_response, get_game_session_or_404, GAME_PAGES,
+    toggle_event_registration, toggle_community_membership, toggle_story_reaction
+)
 import os
+import orjson
 
 # Create youth blueprint
 youth_bp = Blueprint('youth', __name__)
 
 
+# ==================== QUERY HELPERS ====================
+def _count(column, *criteria):
+    """
+    COUNT(column) WHERE criteria as a scalar subquery, so several counts can
+    be selected side by side in one round trip.
+    """
+    return select(func.count(column)).where(*criteria).scalar_subquery()
+
+
 # ==================== AUTHENTICATION DECORATOR ====================
 def login_required(f):
     """
@@ -29,41 +52,51 @@ def login_required(f):
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
+        # Fast path: a logged-in youth user goes straight through on one
+        # role lookup; url_for/flash are only reached on the failure branches
+        sess = session
+        if sess.get('role') == 'youth' and 'user_id' in sess:
+            return f(*args, **kwargs)
+        if 'user_id' not in sess:
             flash('Please login to access this page', 'warning')
             return redirect(url_for('auth.login', role='youth'))
-        if session.get('role') != 'youth':
-            flash('Access denied. Youth account required.', 'danger')
-            return redirect(url_for('index'))
-        return f(*args, **kwargs)
+        flash('Access denied. Youth account required.', 'danger')
+        return redirect(url_for('index'))
     return decorated_function
 
 
 # ==================== DASHBOARD ====================
 @youth_bp.route('/dashboard')
 @login_required
+@no_autoflush
 def dashboard():
     """
     Youth dashboard - main page after login.
     Shows recent stories, stats, and quick actions.
     """
-    user = User.query.get(session['user_id'])
+    user = get_current_user()
 
     # Get paired senior buddy
-    pair = Pair.query.filter_by(youth_id=user.id, status='active').first()
-    buddy = User.query.get(pair.senior_id) if pair else None
+    pair = get_current_pair()
+    buddy = get_current_buddy()
 
-    # Get recent stories from all seniors
-    recent_stories = Story.query.order_by(Story.created_at.desc()).limit(10).all()
+    # Get recent stories from all seniors (shared by every user, so cached)
+    recent_stories = get_recent_stories(10)
 
-    # Get user badges
-    badges = Badge.query.filter_by(user_id=user.id).count()
+    # Get user badge and sent-message counts in one round trip
+    badges, messages_sent = db.session.execute(select(
+        _count(Badge.id, Badge.user_id == user.id),
+        _count(Message.id, Message.sender_id == user.id)
+    )).one()
+    recent_badges = Badge.query.filter_by(user_id=user.id).limit(3).all()
 
     return render_template('youth/dashboard.html',
                          user=user,
                          buddy=buddy,
                          recent_stories=recent_stories,
-                         badges_count=badges)
+                         badges_count=badges,
+                         messages_sent=messages_sent,
+                         recent_badges=recent_badges)
 
 
 # ==================== STORY FEED ====================
@@ -74,8 +107,9 @@ def stories():
     user_id = session['user_id']
     stories = Story.query.filter_by(user_id=user_id)\
         .order_by(Story.created_at.desc()).all()
+    engagement = get_story_engagement(stories)
 
-    return render_template('youth/stories.html', stories=stories)
+    return render_template('youth/stories.html', stories=stories, engagement=engagement)
 
 
 @youth_bp.route('/create_story', methods=['GET', 'POST'])
@@ -101,9 +135,6 @@ def create_story():
                 # Check extension
                 ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
                 if ext in current_app.config['ALLOWED_EXTENSIONS']:
-                    # Ensure upload directory exists
-                    os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
-                    
                     # Save file with unique name
                     timestamp = datetime.now().strftime('%Y%m%d%H%M%S_')
                     unique_filename = timestamp + filename
@@ -113,6 +144,7 @@ def create_story():
 
         db.session.add(new_story)
         db.session.commit()
+        invalidate_story_cache()
 
         flash('Story created successfully!', 'success')
         return redirect(url_for('youth.stories'))
@@ -151,23 +183,18 @@ def edit_story(story_id):
                 filename = secure_filename(file.filename)
                 ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
                 if ext in current_app.config['ALLOWED_EXTENSIONS']:
-                    os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
                     timestamp = datetime.now().strftime('%Y%m%d%H%M%S_')
                     unique_filename = timestamp + filename
                     file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename))
                     
-                    # Delete old photo if exists
+                    # Delete old photo if exists (off the request thread)
                     if story.photo_url:
-                        old_path = os.path.join(current_app.config['UPLOAD_FOLDER'], story.photo_url)
-                        if os.path.exists(old_path):
-                            try:
-                                os.remove(old_path)
-                            except OSError:
-                                pass
+                        delete_upload_async(os.path.join(current_app.config['UPLOAD_FOLDER'], story.photo_url))
                                 
                     story.photo_url = unique_filename
         
         db.session.commit()
+        invalidate_story_cache()
         flash('Story updated successfully!', 'success')
         return redirect(url_for('youth.stories'))
 
@@ -184,14 +211,14 @@ def delete_story(story_id):
         return {'success': False, 'message': 'Unauthorized'}, 403
         
     try:
-        # Delete photo file if exists
-        if story.photo_url:
-            path = os.path.join(current_app.config['UPLOAD_FOLDER'], story.photo_url)
-            if os.path.exists(path):
-                os.remove(path)
-                
+        photo_url = story.photo_url
         db.session.delete(story)
         db.session.commit()
+
+        # Delete photo file if exists - once the row is gone, off the request thread
+        if photo_url:
+            delete_upload_async(os.path.join(current_app.config['UPLOAD_FOLDER'], photo_url))
+        invalidate_story_cache()
         return {'success': True}
     except Exception as e:
         db.session.rollback()
@@ -200,25 +227,33 @@ def delete_story(story_id):
 
 @youth_bp.route('/story_feed')
 @login_required
+@no_autoflush
 def story_feed():
     """Instagram-style story feed with all senior stories."""
     # Get filters from query parameters
     category_filter = request.args.get('category', 'all')
     role_filter = request.args.get('role', 'all')
 
-    # Query stories with user join for role filtering
-    query = Story.query.join(User)
-
-    if category_filter != 'all':
-        query = query.filter(Story.category == category_filter)
-    
-    if role_filter != 'all':
-        query = query.filter(User.role == role_filter)
-
-    stories = query.order_by(Story.created_at.desc()).all()
+    # Stories are the same for everyone (cached); only the viewer's own
+    # likes are per-user, fetched as one set instead of a query per card
+    # ?before=<id> is the keyset cursor for older pages
+    before = request.args.get('before', type=int)
+    stories = get_story_feed(category_filter, role_filter, before)
+    # A full page means there may be more; the last id is the next cursor
+    next_cursor = stories[-1]['id'] if len(stories) >= current_app.config['STORY_FEED_LIMIT'] else None
+    # Which stories on this page the user has liked (not every heart ever given)
+    liked_story_ids = {
+        story_id for (story_id,) in db.session.query(StoryReaction.story_id).filter(
+            StoryReaction.story_id.in_([story['id'] for story in stories]),
+            StoryReaction.user_id == session['user_id'],
+            StoryReaction.reaction_type == 'heart'
+        )
+    }
 
     return render_template('youth/story_feed.html',
                          stories=stories,
+                         liked_story_ids=liked_story_ids,
+                         next_cursor=next_cursor,
                          current_category=category_filter,
                          current_role=role_filter)
 
@@ -227,9 +262,21 @@ def story_feed():
 @login_required
 def story_detail(story_id):
     """Full story view with reactions and comments."""
-    story = Story.query.get_or_404(story_id)
+    # Comments (and their authors) are loaded up front - Story.comments is
+    # lazy='raise', so the template can't trigger a query per comment
+    story = db.session.get(Story, story_id, options=[
+        joinedload(Story.user),
+        selectinload(Story.comments).joinedload(StoryComment.user)
+    ]) or abort(404)
+
+    # SELECT EXISTS(...) - short-circuits without building a reaction object
+    user_liked = db.session.query(StoryReaction.query.filter_by(
+        story_id=story_id,
+        user_id=session['user_id'],
+        reaction_type='heart'
+    ).exists()).scalar()
 
-    return render_template('youth/story_detail.html', story=story)
+    return render_template('youth/story_detail.html', story=story, user_liked=user_liked)
 
 
 # ==================== MESSAGES ====================
@@ -240,12 +287,12 @@ def messages():
     user_id = session['user_id']
 
     # Get paired senior buddy
-    pair = Pair.query.filter_by(youth_id=user_id, status='active').first()
+    pair = get_current_pair()
     if not pair:
         flash('You are not currently paired with a senior', 'info')
         return render_template('youth/messages.html', buddy=None, messages=[])
 
-    buddy = User.query.get(pair.senior_id)
+    buddy = get_current_buddy()
     
     form = MessageForm()
 
@@ -253,12 +300,7 @@ def messages():
         original_content = form.message.data
         
         # Check for unkind words (Flagging based on original)
-        is_flagged = False
-        unkind_words = current_app.config.get('UNKIND_WORDS', [])
-        for word in unkind_words:
-            if word.lower() in original_content.lower():
-                is_flagged = True
-                break
+        is_flagged = contains_unkind_words(original_content)
         
         # Filter content
         content = filter_text(original_content)
@@ -277,6 +319,7 @@ def messages():
         pair.last_interaction = datetime.utcnow()
         
         db.session.commit()
+        invalidate_conversation_cache(user_id, buddy.id)
         
         if is_flagged:
             flash('Your message was sent but flagged for review due to potentially unkind language.', 'warning')
@@ -284,12 +327,20 @@ def messages():
         return redirect(url_for('youth.messages'))
 
     # Get messages between youth and senior
-    messages = Message.query.filter(
-        ((Message.sender_id == user_id) & (Message.recipient_id == buddy.id)) |
-        ((Message.sender_id == buddy.id) & (Message.recipient_id == user_id))
-    ).order_by(Message.created_at).all()
+    # (shared UNION ALL over ix_msg_conv). The template only reads Message
+    # columns; strict_loading makes any future relationship access fail
+    # fast in debug rather than quietly lazy-loading per message.
+    messages = db.session.scalars(
+        select(Message).options(*strict_loading())
+        .from_statement(conversation_select(user_id, buddy.id, Message).order_by('created_at'))
+    ).all()
+
+    # Stored translations for the page, fetched together (none to fetch
+    # when the whole conversation is in the default language)
+    translations = get_message_translations((m.id, m.original_language) for m in messages)
 
-    return render_template('youth/messages.html', buddy=buddy, messages=messages, form=form)
+    return render_template('youth/messages.html', buddy=buddy, messages=messages,
+                           translations=translations, form=form)
 
 
 @youth_bp.route('/api/messages')
@@ -300,34 +351,12 @@ def get_messages_json():
     Used by the frontend polling script (chat.js) to update the chat window
     without reloading the entire page.
     """
-    user_id = session['user_id']
-    
     # Check if user has a buddy
-    pair = Pair.query.filter_by(youth_id=user_id, status='active').first()
+    pair = get_current_pair()
     if not pair:
         return {'messages': []}
 
-    buddy_id = pair.senior_id
-
-    # Query all messages between the user and their buddy
-    # Ordered by creation time to show conversation history
-    messages = Message.query.filter(
-        ((Message.sender_id == user_id) & (Message.recipient_id == buddy_id)) |
-        ((Message.sender_id == buddy_id) & (Message.recipient_id == user_id))
-    ).order_by(Message.created_at).all()
-
-    # Convert message objects to a list of dictionaries (JSON-serializable)
-    messages_data = [{
-        'id': msg.id,
-        'content': msg.content,
-        'sender_id': msg.sender_id,
-        'is_me': msg.sender_id == user_id,
-        'created_at': (msg.created_at + timedelta(hours=8)).strftime('%I:%M %p'), # Format: 02:30 PM
-        'is_flagged': msg.is_flagged,
-        'translated_content': msg.translated_content if msg.original_language != 'en' else None
-    } for msg in messages]
-
-    return {'messages': messages_data}
+    return message_poll_response(session['user_id'], pair.senior_id)
 
 
 @youth_bp.route('/api/messages/<int:message_id>/report', methods=['POST'])
@@ -381,20 +410,26 @@ def report_community_post(post_id):
 # ==================== EVENTS ====================
 @youth_bp.route('/events')
 @login_required
+@no_autoflush
 def events():
     """Display all available events."""
     user_id = session['user_id']
     
-    # Get all upcoming events
-    upcoming_events = Event.query.filter(Event.date >= datetime.utcnow()).order_by(Event.date).all()
+    # Get all upcoming events together with their participant counts
+    # (one grouped query instead of two COUNTs per event)
+    upcoming_events = db.session.query(Event, func.count(EventParticipant.user_id)).outerjoin(
+        EventParticipant, EventParticipant.event_id == Event.id
+    ).filter(Event.date >= datetime.utcnow()).group_by(Event.id).order_by(Event.date).all()
     
-    # Get IDs of events user is registered for
-    registered_event_ids = [p.event_id for p in EventParticipant.query.filter_by(user_id=user_id).all()]
+    # Get IDs of events user is registered for (set for O(1) lookups)
+    registered_event_ids = {
+        event_id for (event_id,) in db.session.query(EventParticipant.event_id).filter_by(user_id=user_id)
+    }
     
     # Process events for display
     events_data = []
     my_events = []
-    for event in upcoming_events:
+    for event, participants_count in upcoming_events:
         is_registered = event.id in registered_event_ids
         
         event_dict = {
@@ -405,9 +440,9 @@ def events():
             'location': event.location,
             'date': event.date,
             'capacity': event.capacity,
-            'participants_count': event.participants.count(),
+            'participants_count': participants_count,
             'is_registered': is_registered,
-            'is_full': event.capacity is not None and event.participants.count() >= event.capacity
+            'is_full': event.capacity is not None and participants_count >= event.capacity
         }
         events_data.append(event_dict)
         if is_registered:
@@ -420,86 +455,60 @@ def events():
 @login_required
 def register_event(event_id):
     """Toggle event registration for the user."""
-    
-    event = Event.query.get_or_404(event_id)
-    user_id = session['user_id']
-    
-    registration = EventParticipant.query.filter_by(
-        event_id=event_id,
-        user_id=user_id
-    ).first()
-    
-    status = ''
-    
-    if registration:
-        # Unregister
-        db.session.delete(registration)
-        status = 'unregistered'
-    else:
-        # Check capacity
-        if event.capacity is not None and event.participants.count() >= event.capacity:
-            return {'success': False, 'message': 'Event is full'}, 400
-        
-        # Register
-        new_registration = EventParticipant(event_id=event_id, user_id=user_id)
-        db.session.add(new_registration)
-        status = 'registered'
-        
-    db.session.commit()
-    
-    return {
-        'success': True,
-        'status': status,
-        'participant_count': event.participants.count()
-    }
+    return toggle_event_registration(event_id, session['user_id'])
 
 
 # ==================== COMMUNITIES ====================
+# Community type -> (stat label, stat icon) shown on the communities page
+COMM_TYPE_STATS = {
+    'Story': ('stories', 'fas fa-book'),
+    'Learning': ('sessions', 'fas fa-laptop'),
+    'Hobby': ('activities', 'fas fa-star'),
+}
+_DEFAULT_COMM_STATS = ('posts', 'fas fa-comment')
+
+
 @youth_bp.route('/communities')
 @login_required
+@no_autoflush
 def communities():
     """Display all communities with search and unread counts."""
     search_query = request.args.get('q', '')
     user_id = session['user_id']
     
-    query = Community.query
+    # One aggregated query for every card: the user's membership (outer join
+    # on their own CommunityMember row), total posts, and unread posts since
+    # they last viewed. Cards only use Community columns - strict_loading
+    # fails fast in debug if that changes.
+    last_seen = func.coalesce(CommunityMember.last_viewed_at, CommunityMember.joined_at)
+    query = db.session.query(
+        Community,
+        CommunityMember.user_id.isnot(None).label('joined'),
+        func.count(CommunityPost.id).label('stat_count'),
+        func.sum(case((CommunityPost.created_at > last_seen, 1), else_=0)).label('unread')
+    ).outerjoin(
+        CommunityMember,
+        and_(CommunityMember.community_id == Community.id, CommunityMember.user_id == user_id)
+    ).outerjoin(
+        CommunityPost, CommunityPost.community_id == Community.id
+    ).options(*strict_loading()).group_by(Community.id, CommunityMember.user_id)
+
     if search_query:
         query = query.filter(Community.name.ilike(f'%{search_query}%') | 
                              Community.description.ilike(f'%{search_query}%'))
     
-    all_communities = query.all()
-    
     my_communities = []
     other_communities = []
     
-    for comm in all_communities:
-        member = CommunityMember.query.filter_by(community_id=comm.id, user_id=user_id).first()
-        comm.is_joined = member is not None
+    for comm, joined, stat_count, unread in query.all():
+        comm.is_joined = joined
         
-        # Determine stats label/icon based on type
-        if comm.type == 'Story':
-            comm.stat_label = 'stories'
-            comm.stat_icon = 'fas fa-book'
-        elif comm.type == 'Learning':
-            comm.stat_label = 'sessions'
-            comm.stat_icon = 'fas fa-laptop'
-        elif comm.type == 'Hobby':
-            comm.stat_label = 'activities'
-            comm.stat_icon = 'fas fa-star'
-        else:
-            comm.stat_label = 'posts'
-            comm.stat_icon = 'fas fa-comment'
-            
-        comm.stat_count = comm.posts.count()
+        # Determine stats label/icon based on type (single dict lookup)
+        comm.stat_label, comm.stat_icon = COMM_TYPE_STATS.get(comm.type, _DEFAULT_COMM_STATS)
+        comm.stat_count = stat_count
         
         if comm.is_joined:
-            # Calculate unread posts
-            last_viewed = member.last_viewed_at or member.joined_at
-            unread = CommunityPost.query.filter(
-                CommunityPost.community_id == comm.id,
-                CommunityPost.created_at > last_viewed
-            ).count()
-            comm.unread_count = unread
+            comm.unread_count = unread or 0
             my_communities.append(comm)
         else:
             other_communities.append(comm)
@@ -517,25 +526,43 @@ def view_community(community_id):
     community = Community.query.get_or_404(community_id)
     user_id = session['user_id']
     
-    # Check membership
-    member = CommunityMember.query.filter_by(
-        community_id=community_id, 
-        user_id=user_id
+    # Membership check plus "anything posted since the last visit?" in one
+    # read. last_viewed_at only feeds the unread counts, so it is written
+    # only when there is something new to mark read - re-opening a quiet
+    # chat stays a read-only request.
+    last_seen = func.coalesce(CommunityMember.last_viewed_at, CommunityMember.joined_at)
+    membership = db.session.query(
+        CommunityMember.joined_at,
+        select(CommunityPost.id).where(
+            CommunityPost.community_id == community_id,
+            CommunityPost.created_at > last_seen
+        ).exists()
+    ).filter(
+        CommunityMember.community_id == community_id, CommunityMember.user_id == user_id
     ).first()
-    
-    if not member:
+    if membership is None:
         flash('You must join this community to view the chat.', 'warning')
         return redirect(url_for('youth.communities'))
-        
-    # Update last_viewed_at
-    member.last_viewed_at = datetime.utcnow()
-    db.session.commit()
+
+    _, has_unread = membership
+    if has_unread:
+        db.session.execute(
+            update(CommunityMember)
+            .where(CommunityMember.community_id == community_id,
+                   CommunityMember.user_id == user_id)
+            .values(last_viewed_at=datetime.utcnow())
+        )
+        db.session.commit()
         
     # Get recent posts for the chat history
-    posts = CommunityPost.query.filter_by(community_id=community_id)\
+    # Authors are loaded up front (the template shows each poster's avatar
+    # and name); anything else touched lazily raises in debug
+    posts = CommunityPost.query.options(*strict_loading(selectinload(CommunityPost.user)))\
+        .filter_by(community_id=community_id)\
         .order_by(CommunityPost.created_at.asc()).all()
         
-    members = community.members.all()
+    members = CommunityMember.query.options(*strict_loading(selectinload(CommunityMember.user)))\
+        .filter_by(community_id=community_id).all()
     return render_template('youth/community_chat.html', community=community, posts=posts, user_id=user_id, members=members)
 
 
@@ -551,12 +578,10 @@ def upload_community_photo(community_id):
         return {'error': 'No selected file'}, 400
         
     if file and file.filename:
-        filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S_')
-        unique_filename = f"chat_{community_id}_{timestamp}{filename}"
-        
-        os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
-        file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename))
+        # Streamed to a temp file in chunks and atomically renamed to its
+        # content hash, so the photo is never held in memory whole and a
+        # half-written file is never visible under its final name
+        unique_filename = save_upload_hashed(file, current_app.config['UPLOAD_FOLDER'])
         
         return {'url': f"images/uploads/{unique_filename}"}
     
@@ -567,75 +592,90 @@ def upload_community_photo(community_id):
 @login_required
 def join_community(community_id):
     """Toggle community membership."""
-    
-    community = Community.query.get_or_404(community_id)
-    user_id = session['user_id']
-    
-    # Check existing membership
-    membership = CommunityMember.query.filter_by(
-        community_id=community_id,
-        user_id=user_id
-    ).first()
-    
-    status = 'joined'
-    
-    if membership:
-        # Leave community
-        db.session.delete(membership)
-        community.member_count = max(0, community.member_count - 1)
-        status = 'left'
-    else:
-        # Join community
-        new_member = CommunityMember(
-            community_id=community_id,
-            user_id=user_id
-        )
-        db.session.add(new_member)
-        community.member_count += 1
-        status = 'joined'
-        
-    db.session.commit()
-    
-    return {
-        'success': True,
-        'status': status,
-        'member_count': community.member_count
-    }
+    return toggle_community_membership(community_id, session['user_id'])
 
 
 # ==================== BADGES ====================
+# Fixed badge definitions, built once at import, as
+# (title, desc, icon, target, source) tuples. 'source' is either the name of
+# the progress-query column in api_badges_summary that tracks the badge, or
+# a fixed placeholder count for badges we don't track yet.
+MASTER_BADGES = (
+    ('First Steps', 'Complete your first volunteer session', '🌟', 1, 'events'),
+    ('Story Keeper', 'Document 5 senior life stories', '📖', 5, 'stories'),
+    ('Tech Wizard', 'Help 10 seniors with technology', '💻', 10, 4),
+    ('Game Master', 'Facilitate 15 game sessions', '🎮', 15, 'games'),
+    ('Community Builder', 'Join 5 volunteer communities', '🏘️', 5, 'communities'),
+    ('Event Organizer', 'Organize 3 volunteer events', '📅', 3, 0),
+    ('Heritage Champion', 'Participate in 5 heritage activities', '🏛️', 5, 1),
+    ('Conversation Partner', 'Have 20 meaningful conversations', '💬', 20, 'messages')
+)
+
+# Volunteer-hour milestones (locked/unlocked is worked out per user)
+MILESTONES = (
+    {'title': 'Bronze Volunteer', 'hours': 10, 'desc': "You've taken your first steps in volunteering! Keep up the great work."},
+    {'title': 'Silver Volunteer', 'hours': 25, 'desc': "You're making a real difference in the community. Seniors appreciate your dedication!"},
+    {'title': 'Gold Volunteer', 'hours': 50, 'desc': "Outstanding commitment! You're on track to reach this milestone soon."},
+    {'title': 'Platinum Volunteer', 'hours': 100, 'desc': "Elite volunteer status. Your impact on the community is incredible!"},
+    {'title': 'Diamond Volunteer', 'hours': 200, 'desc': "The highest honor. You're a true champion for intergenerational connections!"}
+)
+
+
 @youth_bp.route('/badges')
 @login_required
 def badges():
-    """Display earned badges and achievements."""
+    """
+    Display earned badges and achievements.
+    Renders a light shell; the page fetches its data from /api/badges_summary.
+    """
+    return render_template('youth/badges.html', user=get_current_user())
+
+
+@youth_bp.route('/api/badges_summary')
+@login_required
+@cache.cached(timeout=30, key_prefix=lambda: f"bsum:{session['user_id']}")
+@no_autoflush
+def api_badges_summary():
+    """
+    API endpoint returning badges, stats, milestones and leaderboard as JSON.
+    Cached per user for 30 seconds since the numbers change slowly.
+    """
     user_id = session['user_id']
-    user = User.query.get(user_id)
 
     # Get earned badges
     earned_badges = Badge.query.filter_by(user_id=user_id).all()
-    earned_types = [b.badge_type for b in earned_badges]
-
-    # Define all possible badges
-    MASTER_BADGES = [
-        {'title': 'First Steps', 'desc': 'Complete your first volunteer session', 'icon': '🌟', 'target': 1, 'current': 1 if 'First Steps' in earned_types else 0},
-        {'title': 'Story Keeper', 'desc': 'Document 5 senior life stories', 'icon': '📖', 'target': 5, 'current': 5 if 'Story Keeper' in earned_types else 2},
-        {'title': 'Tech Wizard', 'desc': 'Help 10 seniors with technology', 'icon': '💻', 'target': 10, 'current': 10 if 'Tech Wizard' in earned_types else 4},
-        {'title': 'Game Master', 'desc': 'Facilitate 15 game sessions', 'icon': '🎮', 'target': 15, 'current': 9 if 'Game Master' not in earned_types else 15},
-        {'title': 'Community Builder', 'desc': 'Join 5 volunteer communities', 'icon': '🏘️', 'target': 5, 'current': 3 if 'Community Builder' not in earned_types else 5},
-        {'title': 'Event Organizer', 'desc': 'Organize 3 volunteer events', 'icon': '📅', 'target': 3, 'current': 0 if 'Event Organizer' not in earned_types else 3},
-        {'title': 'Heritage Champion', 'desc': 'Participate in 5 heritage activities', 'icon': '🏛️', 'target': 5, 'current': 5 if 'Heritage Champion' in earned_types else 1},
-        {'title': 'Conversation Partner', 'desc': 'Have 20 meaningful conversations', 'icon': '💬', 'target': 20, 'current': 15 if 'Conversation Partner' not in earned_types else 20}
-    ]
-
-    # Process badges for template
+    earned_types = {b.badge_type for b in earned_badges}
+
+    # Real progress counts for the activity-based badges, all in one round
+    # trip (each column is a COUNT subquery)
+    progress = db.session.query(
+        _count(EventParticipant.event_id, EventParticipant.user_id == user_id).label('events'),
+        _count(Story.id, Story.user_id == user_id).label('stories'),
+        _count(GameSession.id, (GameSession.player1_id == user_id) | (GameSession.player2_id == user_id)).label('games'),
+        _count(CommunityMember.community_id, CommunityMember.user_id == user_id).label('communities'),
+        _count(Message.id, Message.sender_id == user_id).label('messages')
+    ).one()
+
+    # Per-user state on top of the fixed definitions: tracked badges read
+    # their progress column, the rest keep their placeholder; an earned badge
+    # always shows as complete
     processed_badges = []
-    for mb in MASTER_BADGES:
-        mb['is_earned'] = mb['current'] >= mb['target']
-        mb['progress_pct'] = min(100, int((mb['current'] / mb['target']) * 100))
-        processed_badges.append(mb)
+    for title, desc, icon, target, source in MASTER_BADGES:
+        # One set lookup decides the state; integer math for the percentage
+        if title in earned_types:
+            current = target
+        elif isinstance(source, str):
+            current = getattr(progress, source)
+        else:
+            current = source
+        processed_badges.append({
+            'title': title, 'desc': desc, 'icon': icon,
+            'target': target, 'current': current,
+            'is_earned': current >= target,
+            'progress_pct': min(100, current * 100 // target)
+        })
 
     # Get streak and points
-    from models import Streak
     streak = Streak.query.filter_by(user_id=user_id).first()
     points = streak.points if streak else 0
     
@@ -643,56 +683,62 @@ def badges():
     stats = {
         'hours': int(points / 10), # Derived from points
         'badges_count': len(earned_badges),
-        'events_attended': EventParticipant.query.filter_by(user_id=user_id).count() or 24, # Mock if 0
+        'events_attended': progress.events or 24, # Mock if 0
         'seniors_helped': int(points / 30) or 15 # Derived
     }
 
     # Milestones (fixed definitions, dynamic status)
-    MILESTONES = [
-        {'title': 'Bronze Volunteer', 'hours': 10, 'desc': "You've taken your first steps in volunteering! Keep up the great work."},
-        {'title': 'Silver Volunteer', 'hours': 25, 'desc': "You're making a real difference in the community. Seniors appreciate your dedication!"},
-        {'title': 'Gold Volunteer', 'hours': 50, 'desc': "Outstanding commitment! You're on track to reach this milestone soon."},
-        {'title': 'Platinum Volunteer', 'hours': 100, 'desc': "Elite volunteer status. Your impact on the community is incredible!"},
-        {'title': 'Diamond Volunteer', 'hours': 200, 'desc': "The highest honor. You're a true champion for intergenerational connections!"}
-    ]
-    for m in MILESTONES:
-        m['is_locked'] = stats['hours'] < m['hours']
+    milestones = [{**m, 'is_locked': stats['hours'] < m['hours']} for m in MILESTONES]
 
     # Leaderboard (Top 5 youth by points)
-    from models import Streak
-    leaderboard = []
+    # One grouped query returns each user's points, badge count and event
+    # count - DISTINCT because the two outer joins fan out against each other.
+    # Only the User columns the entries need are selected.
+    top_youth = db.session.query(
+        User,
+        func.coalesce(Streak.points, 0).label('points'),
+        func.count(distinct(Badge.id)).label('badge_count'),
+        func.count(distinct(EventParticipant.event_id)).label('event_count')
+    ).outerjoin(Streak, Streak.user_id == User.id)\
+     .outerjoin(Badge, Badge.user_id == User.id)\
+     .outerjoin(EventParticipant, EventParticipant.user_id == User.id)\
+     .options(load_only(User.id, User.full_name, User.profile_picture))\
+     .filter(User.role == 'youth')\
+     .group_by(User.id, Streak.points)\
+     .order_by(func.coalesce(Streak.points, 0).desc())\
+     .limit(5).all()
     
-    # Get all youth users with mock data like other parts of the app
-    all_youth = User.query.filter_by(role='youth').all()
-    
-    for i, u in enumerate(all_youth[:5]):
-        leaderboard.append({
-            'rank': i + 1,
-            'name': u.full_name,
-            'is_me': u.id == user_id,
-            'avatar': u.profile_picture,
-            'events': 24 - i if u.id == user_id else (20 + i),
-            'badges': len(earned_badges) if u.id == user_id else (3 + i),
-            'hours': stats['hours'] if u.id == user_id else (45 - i * 5)
-        })
-
-    return render_template('youth/badges.html',
-                         user=user,
-                         badges=processed_badges,
-                         stats=stats,
-                         milestones=MILESTONES,
-                         leaderboard=leaderboard)
+    # Avatars are resolved to URLs here (None = show the initial instead)
+    fix_pfp = current_app.jinja_env.filters['fix_pfp']
+    leaderboard = [{
+        'rank': i + 1,
+        'name': u.full_name,
+        'is_me': u.id == user_id,
+        'avatar_url': None if 'default-avatar' in (u.profile_picture or 'default-avatar')
+                      else url_for('static', filename=fix_pfp(u.profile_picture)),
+        'events': event_count,
+        'badges': badge_count,
+        'hours': int(u_points / 10) # Same derivation as stats['hours']
+    } for i, (u, u_points, badge_count, event_count) in enumerate(top_youth)]
+
+    return current_app.response_class(orjson.dumps({
+        'badges': processed_badges,
+        'stats': stats,
+        'milestones': milestones,
+        'leaderboard': leaderboard
+    }), mimetype='application/json')
 
 
 # ==================== PROFILE ====================
 @youth_bp.route('/profile', methods=['GET', 'POST'])
 @login_required
 def profile():
-    user = User.query.get(session['user_id'])
-    from forms import ProfileForm
+    user = get_current_user()
     form = ProfileForm(obj=user)
 
     if form.validate_on_submit():
+        old_picture = user.profile_picture
+
         # 1. Update basic information
         user.full_name = form.full_name.data
         session['full_name'] = user.full_name
@@ -709,24 +755,11 @@ def profile():
             
             filename = secure_filename(file.filename)
             if filename: # Ensure filename is not empty
-                # Ensure upload directory exists
-                os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
-                
-                timestamp = datetime.now().strftime('%Y%m%d%H%M%S_')
-                unique_filename = f"profile_{user.id}_{timestamp}{filename}"
-                
-                file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], unique_filename))
-                
-                # DELETE OLD PICTURE
-                if user.profile_picture and 'default-avatar' not in user.profile_picture:
-                    old_filename = os.path.basename(user.profile_picture)
-                    old_path = os.path.join(current_app.config['UPLOAD_FOLDER'], old_filename)
-                    if os.path.exists(old_path):
-                        try:
-                            os.remove(old_path)
-                        except OSError:
-                            pass
-                            
+                # Stream to disk under a content-hashed name. The old picture
+                # is released after the commit below (hashed files may be
+                # shared, so only once nothing else references it)
+                unique_filename = save_upload_hashed(file, current_app.config['UPLOAD_FOLDER'])
+
                 # SAVE TO DB
                 user.profile_picture = f"images/uploads/{unique_filename}"
                 session['profile_picture'] = user.profile_picture
@@ -734,6 +767,8 @@ def profile():
         # 3. Commit changes
         try:
             db.session.commit()
+            if old_picture != user.profile_picture:
+                release_upload(old_picture)
             flash('Profile updated successfully!', 'success')
         except Exception as e:
             db.session.rollback()
@@ -750,15 +785,17 @@ def profile():
 
     # ... [Keep the rest of the existing youth profile code below] ...
     # Get paired senior buddy info
-    pair = Pair.query.filter_by(youth_id=user.id, status='active').first()
-    buddy = User.query.get(pair.senior_id) if pair else None
+    pair = get_current_pair()
+    buddy = get_current_buddy()
 
     # Get impact stats
-    from models import StoryReaction, StoryComment, Message, Badge, Streak
-    reactions_count = StoryReaction.query.filter_by(user_id=user.id).count()
-    comments_count = StoryComment.query.filter_by(user_id=user.id).count()
-    messages_count = Message.query.filter_by(sender_id=user.id).count()
-    badges_count = Badge.query.filter_by(user_id=user.id).count()
+    # All four counts in one SELECT (each is an indexed COUNT subquery)
+    reactions_count, comments_count, messages_count, badges_count = db.session.query(
+        _count(StoryReaction.story_id, StoryReaction.user_id == user.id),
+        _count(StoryComment.id, StoryComment.user_id == user.id),
+        _count(Message.id, Message.sender_id == user.id),
+        _count(Badge.id, Badge.user_id == user.id)
+    ).one()
 
     # Calculate Top Volunteer Rank (based on points)
     all_streaks = Streak.query.order_by(Streak.points.desc()).all()
@@ -783,14 +820,15 @@ def profile():
 @login_required
 def public_profile(user_id):
     """View another user's public profile."""
-    user = User.query.get_or_404(user_id)
+    user = get_user(user_id) or abort(404)
     
     # Get public stats
-    stories_count = Story.query.filter_by(user_id=user.id).count()
-    badges_count = Badge.query.filter_by(user_id=user.id).count()
+    stories_count, badges_count = db.session.query(
+        _count(Story.id, Story.user_id == user.id),
+        _count(Badge.id, Badge.user_id == user.id)
+    ).one()
     
     # Calculate Rank
-    from models import Streak
     all_streaks = Streak.query.order_by(Streak.points.desc()).all()
     user_rank = "10+"
     for i, s in enumerate(all_streaks):
@@ -800,12 +838,6 @@ def public_profile(user_id):
 
     # Get badges
     earned_badges = Badge.query.filter_by(user_id=user.id).all()
-    BADGE_ICONS = {
-        'First Steps': '🌟', 'Story Keeper': '📖', 'Tech Wizard': '💻',
-        'Game Master': '🎮', 'Community Builder': '🏘️', 'Event Organizer': '📅',
-        'Heritage Champion': '🏛️', 'Conversation Partner': '💬',
-        'Week Warrior': '🔥', 'Month Master': '🏆', 'Century Champion': '💯', 'Year Legend': '👑'
-    }
     badges = [{'title': b.badge_type, 'icon': BADGE_ICONS.get(b.badge_type, '🏅')} for b in earned_badges]
     
     # Get recent stories
@@ -829,50 +861,7 @@ def api_react_story(story_id):
     Toggles reaction if same type exists, or updates/creates new one.
     """
     data = request.get_json()
-    reaction_type = data.get('reaction_type')
-    user_id = session['user_id']
-    
-    if not reaction_type:
-        return {'success': False, 'message': 'Missing reaction type'}, 400
-        
-    # Check for existing reaction
-    existing_reaction = StoryReaction.query.filter_by(
-        story_id=story_id,
-        user_id=user_id
-    ).first()
-    
-    if existing_reaction:
-        if existing_reaction.reaction_type == reaction_type:
-            # Toggle off (remove reaction)
-            db.session.delete(existing_reaction)
-            action = 'removed'
-        else:
-            # Change reaction type
-            existing_reaction.reaction_type = reaction_type
-            action = 'updated'
-    else:
-        # Create new reaction
-        new_reaction = StoryReaction(
-            story_id=story_id,
-            user_id=user_id,
-            reaction_type=reaction_type
-        )
-        db.session.add(new_reaction)
-        action = 'added'
-        
-    db.session.commit()
-    
-    # Get updated count for this reaction type
-    count = StoryReaction.query.filter_by(
-        story_id=story_id,
-        reaction_type=reaction_type
-    ).count()
-    
-    return {
-        'success': True,
-        'action': action,
-        'count': count
-    }
+    return toggle_story_reaction(story_id, session['user_id'], data.get('reaction_type'))
 
 
 @youth_bp.route('/api/stories/<int:story_id>/comment', methods=['POST'])
@@ -887,6 +876,10 @@ def api_comment_story(story_id):
     
     if not content or not content.strip():
         return {'success': False, 'message': 'Comment cannot be empty'}, 400
+
+    # 404 guard - only the primary key is loaded
+    if not db.session.get(Story, story_id, options=[load_only(Story.id)]):
+        abort(404)
         
     # Create new comment
     new_comment = StoryComment(
@@ -897,6 +890,7 @@ def api_comment_story(story_id):
     
     db.session.add(new_comment)
     db.session.commit()
+    invalidate_story_cache()
     
     return {'success': True}
 
@@ -909,20 +903,20 @@ def games():
     user_id = session['user_id']
 
     # Get paired senior buddy for online status/active games
-    pair = Pair.query.filter_by(youth_id=user_id, status='active').first()
-    buddy = User.query.get(pair.senior_id) if pair else None
+    pair = get_current_pair()
+    buddy = get_current_buddy()
 
     # Get active game session
-    active_session = GameSession.query.filter(
-        ((GameSession.player1_id == user_id) | (GameSession.player2_id == user_id)),
-        GameSession.status == 'active'
+    active_session = db.session.scalars(
+        select(GameSession).from_statement(
+            player_sessions_select(user_id, GameSession, statuses=('active',)).limit(1)
+        )
     ).first()
 
     # Get streak info
-    from models import Streak
     streak_info = Streak.query.filter_by(user_id=user_id).first()
     
-    user = User.query.get(user_id)
+    user = get_current_user()
     
     # Placeholder stats
     stats = {
@@ -930,12 +924,19 @@ def games():
         'won': streak_info.games_won if streak_info else 0,
         'points': streak_info.points if streak_info else 0,
         'streak': streak_info.current_streak if streak_info else 0,
-        'elo': user.elo
+        'elo': user.elo,
+        'stories': Story.query.filter_by(user_id=user_id).count()
     }
 
     # Get recent game history
-    from models import GameHistory
-    game_history = GameHistory.query.filter(
+    # The template shows each record's opponent: both seats are JOINed into
+    # this query (many-to-one, so LIMIT still applies to history rows)
+    # instead of a lazy load per row. record.game needs nothing:
+    # Game.query.all() below puts every game in the identity map before the
+    # template runs, as it does for the active session's game and players.
+    game_history = GameHistory.query.options(
+        joinedload(GameHistory.player1), joinedload(GameHistory.player2)
+    ).filter(
         (GameHistory.player1_id == user_id) | (GameHistory.player2_id == user_id)
     ).order_by(GameHistory.completed_at.desc()).limit(5).all()
 
@@ -946,6 +947,7 @@ def games():
         games_data.append({
             'id': g.id,
             'name': g.title,
+            'kind': g.kind,
             'image_class': 'game-image',
             'image_style': g.bg_gradient,
             'icon': g.icon,
@@ -972,9 +974,10 @@ def games():
 @login_required
 def challenge_buddy(game_id):
     """Create a new game session and challenge buddy."""
-    from app import socketio
+    # Flask-SocketIO registers itself on the app; no circular import needed
+    socketio = current_app.extensions['socketio']
     user_id = session['user_id']
-    pair = Pair.query.filter_by(youth_id=user_id, status='active').first()
+    pair = get_current_pair()
     if not pair:
         flash('You need a buddy to play!', 'warning')
         return redirect(url_for('youth.games'))
@@ -982,35 +985,39 @@ def challenge_buddy(game_id):
     # Check for ANY existing waiting or active session for this game between the pair
     # This ensures that if the buddy already created a session, we join it instead of creating a duplicate
     # Also allows rejoining an already active match
-    existing_sessions = GameSession.query.filter(
+    pair_sessions = (
         GameSession.game_id == game_id,
-        GameSession.status.in_(['waiting', 'active']),
+        GameSession.is_open(),
         ((GameSession.player1_id == user_id) & (GameSession.player2_id == pair.senior_id)) |
         ((GameSession.player1_id == pair.senior_id) & (GameSession.player2_id == user_id))
-    ).order_by(GameSession.created_at.desc()).all()
-
-    # Fetch game details first to determine type
-    game = Game.query.get_or_404(game_id)
+    )
+    # Only the latest session's id and status are needed, so just that row
+    # is fetched (one seek on ix_gs_open); duplicates are deleted in SQL below
+    session_to_use = db.session.execute(
+        select(GameSession.id, GameSession.status).where(*pair_sessions)
+        .order_by(GameSession.created_at.desc()).limit(1)
+    ).first()
 
-    # Determine target URL based on game type
-    target_url = 'youth.chess_game'
-    senior_url = 'senior.chess_game'
-    
-    if 'Xiangqi' in game.title:
-        target_url = 'youth.xiangqi_game'
-        senior_url = 'senior.xiangqi_game'
-    elif 'Tic Tac Toe' in game.title or 'Tic-Tac-Toe' in game.title:
-        target_url = 'youth.tictactoe_game'
-        senior_url = 'senior.tictactoe_game'
-
-    if existing_sessions:
-        # Use the most recent one
-        session_to_use = existing_sessions[0]
-        
-        # Clean up any duplicates
-        for gs in existing_sessions[1:]:
-            db.session.delete(gs)
-        db.session.commit()
+    # Fetch the game title/kind first to determine type (memoized reference data)
+    game = get_game_summary(game_id)
+    if game is None:
+        abort(404)
+    game_title, game_kind = game
+
+    # Determine target URLs (ours, then the buddy's) from the game kind
+    page = GAME_PAGES.get(game_kind, GAME_PAGES['chess'])
+    target_url, senior_url = f'youth.{page}', f'senior.{page}'
+
+    if session_to_use:
+        # Clean up any older duplicates with one bulk DELETE, and only commit
+        # when there was actually something to remove
+        removed = db.session.execute(
+            delete(GameSession)
+            .where(*pair_sessions, GameSession.id != session_to_use.id)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if removed:
+            db.session.commit()
         
         # Check if the game is already active or waiting
         if session_to_use.status == 'active':
@@ -1029,28 +1036,28 @@ def challenge_buddy(game_id):
         current_turn_id=user_id
     )
     db.session.add(new_session)
-    db.session.commit()
+    # Flush (no commit) so new_session.id is available for the notification link
+    db.session.flush()
 
-    # EMIT CHALLENGE
-    socketio.emit('game_challenge', {
-        'challenger_name': session.get('full_name'),
-        'game_title': game.title,
-        'session_id': new_session.id
-    }, room=f"user_{pair.senior_id}")
-
-    # CREATE NOTIFICATION RECORD
-    from models import Notification
-    
-    notif = Notification(
+    # CREATE NOTIFICATION RECORD (written by the commit below, together with the session)
+    queue_notification(
         user_id=pair.senior_id,
         title='Game Challenge!',
-        message=f"{session.get('full_name')} has challenged you to a game of {game.title}!",
+        message=f"{session.get('full_name')} has challenged you to a game of {game_title}!",
         type='game',
         link=url_for(senior_url, session_id=new_session.id)
     )
-    db.session.add(notif)
+    # Session + notification land in a single transaction / single commit
     db.session.commit()
-    
+
+    # EMIT CHALLENGE (after commit so the buddy can load the session straight away).
+    # Delivered from a background task so the redirect doesn't wait on it.
+    socketio.start_background_task(socketio.emit, 'game_challenge', {
+        'challenger_name': session.get('full_name'),
+        'game_title': game_title,
+        'session_id': new_session.id
+    }, room=f"user_{pair.senior_id}")
+
     return redirect(url_for(target_url, session_id=new_session.id))
 
 
@@ -1059,15 +1066,15 @@ def challenge_buddy(game_id):
 def chess_game():
     """Render the chess game page."""
     user_id = session['user_id']
-    session_id = request.args.get('session_id')
+    session_id = request.args.get('session_id', type=int)
     
-    if session_id:
-        active_session = GameSession.query.get_or_404(session_id)
-    else:
-        active_session = GameSession.query.filter(
-            ((GameSession.player1_id == user_id) | (GameSession.player2_id == user_id)),
-            GameSession.status.in_(['active', 'waiting'])
-        ).order_by(GameSession.created_at.desc()).first()
+    if not session_id:
+        # Latest open session id from either seat (UNION ALL over the per-seat indexes)
+        session_id = db.session.scalar(
+            player_sessions_select(user_id, GameSession.id, GameSession.created_at)
+            .order_by(desc('created_at')).limit(1)
+        )
+    active_session = get_game_session_or_404(session_id) if session_id else None
     
     if not active_session:
         flash('No active game session found. Please challenge your buddy!', 'warning')
@@ -1075,8 +1082,7 @@ def chess_game():
 
     color = 'white' if active_session.player1_id == user_id else 'black'
     
-    player1 = User.query.get(active_session.player1_id)
-    player2 = User.query.get(active_session.player2_id)
+    player1, player2 = active_session.player1, active_session.player2
     
     return render_template('youth/chess.html', 
                          color=color, 
@@ -1091,11 +1097,11 @@ def chess_game():
 def xiangqi_game():
     """Render the Chinese chess (Xiangqi) game page."""
     user_id = session['user_id']
-    session_id = request.args.get('session_id')
+    session_id = request.args.get('session_id', type=int)
     
     active_session = None
     if session_id:
-        active_session = GameSession.query.get_or_404(session_id)
+        active_session = get_game_session_or_404(session_id)
         # Validate user participation
         if active_session.player1_id != user_id and active_session.player2_id != user_id:
             flash('You are not part of this game.', 'danger')
@@ -1107,8 +1113,7 @@ def xiangqi_game():
     player2 = None
     if active_session:
         color = 'red' if active_session.player1_id == user_id else 'black'
-        player1 = User.query.get(active_session.player1_id)
-        player2 = User.query.get(active_session.player2_id)
+        player1, player2 = active_session.player1, active_session.player2
 
     return render_template('youth/xiangqi.html', 
                          active_session=active_session, 
@@ -1122,11 +1127,11 @@ def xiangqi_game():
 def tictactoe_game():
     """Render the Tic Tac Toe game page."""
     user_id = session['user_id']
-    session_id = request.args.get('session_id')
+    session_id = request.args.get('session_id', type=int)
     
     active_session = None
     if session_id:
-        active_session = GameSession.query.get_or_404(session_id)
+        active_session = get_game_session_or_404(session_id)
         # Validate user participation
         if active_session.player1_id != user_id and active_session.player2_id != user_id:
             flash('You are not part of this game.', 'danger')
@@ -1138,8 +1143,7 @@ def tictactoe_game():
     player2 = None
     if active_session:
         color = 'X' if active_session.player1_id == user_id else 'O'
-        player1 = User.query.get(active_session.player1_id)
-        player2 = User.query.get(active_session.player2_id)
+        player1, player2 = active_session.player1, active_session.player2
 
     return render_template('youth/tictactoe.html', 
                          active_session=active_session, 
@@ -11,7 +11,30 @@ Description: Contains all configuration settings including:
 """
 
 import os
+import re
 from datetime import timedelta
+from functools import lru_cache
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+
+
+# ==================== JSON COLUMN CODEC ====================
+# Used by SQLAlchemy for db.JSON columns (User.interests etc.). orjson parses
+# and encodes several times faster than the stdlib json module; fall back to
+# json if it isn't installed.
+if orjson is not None:
+    def json_serializer(value):
+        """Encodes a JSON column value (SQLite stores it as text)."""
+        return orjson.dumps(value).decode()
+
+    json_deserializer = orjson.loads
+else:
+    import json
+    json_serializer = json.dumps
+    json_deserializer = json.loads
 
 # Base directory of the application
 # __file__ is the path to this config.py file
@@ -44,9 +67,24 @@ class Config:
     # This system tracks modifications and emits signals, which we don't need
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
-    # Enable query echo for debugging (shows SQL queries in console)
-    # Set to False in production for better performance
-    SQLALCHEMY_ECHO = False
+    # Query echo for debugging (shows SQL queries in console). Off by default:
+    # logging every statement is slow - opt in with SQL_ECHO=1 when needed
+    SQLALCHEMY_ECHO = os.environ.get('SQL_ECHO', '0') == '1'
+
+    # Connection pool: reuse connections across requests instead of opening
+    # one per request; pre_ping drops dead connections, recycle refreshes them.
+    # query_cache_size sizes SQLAlchemy's compiled-statement cache (LRU,
+    # default 500) so every route's SELECT shape stays compiled once per
+    # process instead of being re-rendered to SQL when the cache churns
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 20,
+        'max_overflow': 10,
+        'pool_recycle': 1800,
+        'pool_pre_ping': True,
+        'query_cache_size': 1200,
+        'json_serializer': json_serializer,
+        'json_deserializer': json_deserializer,
+    }
 
     # ==================== SESSION CONFIGURATION ====================
     # Session lifetime - user will be logged out after this period of inactivity
@@ -71,9 +109,26 @@ class Config:
     # ==================== PAGINATION SETTINGS ====================
     # Number of items to display per page for story feeds, user lists, etc.
     STORIES_PER_PAGE = 10
+    # Stories per story feed page (keyset-paginated with ?before=<story id>)
+    STORY_FEED_LIMIT = 20
     USERS_PER_PAGE = 20
     EVENTS_PER_PAGE = 12
     COMMUNITIES_PER_PAGE = 9
+    # Max new messages returned per chat poll (/api/messages?after_id=...)
+    MESSAGES_PER_POLL = 200
+
+    # ==================== CACHE SETTINGS ====================
+    # Flask-Caching backend. Redis (shared across workers) whenever REDIS_URL
+    # is set, otherwise the in-process SimpleCache; CACHE_TYPE overrides both.
+    CACHE_REDIS_URL = os.environ.get('REDIS_URL')
+    CACHE_TYPE = os.environ.get('CACHE_TYPE') or ('RedisCache' if CACHE_REDIS_URL else 'SimpleCache')
+    CACHE_DEFAULT_TIMEOUT = 60
+
+    # Lifetime of a chat conversation's version token (the ETag behind the
+    # 304 polls). A shared cache keeps it until the next send replaces it. A
+    # per-process cache only sees sends handled by its own worker, so there
+    # the token expires after a few seconds and a poll is never staler than that
+    CONVERSATION_VERSION_TIMEOUT = 0 if CACHE_TYPE in ('RedisCache', 'redis') else 5
 
     # ==================== APPLICATION SETTINGS ====================
     # Application name displayed in page titles and emails
@@ -124,6 +179,15 @@ class Config:
         'pukimak', 'sohai', 'kan ni na', 'lan jiao', 'mak kau hijau'
     ]
 
+    # All of the above as one precompiled, case-insensitive alternation, so
+    # filtering a message is a single regex pass instead of one per word.
+    # Longest words first so e.g. 'dickhead' wins over 'dick'. None when the
+    # list is emptied, so filter_text can skip the scan altogether.
+    UNKIND_WORDS_RE = re.compile(
+        r'\b(?:' + '|'.join(map(re.escape, sorted(set(UNKIND_WORDS), key=len, reverse=True))) + r')\b',
+        re.IGNORECASE
+    ) if UNKIND_WORDS else None
+
     # ==================== NOTIFICATION SETTINGS ====================
     # Number of days before an event to send notifications
     EVENT_NOTIFICATION_DAYS = 7
@@ -175,7 +239,10 @@ class DevelopmentConfig(Config):
     """
     DEBUG = True
     TESTING = False
-    SQLALCHEMY_ECHO = True
+    # SQLALCHEMY_ECHO is inherited (SQL_ECHO=1 to enable). Recording
+    # per-request queries lets app.py warn about N+1 patterns more cheaply
+    SQLALCHEMY_RECORD_QUERIES = True
+    QUERY_COUNT_WARNING = 20
 
 
 class TestingConfig(Config):
@@ -187,8 +254,15 @@ class TestingConfig(Config):
     TESTING = True
     # Use in-memory database for testing
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    # In-memory SQLite uses a single static connection - no pool to size
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'json_serializer': json_serializer,
+        'json_deserializer': json_deserializer,
+    }
     # Disable CSRF for testing
     WTF_CSRF_ENABLED = False
+    # Never serve cached pages between tests
+    CACHE_TYPE = 'NullCache'
 
 
 class ProductionConfig(Config):
@@ -215,6 +289,7 @@ config = {
 }
 
 
+@lru_cache(maxsize=4)
 def get_config(config_name='default'):
     """
     Get configuration object based on environment name.
@@ -1,23 +1,257 @@
-from app import app, db
+import sys
+from app import (app, db, GAME_KIND_BACKFILL, LANGUAGES_BACKFILL, REACTION_COUNTS_BACKFILL,
+                 ENUM_CODE_BACKFILLS, TRANSLATIONS_BACKFILL, DELETE_ACTION_MODELS)
+from models import EventParticipant, CommunityMember, StoryReaction
 from sqlalchemy import text
 
+# Table rebuilds refuse to delete or clear orphaned rows unless asked to:
+# python fix_database.py --drop-orphans
+DROP_ORPHANS = '--drop-orphans' in sys.argv
+
+
+def has_column(conn, table, column):
+    """Checks the table's metadata instead of attempting the ALTER."""
+    rows = conn.execute(text(f"PRAGMA table_info({table})")).fetchall()
+    return any(row[1] == column for row in rows)
+
+
+def add_column(conn, table, column, column_type):
+    """Adds a column only if it is missing (no try/except round trip)."""
+    if has_column(conn, table, column):
+        print(f"Note: '{column}' already exists on '{table}'.")
+        return
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+    print(f"Success: Added '{column}' column to '{table}' table.")
+
+
+def _orphan_filters(table):
+    """
+    SQL for a rebuild's orphan handling: the value copied for each column
+    (a dangling optional link becomes NULL) and the conditions a row needs to
+    be copied at all (every required link points at an existing parent).
+    """
+    values, conditions, dangling = [], [], []
+    for column in table.columns:
+        value = column.name
+        for fk in column.foreign_keys:
+            parent = f"(SELECT {fk.column.name} FROM {fk.column.table.name})"
+            if column.nullable:
+                value = f"CASE WHEN {column.name} IN {parent} THEN {column.name} END"
+                dangling.append(f"({column.name} IS NOT NULL AND {column.name} NOT IN {parent})")
+            else:
+                conditions.append(f"{column.name} IN {parent}")
+        values.append(value)
+    return values, conditions, dangling
+
+
+def count_orphans(conn, table):
+    """
+    Counts the rows rebuild_table would change.
+
+    Returns:
+        tuple: (rows whose optional links would be cleared, rows that would be dropped)
+    """
+    _, conditions, dangling = _orphan_filters(table)
+    kept = " AND ".join(conditions) or "1"
+    cleared = " OR ".join(dangling) or "0"
+    total, copied, nulled = conn.execute(text(
+        f"SELECT COUNT(*), COALESCE(SUM({kept}), 0), COALESCE(SUM(({kept}) AND ({cleared})), 0) "
+        f"FROM {table.name}"
+    )).one()
+    return nulled, total - copied
+
+
+def check_orphans(conn, models, drop_orphans=False):
+    """
+    Reports orphaned rows in the tables about to be rebuilt. Rebuilding would
+    delete or clear them, so this raises unless drop_orphans is set.
+    """
+    found = False
+    for model in models:
+        cleared, dropped = count_orphans(conn, model.__table__)
+        if cleared or dropped:
+            found = True
+            print(f"Warning: '{model.__tablename__}' has {dropped} row(s) pointing at missing "
+                  f"required parents and {cleared} row(s) with dangling optional links.")
+    if found and not drop_orphans:
+        raise RuntimeError("Orphaned rows found; re-run with --drop-orphans to delete / clear "
+                           "them and rebuild the tables.")
+
+
+def rebuild_table(conn, model):
+    """
+    Recreates a model's table from its current definition and copies the rows
+    across - SQLite can't change a primary key, a foreign key or drop a column
+    in place. Call check_orphans first: rows with a dangling required link
+    are not copied, dangling optional links are cleared.
+    """
+    table = model.__table__
+    old_name = f"_{table.name}_old"
+    columns = ", ".join(column.name for column in table.columns)
+    values, conditions, _ = _orphan_filters(table)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    cleared, _ = count_orphans(conn, table)
+
+    # Legacy rename: other tables' foreign keys keep naming this table
+    # rather than following it to the old copy
+    conn.execute(text("PRAGMA legacy_alter_table=ON"))
+    conn.execute(text(f"ALTER TABLE {table.name} RENAME TO {old_name}"))
+    conn.execute(text("PRAGMA legacy_alter_table=OFF"))
+    # Index names stay with the renamed table; free them for the new one
+    for index in table.indexes:
+        conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+    table.create(conn)
+    copied = conn.execute(text(f"INSERT INTO {table.name} ({columns}) "
+                               f"SELECT {', '.join(values)} FROM {old_name}{where}")).rowcount
+    total = conn.execute(text(f"SELECT COUNT(*) FROM {old_name}")).scalar()
+    conn.execute(text(f"DROP TABLE {old_name}"))
+    print(f"Success: Rebuilt '{table.name}' table ({copied} rows copied, "
+          f"{total - copied} dropped, {cleared} with links cleared).")
+
+
+# ==================== MIGRATIONS ====================
+# Applied in order. The database's PRAGMA user_version records how many have
+# run, so a re-run skips straight past the ones already applied. Append new
+# migrations to the end - never reorder or remove existing ones.
+
+def add_community_post_photos(conn):
+    """Adds the missing photo_url column to community_posts."""
+    add_column(conn, 'community_posts', 'photo_url', 'VARCHAR(255)')
+
+
+def add_game_kind(conn):
+    """games.kind drives challenge routing; backfill it from the titles."""
+    add_column(conn, 'games', 'kind', 'VARCHAR(16)')
+    conn.execute(text(GAME_KIND_BACKFILL))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_games_kind ON games (kind)"))
+
+
+def add_game_session_indexes(conn):
+    """Per-seat and open-session indexes for the game session lookups."""
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_gs_p1_status_created "
+                      "ON game_sessions (player1_id, status, created_at DESC)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_gs_p2_status_created "
+                      "ON game_sessions (player2_id, status, created_at DESC)"))
+    # Partial index holding only open sessions (challenge lookup per pair)
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_gs_open "
+                      "ON game_sessions (player1_id, player2_id, created_at DESC) "
+                      "WHERE status IN ('active', 'waiting')"))
+    print("Success: Game session indexes created.")
+
+
+def add_user_languages_mask(conn):
+    """Moves languages from the languages_json array into a bitmask column."""
+    add_column(conn, 'users', 'languages_mask', 'INTEGER NOT NULL DEFAULT 0')
+    if has_column(conn, 'users', 'languages_json'):
+        conn.execute(text(LANGUAGES_BACKFILL))
+
+
+def add_list_page_indexes(conn):
+    """Composite indexes matching the list pages' WHERE ... ORDER BY shapes."""
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_stories_user_created "
+                      "ON stories (user_id, created_at DESC)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_story_reactions_story_type "
+                      "ON story_reactions (story_id, reaction_type)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_chat_reports_status_created "
+                      "ON chat_reports (status, created_at DESC)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_notifications_user_isread_created "
+                      "ON notifications (user_id, is_read, created_at DESC)"))
+    print("Success: List page indexes created.")
+
+
+def add_unread_notification_index(conn):
+    """Swaps the full notification index for a partial one over unread rows."""
+    conn.execute(text("DROP INDEX IF EXISTS ix_notifications_user_isread_created"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_notifications_unread "
+                      "ON notifications (user_id, created_at DESC) WHERE is_read = 0"))
+    print("Success: Unread notification index created.")
+
+
+def add_story_reaction_counts(conn):
+    """Packed per-type reaction counters on stories, filled from story_reactions."""
+    add_column(conn, 'stories', 'reaction_counts', 'BIGINT')
+    conn.execute(text(REACTION_COUNTS_BACKFILL))
+
+
+def convert_enum_columns(conn):
+    """Stores reaction types and pair/report statuses as small integer codes."""
+    for backfill in ENUM_CODE_BACKFILLS:
+        conn.execute(text(backfill))
+    print("Success: Enum columns converted to integer codes.")
+
+
+def use_composite_primary_keys(conn):
+    """Junction tables are keyed by their natural composite key, not an id."""
+    models = (EventParticipant, CommunityMember, StoryReaction)
+    check_orphans(conn, models, drop_orphans=DROP_ORPHANS)
+    for model in models:
+        rebuild_table(conn, model)
+
+
+def move_message_translations(conn):
+    """Moves translated_content out of messages into message_translations."""
+    if not has_column(conn, 'messages', 'translated_content'):
+        print("Note: 'translated_content' already removed from 'messages'.")
+        return
+    conn.execute(text(TRANSLATIONS_BACKFILL))
+    conn.execute(text("ALTER TABLE messages DROP COLUMN translated_content"))
+    print("Success: Moved message translations to 'message_translations'.")
+
+
+def add_delete_cascades(conn):
+    """Recreates child tables so their foreign keys carry ON DELETE actions."""
+    check_orphans(conn, DELETE_ACTION_MODELS, drop_orphans=DROP_ORPHANS)
+    for model in DELETE_ACTION_MODELS:
+        rebuild_table(conn, model)
+
+
+MIGRATIONS = [
+    add_community_post_photos,
+    add_game_kind,
+    add_game_session_indexes,
+    add_user_languages_mask,
+    add_list_page_indexes,
+    add_unread_notification_index,
+    add_story_reaction_counts,
+    convert_enum_columns,
+    use_composite_primary_keys,
+    move_message_translations,
+    add_delete_cascades,
+]
+
+
 def fix_database():
     """
-    Updates the database schema to match the current models.
-    Specifically adds the missing photo_url column to community_posts.
+    Updates the database schema to match the current models by running any
+    migrations newer than the database's user_version.
     """
     print("Attempting to update database schema...")
-    
+
     with app.app_context():
         with db.engine.connect() as conn:
-            try:
-                # Add the missing column
-                conn.execute(text("ALTER TABLE community_posts ADD COLUMN photo_url VARCHAR(255)"))
+            version = conn.execute(text("PRAGMA user_version")).scalar()
+            pending = MIGRATIONS[version:]
+            if not pending:
+                print(f"Database schema is up to date (version {version}).")
+                return
+
+            for number, migration in enumerate(pending, start=version + 1):
+                print(f"Applying migration {number}: {migration.__name__}")
+                try:
+                    migration(conn)
+                except RuntimeError as e:
+                    conn.rollback()
+                    print(f"Stopped at migration {number}: {e}")
+                    return
+                # Record progress with each migration so a failure part-way
+                # through resumes from the right place next time
+                conn.execute(text(f"PRAGMA user_version = {number}"))
                 conn.commit()
-                print("Success: Added 'photo_url' column to 'community_posts' table.")
-            except Exception as e:
-                print(f"Note: {e}")
-                print("The column might already exist or another error occurred.")
+
+            # Refresh planner statistics so SQLite picks up any new indexes
+            conn.execute(text("ANALYZE"))
+            conn.commit()
+            print(f"Success: Database schema updated to version {len(MIGRATIONS)}.")
 
 if __name__ == "__main__":
-    fix_database()
\ No newline at end of file
+    fix_database()
@@ -1,8 +1,19 @@
+import re
 from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileAllowed
 from wtforms import StringField, PasswordField, BooleanField, IntegerField, TextAreaField, SelectField, SubmitField
 from wtforms.validators import DataRequired, Email, Length, EqualTo, ValidationError, NumberRange
-from models import User, RegistrationCode
+from models import db, USERNAME_TAKEN, EMAIL_TAKEN, REGISTRATION_CODE_AVAILABLE
+
+# Singapore phone number: 8 digits, starts with 6, 8, or 9 (compiled once)
+_SG_PHONE_RE = re.compile(r'^[689]\d{7}$')
+
+
+def validate_sg_phone(phone):
+    """Shared phone validator for RegistrationForm and ProfileForm."""
+    if not _SG_PHONE_RE.match(phone.data or ''):
+        raise ValidationError('Please enter a valid Singapore phone number (8 digits, starting with 6, 8, or 9).')
+
 
 class LoginForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired()])
@@ -23,19 +34,20 @@ class RegistrationForm(FlaskForm):
     profile_picture = FileField('Profile Picture', validators=[FileAllowed(['jpg', 'png', 'jpeg', 'gif'])])
     submit = SubmitField('Register')
 
+    # The uniqueness/validity checks only need a yes/no, so they run as
+    # EXISTS queries (prebuilt in models) instead of loading a full
+    # User/RegistrationCode row
+
     def validate_username(self, username):
-        user = User.query.filter_by(username=username.data).first()
-        if user:
+        if db.session.scalar(USERNAME_TAKEN, {'username': username.data}):
             raise ValidationError('That username is already taken. Please choose a different one.')
 
     def validate_email(self, email):
-        user = User.query.filter_by(email=email.data).first()
-        if user:
+        if db.session.scalar(EMAIL_TAKEN, {'email': email.data}):
             raise ValidationError('That email is already registered. Please login instead.')
 
     def validate_registration_code(self, registration_code):
-        code = RegistrationCode.query.filter_by(code=registration_code.data, is_used=False).first()
-        if not code:
+        if not db.session.scalar(REGISTRATION_CODE_AVAILABLE, {'code': registration_code.data}):
             raise ValidationError('Invalid or already used registration code.')
 
     def validate_age(self, age):
@@ -47,10 +59,7 @@ class RegistrationForm(FlaskForm):
             raise ValidationError('If you are 60 or older, please register as a Senior.')
 
     def validate_phone(self, phone):
-        # Singapore phone validation: 8 digits, starts with 6, 8, or 9
-        import re
-        if not re.match(r'^[689]\d{7}$', phone.data):
-            raise ValidationError('Please enter a valid Singapore phone number (8 digits, starting with 6, 8, or 9).')
+        validate_sg_phone(phone)
 
 class ProfileForm(FlaskForm):
     full_name = StringField('Full Name', validators=[DataRequired(), Length(min=2, max=100)])
@@ -63,9 +72,7 @@ class ProfileForm(FlaskForm):
     submit = SubmitField('Update Profile')
 
     def validate_phone(self, phone):
-        import re
-        if not re.match(r'^[689]\d{7}$', phone.data):
-            raise ValidationError('Please enter a valid Singapore phone number (8 digits, starting with 6, 8, or 9).')
+        validate_sg_phone(phone)
 
 class StoryForm(FlaskForm):
     title = StringField('Title', validators=[DataRequired(), Length(min=1, max=200)])
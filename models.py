@@ -15,18 +15,110 @@ Description: Defines all database tables and relationships:
              - Check-ins
 """
 
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from operator import attrgetter
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import bindparam, case, exists, false, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.mutable import MutableDict, MutableList
+from sqlalchemy.orm import undefer
+from sqlalchemy.types import TypeDecorator
 from werkzeug.security import generate_password_hash, check_password_hash
-import json
+import zlib
 
 # Initialize SQLAlchemy database object
 # This will be initialized in app.py with db.init_app(app)
 db = SQLAlchemy()
 
 
+# ==================== COLUMN TYPES ====================
+class CompressedText(TypeDecorator):
+    """
+    Text column that stores long values zlib-compressed.
+
+    Values shorter than COMPRESS_MIN_LENGTH are stored as plain text (they
+    wouldn't shrink), longer ones as a compressed BLOB. Reads accept both,
+    so rows written before a column switched to this type still load.
+    Compressed values can't be searched with LIKE - only use this for
+    columns that are displayed, never filtered on.
+    """
+    impl = db.Text
+    cache_ok = True
+
+    COMPRESS_MIN_LENGTH = 512
+
+    def process_bind_param(self, value, dialect):
+        if value is None or len(value) < self.COMPRESS_MIN_LENGTH:
+            return value
+        return zlib.compress(value.encode('utf-8'), 6)
+
+    def process_result_value(self, value, dialect):
+        if isinstance(value, bytes):
+            return zlib.decompress(value).decode('utf-8')
+        return value
+
+
+class EnumCode(TypeDecorator):
+    """
+    Small integer column for a fixed set of strings.
+
+    Stores each value as its position in `values` (2 bytes instead of a
+    VARCHAR), so equality checks and indexes compare integers. Python code,
+    filters and templates keep using the strings - they are converted on the
+    way in and out. Only ever append to `values`: the codes are positions.
+
+    Rows written before a column switched to this type may still hold the
+    old strings (or, in SQLite tables created as VARCHAR, the code as text);
+    reads accept both.
+    """
+    impl = db.SmallInteger
+    cache_ok = True
+
+    def __init__(self, *values):
+        super().__init__()
+        self.values = values
+        self._codes = {value: code for code, value in enumerate(values)}
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        try:
+            return self._codes[value]
+        except KeyError:
+            raise ValueError(f'{value!r} is not one of {self.values}') from None
+
+    def process_result_value(self, value, dialect):
+        if isinstance(value, str):
+            if not value.isdigit():
+                return value
+            value = int(value)
+        return None if value is None else self.values[value]
+
+
+# ==================== SERIALIZATION ====================
+class Serializable:
+    """
+    Mixin giving a model a fast as_dict() for JSON responses.
+
+    A model lists the fields it exposes in __serialize__ (two or more); one
+    attrgetter over them is built when the class is defined, so as_dict() is
+    a single C-level call per object instead of a Python lookup per field.
+    Keep deferred columns out of __serialize__ - each would load separately.
+    """
+    __serialize__ = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.__serialize__:
+            cls._serialize_getter = attrgetter(*cls.__serialize__)
+
+    def as_dict(self):
+        """Returns the __serialize__ fields as a plain dict."""
+        return dict(zip(self.__serialize__, self._serialize_getter(self)))
+
+
 # ==================== USER MODEL ====================
-class User(db.Model):
+class User(Serializable, db.Model):
     """
     User model representing all user accounts (seniors, youth, admins).
 
@@ -40,9 +132,9 @@ class User(db.Model):
         age (int): User's age (60+ for seniors, 13+ for youth)
         role (str): User role - 'senior', 'youth', or 'admin'
         profile_picture (str): Path to profile picture file
-        interests_json (str): JSON string of user interests
-        languages_json (str): JSON string of languages spoken
-        accessibility_settings_json (str): JSON string of accessibility preferences
+        interests (list): User interests (JSON column interests_json)
+        languages (list): Languages spoken (bitmask column languages_mask)
+        accessibility_settings (dict): Accessibility preferences (JSON column accessibility_settings_json)
         created_at (datetime): Account creation timestamp
         last_active (datetime): Last login/activity timestamp
         is_active (bool): Whether account is active
@@ -62,20 +154,26 @@ class User(db.Model):
         story_comments: One-to-many with StoryComment
     """
     __tablename__ = 'users'
+    # Public card fields (story authors, buddies) - see Serializable
+    __serialize__ = ('id', 'full_name', 'profile_picture')
 
     # Primary key
     id = db.Column(db.Integer, primary_key=True)
 
     # Authentication fields
+    # Deferred columns (db.deferred) are left out of every User SELECT and
+    # loaded on first access - Users are loaded on nearly every request (the
+    # current user, buddies, story authors) but these are only read on a
+    # handful of pages. The password hash is undeferred by the login lookup.
     username = db.Column(db.String(80), unique=True, nullable=False, index=True)
-    password_hash = db.Column(db.String(255), nullable=False)
+    password_hash = db.deferred(db.Column(db.String(255), nullable=False))
 
     # Personal information
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     full_name = db.Column(db.String(120), nullable=False)
     phone = db.Column(db.String(20))
     age = db.Column(db.Integer, nullable=False)
-    bio = db.Column(db.Text)  # User biography
+    bio = db.deferred(db.Column(db.Text))  # User biography (profile pages only)
     school = db.Column(db.String(255))  # School or organization for youth
 
     # Role-based access control
@@ -88,13 +186,24 @@ class User(db.Model):
     profile_picture = db.Column(db.String(255), default='images/default-avatar.png')
 
     # Disabkle Account #
-    disable_reason = db.Column(db.Text)
+    disable_reason = db.deferred(db.Column(db.Text))  # Only read when login is refused
 
     # JSON fields for flexible data storage
-    # Using JSON allows storing arrays/objects without additional tables
-    interests_json = db.Column(db.Text)  # Stores interests as JSON array
-    languages_json = db.Column(db.Text)  # Stores languages as JSON array
-    accessibility_settings_json = db.Column(db.Text)  # Stores settings as JSON object
+    # Using JSON allows storing arrays/objects without additional tables.
+    # The JSON type decodes each value once when the row is loaded (instead of
+    # json.loads on every attribute access); the Mutable wrappers mark the
+    # user dirty on in-place edits like user.interests.append(...).
+    # Column names are unchanged, so existing databases need no migration.
+    _interests = db.Column('interests_json', MutableList.as_mutable(db.JSON))  # JSON array
+    _accessibility_settings = db.deferred(db.Column('accessibility_settings_json',
+                                                   MutableDict.as_mutable(db.JSON)))  # JSON object
+
+    # Languages come from a fixed checkbox list, so they are packed into a
+    # bitmask (bit i = LANGUAGES[i]) rather than stored as a JSON array.
+    # Only ever append to LANGUAGES - the bit positions are stored data.
+    LANGUAGES = ('English', 'Mandarin', 'Malay', 'Tamil', 'Hokkien', 'Cantonese')
+    LANGUAGE_BITS = {name: 1 << bit for bit, name in enumerate(LANGUAGES)}
+    languages_mask = db.Column(db.Integer, nullable=False, default=0)
 
     # Timestamps and status
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -102,18 +211,23 @@ class User(db.Model):
     is_active = db.Column(db.Boolean, default=True)
 
     # Relationships (defined with back_populates for bidirectional access)
-    stories = db.relationship('Story', back_populates='user', lazy='dynamic')
+    stories = db.relationship('Story', back_populates='user', lazy='raise')
     sent_messages = db.relationship('Message', foreign_keys='Message.sender_id',
-                                   back_populates='sender', lazy='dynamic')
+                                   back_populates='sender', lazy='raise')
     received_messages = db.relationship('Message', foreign_keys='Message.recipient_id',
-                                       back_populates='recipient', lazy='dynamic')
+                                       back_populates='recipient', lazy='raise')
     senior_pairs = db.relationship('Pair', foreign_keys='Pair.senior_id',
-                                   back_populates='senior', lazy='dynamic')
+                                   back_populates='senior', lazy='raise')
     youth_pairs = db.relationship('Pair', foreign_keys='Pair.youth_id',
-                                 back_populates='youth', lazy='dynamic')
+                                 back_populates='youth', lazy='raise')
     streak = db.relationship('Streak', back_populates='user', uselist=False)
-    badges = db.relationship('Badge', back_populates='user', lazy='dynamic')
-    checkins = db.relationship('Checkin', back_populates='user', lazy='dynamic')
+    badges = db.relationship('Badge', back_populates='user', lazy='raise')
+    checkins = db.relationship('Checkin', back_populates='user', lazy='raise')
+
+    # Werkzeug hash method (scrypt N:r:p) for new passwords. Changing it is
+    # an algorithm bump: existing hashes keep verifying and are re-hashed
+    # with the new method on the user's next successful login.
+    PASSWORD_HASH_METHOD = 'scrypt:32768:8:1'
 
     def set_password(self, password):
         """
@@ -122,9 +236,13 @@ class User(db.Model):
         Args:
             password (str): Plain text password
 
-        Security: Uses pbkdf2:sha256 algorithm for secure hashing
+        Security: Uses scrypt (OpenSSL's implementation) - see PASSWORD_HASH_METHOD
         """
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generate_password_hash(password, method=self.PASSWORD_HASH_METHOD)
+
+    def password_needs_rehash(self):
+        """True if the stored hash was made with an older method or parameters."""
+        return self.password_hash.split('$', 1)[0] != self.PASSWORD_HASH_METHOD
 
     def check_password(self, password):
         """
@@ -140,39 +258,37 @@ class User(db.Model):
 
     @property
     def interests(self):
-        """Get interests as Python list from JSON string."""
-        if self.interests_json:
-            return json.loads(self.interests_json)
-        return []
+        """Get interests as a Python list (empty if never set)."""
+        return self._interests or []
 
     @interests.setter
     def interests(self, value):
-        """Set interests from Python list, store as JSON string."""
-        self.interests_json = json.dumps(value)
+        """Set interests from a Python list."""
+        self._interests = value
 
     @property
     def languages(self):
-        """Get languages as Python list from JSON string."""
-        if self.languages_json:
-            return json.loads(self.languages_json)
-        return []
+        """Get languages as a Python list, unpacked from languages_mask."""
+        mask = self.languages_mask or 0
+        return [name for name, bit in self.LANGUAGE_BITS.items() if mask & bit]
 
     @languages.setter
     def languages(self, value):
-        """Set languages from Python list, store as JSON string."""
-        self.languages_json = json.dumps(value)
+        """Set languages from a Python list (names outside LANGUAGES are dropped)."""
+        mask = 0
+        for name in value or ():
+            mask |= self.LANGUAGE_BITS.get(name, 0)
+        self.languages_mask = mask
 
     @property
     def accessibility_settings(self):
-        """Get accessibility settings as Python dict from JSON string."""
-        if self.accessibility_settings_json:
-            return json.loads(self.accessibility_settings_json)
-        return {}
+        """Get accessibility settings as a Python dict (empty if never set)."""
+        return self._accessibility_settings or {}
 
     @accessibility_settings.setter
     def accessibility_settings(self, value):
-        """Set accessibility settings from Python dict, store as JSON string."""
-        self.accessibility_settings_json = json.dumps(value)
+        """Set accessibility settings from a Python dict."""
+        self._accessibility_settings = value
 
     def __repr__(self):
         """String representation for debugging."""
@@ -180,7 +296,7 @@ class User(db.Model):
 
 
 # ==================== STORY MODEL ====================
-class Story(db.Model):
+class Story(Serializable, db.Model):
     """
     Story model for senior life stories.
 
@@ -192,6 +308,7 @@ class Story(db.Model):
         category (str): Category - 'Childhood', 'Work Life', 'Family', 'Hobbies', 'Other'
         photo_url (str): Path to uploaded photo (optional)
         audio_url (str): Path to voice recording (optional)
+        reaction_counts (int): Packed per-type reaction counters (see reaction_count)
         created_at (datetime): Creation timestamp
         updated_at (datetime): Last edit timestamp
 
@@ -201,25 +318,67 @@ class Story(db.Model):
         comments: One-to-many with StoryComment
     """
     __tablename__ = 'stories'
+    __serialize__ = ('id', 'title', 'content', 'category', 'photo_url', 'created_at')
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
 
     title = db.Column(db.String(200), nullable=False)
-    content = db.Column(db.Text, nullable=False)
+    content = db.Column(CompressedText, nullable=False)  # Long-form, compressed at rest
     category = db.Column(db.String(50), nullable=False)  # 5 categories
     photo_url = db.Column(db.String(255))  # Optional photo
     audio_url = db.Column(db.String(255))  # Optional voice recording
 
+    # Reaction counters packed into one integer, REACTION_FIELD_BITS per type
+    # in REACTION_TYPES order (hearts in the low bits). Kept in step with
+    # story_reactions by adding reaction_delta() in SQL on every toggle, so
+    # pages read one column instead of aggregating the reaction rows.
+    # Only ever append to REACTION_TYPES - the bit positions are stored data.
+    REACTION_TYPES = ('heart', 'smile', 'clap')
+    REACTION_FIELD_BITS = 21
+    reaction_counts = db.Column(db.BigInteger, default=0)
+
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relationships
     user = db.relationship('User', back_populates='stories')
+    # passive_deletes: deleting a story leaves its reactions and comments to
+    # the database's ON DELETE CASCADE instead of loading and deleting them
+    # one by one (needs PRAGMA foreign_keys, turned on in app.py)
     reactions = db.relationship('StoryReaction', back_populates='story',
-                               lazy='dynamic', cascade='all, delete-orphan')
+                               lazy='raise', cascade='all, delete-orphan', passive_deletes=True)
     comments = db.relationship('StoryComment', back_populates='story',
-                              lazy='dynamic', cascade='all, delete-orphan')
+                              lazy='raise', cascade='all, delete-orphan', passive_deletes=True,
+                              order_by='StoryComment.created_at')
+
+    # Category feed index: WHERE category = ? ORDER BY created_at DESC LIMIT n
+    # is a backward range scan (the 'all' feed uses the created_at index)
+    # Author pages: WHERE user_id = ? ORDER BY created_at DESC LIMIT n
+    __table_args__ = (
+        db.Index('ix_story_cat_created', 'category', created_at.desc()),
+        db.Index('ix_stories_user_created', 'user_id', created_at.desc()),
+    )
+
+    @classmethod
+    def reaction_delta(cls, reaction_type, step=1):
+        """Amount to add to reaction_counts to change one type's count by step."""
+        return step << (cls.REACTION_TYPES.index(reaction_type) * cls.REACTION_FIELD_BITS)
+
+    @classmethod
+    def unpack_reaction_count(cls, packed, reaction_type):
+        """Reads one type's count out of a packed reaction_counts value."""
+        shift = cls.REACTION_TYPES.index(reaction_type) * cls.REACTION_FIELD_BITS
+        return ((packed or 0) >> shift) & ((1 << cls.REACTION_FIELD_BITS) - 1)
+
+    def reaction_count(self, reaction_type):
+        """Number of reactions of the given type on this story."""
+        return self.unpack_reaction_count(self.reaction_counts, reaction_type)
+
+    @property
+    def total_reactions(self):
+        """Number of reactions of any type on this story."""
+        return sum(self.reaction_count(reaction_type) for reaction_type in self.REACTION_TYPES)
 
     def __repr__(self):
         return f'<Story {self.id}: {self.title[:30]}>'
@@ -231,10 +390,9 @@ class StoryReaction(db.Model):
     Story reaction model (Heart, Smile, Clap, Hug).
 
     Attributes:
-        id (int): Primary key
-        story_id (int): Foreign key to Story
+        story_id (int): Foreign key to Story (primary key with user_id, reaction_type)
         user_id (int): Foreign key to User who reacted
-        reaction_type (str): Type of reaction - 'heart', 'smile', 'clap', 'hug'
+        reaction_type (str): Type of reaction - 'heart', 'smile', 'clap'
         created_at (datetime): Reaction timestamp
 
     Relationships:
@@ -243,19 +401,21 @@ class StoryReaction(db.Model):
     """
     __tablename__ = 'story_reactions'
 
-    id = db.Column(db.Integer, primary_key=True)
-    story_id = db.Column(db.Integer, db.ForeignKey('stories.id'), nullable=False, index=True)
+    story_id = db.Column(db.Integer, db.ForeignKey('stories.id', ondelete='CASCADE'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
-    reaction_type = db.Column(db.String(20), nullable=False)  # heart, smile, clap, hug
+    reaction_type = db.Column(EnumCode(*Story.REACTION_TYPES), nullable=False)  # heart, smile, clap
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
     # Relationships
     story = db.relationship('Story', back_populates='reactions')
     user = db.relationship('User')
 
-    # Unique constraint: one user can only react once per story with same type
-    __table_args__ = (db.UniqueConstraint('story_id', 'user_id', 'reaction_type',
-                                         name='unique_story_user_reaction'),)
+    # Composite primary key: one user can only react once per story with
+    # same type (its index also covers the by-story lookups)
+    # The (story_id, reaction_type) index covers the per-story heart counts
+    # in the feed without touching the table
+    __table_args__ = (db.PrimaryKeyConstraint('story_id', 'user_id', 'reaction_type'),
+                      db.Index('ix_story_reactions_story_type', 'story_id', 'reaction_type'))
 
     def __repr__(self):
         return f'<Reaction {self.reaction_type} on Story {self.story_id}>'
@@ -280,7 +440,8 @@ class StoryComment(db.Model):
     __tablename__ = 'story_comments'
 
     id = db.Column(db.Integer, primary_key=True)
-    story_id = db.Column(db.Integer, db.ForeignKey('stories.id'), nullable=False, index=True)
+    story_id = db.Column(db.Integer, db.ForeignKey('stories.id', ondelete='CASCADE'),
+                         nullable=False, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     content = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -304,7 +465,6 @@ class Message(db.Model):
         recipient_id (int): Foreign key to User who receives message
         content (text): Message content (original text)
         original_language (str): Language code of original message
-        translated_content (text): Translated message text (optional)
         is_voice (bool): Whether message is voice message
         voice_url (str): Path to voice recording file (optional)
         is_flagged (bool): Whether message contains inappropriate content
@@ -323,7 +483,6 @@ class Message(db.Model):
 
     content = db.Column(db.Text, nullable=False)
     original_language = db.Column(db.String(10), default='en')
-    translated_content = db.Column(db.Text)  # Translated version
 
     is_voice = db.Column(db.Boolean, default=False)
     voice_url = db.Column(db.String(255))
@@ -334,12 +493,40 @@ class Message(db.Model):
     # Relationships
     sender = db.relationship('User', foreign_keys=[sender_id], back_populates='sent_messages')
     recipient = db.relationship('User', foreign_keys=[recipient_id], back_populates='received_messages')
-    reports = db.relationship('ChatReport', back_populates='message', lazy='dynamic')
+    reports = db.relationship('ChatReport', back_populates='message', lazy='raise')
+
+    # Conversation index: each direction of a chat is one (sender, recipient)
+    # range already sorted by time, so loading a thread is an index seek
+    __table_args__ = (db.Index('ix_msg_conv', 'sender_id', 'recipient_id', 'created_at'),)
 
     def __repr__(self):
         return f'<Message {self.id} from User {self.sender_id} to {self.recipient_id}>'
 
 
+# ==================== MESSAGE TRANSLATION MODEL ====================
+class MessageTranslation(db.Model):
+    """
+    Translations of chat messages, one row per message and target language.
+    Kept out of the messages table so the (mostly untranslated) chat history
+    rows stay narrow; looked up with utils.get_message_translations.
+
+    Attributes:
+        message_id (int): Foreign key to Message (primary key with lang)
+        lang (str): Target language code
+        content (text): Translated message text
+    """
+    __tablename__ = 'message_translations'
+
+    message_id = db.Column(db.Integer, db.ForeignKey('messages.id'), nullable=False)
+    lang = db.Column(db.String(10), nullable=False)
+    content = db.Column(db.Text, nullable=False)
+
+    __table_args__ = (db.PrimaryKeyConstraint('message_id', 'lang'),)
+
+    def __repr__(self):
+        return f'<MessageTranslation {self.lang} for Message {self.message_id}>'
+
+
 # ==================== PAIR MODEL ====================
 class Pair(db.Model):
     """
@@ -366,7 +553,9 @@ class Pair(db.Model):
     youth_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
 
     program = db.Column(db.String(100))  # Program/initiative name
-    status = db.Column(db.String(20), default='active')  # active, inactive, paused
+    STATUSES = ('active', 'inactive', 'paused')
+
+    status = db.Column(EnumCode(*STATUSES), default='active')
     paired_date = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     last_interaction = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -374,8 +563,14 @@ class Pair(db.Model):
     senior = db.relationship('User', foreign_keys=[senior_id], back_populates='senior_pairs')
     youth = db.relationship('User', foreign_keys=[youth_id], back_populates='youth_pairs')
 
-    # Unique constraint: one senior can only be paired with one youth at a time
-    __table_args__ = (db.UniqueConstraint('senior_id', 'youth_id', name='unique_senior_youth_pair'),)
+    # Unique constraint: one senior can only be paired with one youth at a time.
+    # The (side, status) indexes serve get_current_pair's "active pair" lookup
+    # from either side without filtering status row by row.
+    __table_args__ = (
+        db.UniqueConstraint('senior_id', 'youth_id', name='unique_senior_youth_pair'),
+        db.Index('ix_pair_youth_status', 'youth_id', 'status'),
+        db.Index('ix_pair_senior_status', 'senior_id', 'status'),
+    )
 
     def __repr__(self):
         return f'<Pair {self.id}: Senior {self.senior_id} - Youth {self.youth_id}>'
@@ -416,8 +611,9 @@ class Event(db.Model):
 
     # Relationships
     creator = db.relationship('User')
+    # Registrations are removed by ON DELETE CASCADE (see Story.reactions)
     participants = db.relationship('EventParticipant', back_populates='event',
-                                   lazy='dynamic', cascade='all, delete-orphan')
+                                   lazy='raise', cascade='all, delete-orphan', passive_deletes=True)
 
     def __repr__(self):
         return f'<Event {self.id}: {self.title}>'
@@ -429,8 +625,7 @@ class EventParticipant(db.Model):
     Event registrations (junction table).
 
     Attributes:
-        id (int): Primary key
-        event_id (int): Foreign key to Event
+        event_id (int): Foreign key to Event (primary key with user_id)
         user_id (int): Foreign key to User
         registered_at (datetime): Registration timestamp
 
@@ -440,8 +635,7 @@ class EventParticipant(db.Model):
     """
     __tablename__ = 'event_participants'
 
-    id = db.Column(db.Integer, primary_key=True)
-    event_id = db.Column(db.Integer, db.ForeignKey('events.id'), nullable=False, index=True)
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id', ondelete='CASCADE'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     registered_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
@@ -449,8 +643,9 @@ class EventParticipant(db.Model):
     event = db.relationship('Event', back_populates='participants')
     user = db.relationship('User')
 
-    # Unique constraint: one user can only register once per event
-    __table_args__ = (db.UniqueConstraint('event_id', 'user_id', name='unique_event_user'),)
+    # Composite primary key: one user can only register once per event (its
+    # index also covers the by-event lookups)
+    __table_args__ = (db.PrimaryKeyConstraint('event_id', 'user_id'),)
 
     def __repr__(self):
         return f'<EventParticipant User {self.user_id} in Event {self.event_id}>'
@@ -483,7 +678,7 @@ class Community(db.Model):
     name = db.Column(db.String(100), nullable=False, unique=True)
     type = db.Column(db.String(20), nullable=False)  # Story, Hobby, Learning
     description = db.Column(db.Text)
-    rules = db.Column(db.Text)
+    rules = db.deferred(db.Column(db.Text))  # Not shown on any list page
     
     # Visual customization
     icon = db.Column(db.String(50), default='fas fa-users')
@@ -497,10 +692,11 @@ class Community(db.Model):
 
     # Relationships
     creator = db.relationship('User')
+    # Members and posts are removed by ON DELETE CASCADE (see Story.reactions)
     members = db.relationship('CommunityMember', back_populates='community',
-                             lazy='dynamic', cascade='all, delete-orphan')
+                             lazy='raise', cascade='all, delete-orphan', passive_deletes=True)
     posts = db.relationship('CommunityPost', back_populates='community',
-                           lazy='dynamic', cascade='all, delete-orphan')
+                           lazy='raise', cascade='all, delete-orphan', passive_deletes=True)
 
     def __repr__(self):
         return f'<Community {self.id}: {self.name}>'
@@ -512,8 +708,7 @@ class CommunityMember(db.Model):
     Community memberships (junction table).
 
     Attributes:
-        id (int): Primary key
-        community_id (int): Foreign key to Community
+        community_id (int): Foreign key to Community (primary key with user_id)
         user_id (int): Foreign key to User
         joined_at (datetime): Join timestamp
 
@@ -523,8 +718,8 @@ class CommunityMember(db.Model):
     """
     __tablename__ = 'community_members'
 
-    id = db.Column(db.Integer, primary_key=True)
-    community_id = db.Column(db.Integer, db.ForeignKey('communities.id'), nullable=False, index=True)
+    community_id = db.Column(db.Integer, db.ForeignKey('communities.id', ondelete='CASCADE'),
+                             nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     joined_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     last_viewed_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -533,8 +728,9 @@ class CommunityMember(db.Model):
     community = db.relationship('Community', back_populates='members')
     user = db.relationship('User')
 
-    # Unique constraint: one user can only join a community once
-    __table_args__ = (db.UniqueConstraint('community_id', 'user_id', name='unique_community_user'),)
+    # Composite primary key: one user can only join a community once (its
+    # index also covers the by-community lookups)
+    __table_args__ = (db.PrimaryKeyConstraint('community_id', 'user_id'),)
 
     def __repr__(self):
         return f'<CommunityMember User {self.user_id} in Community {self.community_id}>'
@@ -559,7 +755,8 @@ class CommunityPost(db.Model):
     __tablename__ = 'community_posts'
 
     id = db.Column(db.Integer, primary_key=True)
-    community_id = db.Column(db.Integer, db.ForeignKey('communities.id'), nullable=False, index=True)
+    community_id = db.Column(db.Integer, db.ForeignKey('communities.id', ondelete='CASCADE'),
+                             nullable=False, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     content = db.Column(db.Text, nullable=True)
     photo_url = db.Column(db.String(255))
@@ -569,6 +766,9 @@ class CommunityPost(db.Model):
     community = db.relationship('Community', back_populates='posts')
     user = db.relationship('User')
 
+    # A community's feed (newest first) is a range scan on this index
+    __table_args__ = (db.Index('ix_cpost_comm_time', 'community_id', 'created_at'),)
+
     def __repr__(self):
         return f'<CommunityPost {self.id} in Community {self.community_id}>'
 
@@ -602,11 +802,60 @@ class Streak(db.Model):
     points = db.Column(db.Integer, default=0)
     games_played = db.Column(db.Integer, default=0)
     games_won = db.Column(db.Integer, default=0)
-    last_login = db.Column(db.Date, default=datetime.utcnow().date)
+    # Evaluated per row: the old default=datetime.utcnow().date was a bound
+    # method of the datetime taken at import, so every new streak got the
+    # date the server started
+    last_login = db.Column(db.Date, default=lambda: datetime.utcnow().date())
 
     # Relationships
     user = db.relationship('User', back_populates='streak')
 
+    @classmethod
+    def bump(cls, user_id, today=None, session=None):
+        """
+        Records a login for the day as one INSERT ... ON CONFLICT DO UPDATE,
+        with the streak arithmetic done in SQL - no SELECT of the row and no
+        Streak object to track.
+
+        A missing row is created as a one-day streak. A login the day after
+        the last one extends the streak (10 points per streak day), a gap
+        resets it to 1 (10 points), and a second login on the same day
+        leaves the row untouched.
+
+        Args:
+            user_id (int): User logging in
+            today (date): Login date (defaults to date.today())
+            session: Session to execute on (defaults to db.session)
+
+        Returns:
+            int | None: The new current_streak, or None if the user already
+            logged in today
+        """
+        today = today or date.today()
+        yesterday = today - timedelta(days=1)
+        streak = cls.__table__.c
+        consecutive = streak.last_login == yesterday
+        new_streak = case((consecutive, streak.current_streak + 1), else_=1)
+
+        stmt = sqlite_insert(cls).values(
+            user_id=user_id, current_streak=1, longest_streak=1, points=10,
+            games_played=0, games_won=0, last_login=today
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[streak.user_id],
+            # Every right-hand side sees the row as it was before the update
+            set_={
+                'current_streak': new_streak,
+                'longest_streak': func.max(func.coalesce(streak.longest_streak, 0), new_streak),
+                'points': func.coalesce(streak.points, 0) + case(
+                    (consecutive, 10 * (streak.current_streak + 1)), else_=10
+                ),
+                'last_login': today,
+            },
+            where=streak.last_login.is_distinct_from(today),
+        ).returning(streak.current_streak)
+        return (session or db.session).execute(stmt).scalar()
+
     def __repr__(self):
         return f'<Streak User {self.user_id}: {self.current_streak} days>'
 
@@ -666,22 +915,30 @@ class ChatReport(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     message_id = db.Column(db.Integer, db.ForeignKey('messages.id'), nullable=True, index=True)
-    community_post_id = db.Column(db.Integer, db.ForeignKey('community_posts.id'), nullable=True, index=True)
+    # Reports outlive a deleted post (the database clears the link)
+    community_post_id = db.Column(db.Integer, db.ForeignKey('community_posts.id', ondelete='SET NULL'),
+                                  nullable=True, index=True)
     reported_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     reported_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
 
     reason = db.Column(db.String(100), nullable=False)  # Harassment, Inappropriate, Spam, etc.
     description = db.Column(db.Text)
-    status = db.Column(db.String(20), default='pending')  # pending, under_review, resolved, dismissed
+    STATUSES = ('pending', 'under_review', 'resolved', 'dismissed')
+
+    status = db.Column(EnumCode(*STATUSES), default='pending', index=True)
     admin_notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
 
     # Relationships
     message = db.relationship('Message', back_populates='reports')
-    community_post = db.relationship('CommunityPost', backref='reports')
+    community_post = db.relationship('CommunityPost',
+                                     backref=db.backref('reports', passive_deletes=True))
     reporter = db.relationship('User', foreign_keys=[reported_by])
     reported_user = db.relationship('User', foreign_keys=[reported_user_id])
 
+    # Admin report list: WHERE status = ? ORDER BY created_at DESC
+    __table_args__ = (db.Index('ix_chat_reports_status_created', 'status', created_at.desc()),)
+
     def __repr__(self):
         return f'<ChatReport {self.id}: {self.status}>'
 
@@ -719,11 +976,12 @@ class Checkin(db.Model):
 
 
 # ==================== NOTIFICATION MODEL ====================
-class Notification(db.Model):
+class Notification(Serializable, db.Model):
     """
     User notifications for events, games, etc.
     """
     __tablename__ = 'notifications'
+    __serialize__ = ('id', 'title', 'message', 'type', 'link')
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
@@ -735,7 +993,50 @@ class Notification(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # Relationship
-    user = db.relationship('User', backref=db.backref('notifications_list', lazy='dynamic'))
+    user = db.relationship('User', backref=db.backref('notifications_list', lazy='raise'))
+
+    # Unread bell list: WHERE user_id = ? AND is_read = 0 ORDER BY created_at DESC.
+    # Partial index - only unread rows are kept in it, so it stays tiny no
+    # matter how much notification history a user builds up
+    __table_args__ = (db.Index('ix_notifications_unread', 'user_id', created_at.desc(),
+                               sqlite_where=db.text('is_read = 0'),
+                               postgresql_where=db.text('is_read = false')),)
+
+    @classmethod
+    def is_unread(cls):
+        """
+        Filter for unread notifications. false() renders as a literal 0 on
+        SQLite (a bound False would not), which is what lets the planner match
+        the partial ix_notifications_unread index.
+        """
+        return cls.is_read == false()
+
+    @classmethod
+    def bulk_create(cls, rows, session=None):
+        """
+        Inserts many notifications as one multi-row INSERT ... RETURNING,
+        without building a Notification object (or a flush) per row.
+
+        ORM events such as after_insert do not fire for these rows; the
+        returned rows carry everything needed to act on them instead.
+
+        Args:
+            rows (list[dict]): Column values per notification
+            session: Session to execute on (defaults to db.session)
+
+        Returns:
+            list[Row]: id, user_id, title, message, type, link, created_at of
+            each inserted row (not necessarily in the order given)
+        """
+        if not rows:
+            return []
+        return (session or db.session).execute(
+            insert(cls)
+            .returning(cls.id, cls.user_id, cls.title, cls.message, cls.type,
+                       cls.link, cls.created_at)
+            .execution_options(render_nulls=True),
+            rows
+        ).all()
 
     def __repr__(self):
         return f'<Notification {self.id}: {self.title}>'
@@ -770,6 +1071,9 @@ class Game(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
+    # Which game page a session opens: 'chess', 'xiangqi' or 'tictactoe'.
+    # Routing and lookups key off this rather than the display title.
+    kind = db.Column(db.String(16), index=True, nullable=False, default='chess')
     description = db.Column(db.Text)
     icon = db.Column(db.String(50))  # e.g., 'fas fa-chess'
     
@@ -789,7 +1093,7 @@ class Game(db.Model):
     # Visuals
     bg_gradient = db.Column(db.String(255))  # CSS gradient string
 
-    sessions = db.relationship('GameSession', back_populates='game', lazy='dynamic')
+    sessions = db.relationship('GameSession', back_populates='game', lazy='raise')
 
     def __repr__(self):
         return f'<Game {self.title}>'
@@ -823,6 +1127,31 @@ class GameSession(db.Model):
     player2 = db.relationship('User', foreign_keys=[player2_id])
     winner = db.relationship('User', foreign_keys=[winner_id])
 
+    # Statuses of a session that is still being played or waiting to start
+    OPEN_STATUSES = ('active', 'waiting')
+
+    # "Latest open session for this player" is looked up from either seat
+    # (see player_sessions_select in utils), one index per side. ix_gs_open
+    # only holds open sessions, so the challenge lookup for a pair stays
+    # small however many finished games pile up.
+    __table_args__ = (
+        db.Index('ix_gs_p1_status_created', 'player1_id', 'status', created_at.desc()),
+        db.Index('ix_gs_p2_status_created', 'player2_id', 'status', created_at.desc()),
+        db.Index('ix_gs_open', 'player1_id', 'player2_id', created_at.desc(),
+                 sqlite_where=status.in_(OPEN_STATUSES)),
+    )
+
+    @classmethod
+    def is_open(cls):
+        """
+        Filter for open sessions. The statuses are rendered inline rather than
+        bound: SQLite only plans the partial ix_gs_open index when the query's
+        IN list literally matches the index's WHERE clause.
+        """
+        return cls.status.in_(bindparam(
+            'open_statuses', cls.OPEN_STATUSES, expanding=True, literal_execute=True, unique=True
+        ))
+
 class GameHistory(db.Model):
     """
     History of completed games for stats and ELO tracking.
@@ -876,3 +1205,24 @@ class TicTacToeSession(db.Model):
 
     def __repr__(self):
         return f'<TicTacToeSession {self.id}: {self.status}>'
+
+
+# ==================== PREBUILT STATEMENTS ====================
+# Hot lookups built once at import with named bind parameters, instead of
+# constructing a new Query/filter_by tree on every call. Execute with the
+# parameters, e.g. db.session.execute(SELECT_USER_BY_USERNAME, {'username': x}).
+
+SELECT_USER_BY_USERNAME = select(User).options(undefer(User.password_hash))\
+    .where(User.username == bindparam('username'))
+
+USERNAME_TAKEN = select(exists().where(User.username == bindparam('username')))
+
+EMAIL_TAKEN = select(exists().where(User.email == bindparam('email')))
+
+REGISTRATION_CODE_AVAILABLE = select(exists().where(
+    RegistrationCode.code == bindparam('code'), RegistrationCode.is_used == false()
+))
+
+SELECT_UNREAD_NOTIFICATIONS = select(Notification).where(
+    Notification.user_id == bindparam('user_id'), Notification.is_unread()
+).order_by(Notification.created_at.desc())
@@ -1,18 +1,18 @@
 from app import app, db
-from sqlalchemy import text
+from fix_database import add_column
 
 with app.app_context():
     print("Adding 'disable_reason' column to 'users' table...")
-    
+
+    # The connection comes from the app's engine, so the SQLite connect hook
+    # in app.py has already switched it to WAL with synchronous=NORMAL and
+    # the larger page cache before the ALTER runs
     with db.engine.connect() as conn:
-        trans = conn.begin()
         try:
-            conn.execute(text("ALTER TABLE users ADD COLUMN disable_reason TEXT"))
-            trans.commit()
-            print("Success: Added 'disable_reason' column.")
+            # add_column checks PRAGMA table_info first, so a re-run is a
+            # metadata read rather than a failed ALTER
+            add_column(conn, 'users', 'disable_reason', 'TEXT')
+            conn.commit()
         except Exception as e:
-            trans.rollback()
-            if "duplicate column" in str(e).lower():
-                print("Column already exists.")
-            else:
-                print(f"Error: {e}")
\ No newline at end of file
+            conn.rollback()
+            print(f"Error: {e}")
@@ -1,7 +1,14 @@
+import os
+from datetime import datetime, timedelta
 from app import app
 from models import db, User, Community, Pair, Event, EventParticipant, Badge, Streak, Game, GameSession
+from sqlalchemy import insert
 from werkzeug.security import generate_password_hash
 
+# Rows are inserted per table with db.session.execute(insert(Model), rows):
+# one executemany per table instead of an ORM object and flush per row, and
+# everything is committed once at the end.
+
 def seed_data():
     with app.app_context():
         # Reset Database
@@ -10,6 +17,27 @@ def seed_data():
         print("Creating all tables...")
         db.create_all()
 
+        # Other youth for the leaderboard (inserted further down)
+        other_youth_data = [
+            ('sarah_chen', 'Sarah Chen', 1250, 18, 127),
+            ('david_tan', 'David Tan', 980, 15, 98),
+            ('emily_wong', 'Emily Wong', 850, 11, 87),
+            ('marcus_lim', 'Marcus Lim', 720, 10, 75)
+        ]
+
+        # Every seeded account shares the password 'password123', so it is
+        # hashed once and the same hash reused - the hashing dominated the
+        # seed run. Fine for local test accounts; real passwords still get a
+        # fresh salt each through the register/change-password routes
+        # GENCON_SEED_FAST=1 swaps in a cheap 1000-round PBKDF2 for throwaway
+        # databases; login re-hashes it with the real method (see
+        # User.password_needs_rehash), so app behaviour is unchanged
+        if os.environ.get('GENCON_SEED_FAST'):
+            seed_hash_method = 'pbkdf2:sha256:1000'
+        else:
+            seed_hash_method = User.PASSWORD_HASH_METHOD
+        seed_password_hash = generate_password_hash('password123', method=seed_hash_method)
+
         # Create Users
         print("Creating users...")
         admin = User(
@@ -18,7 +46,7 @@ def seed_data():
             full_name='System Admin',
             age=30,
             role='admin',
-            password_hash=generate_password_hash('password123')
+            password_hash=seed_password_hash
         )
         
         senior = User(
@@ -27,8 +55,8 @@ def seed_data():
             full_name='Madam Tan',
             age=72,
             role='senior',
-            password_hash=generate_password_hash('password123'),
-            interests_json='["Cooking", "Stories"]'
+            password_hash=seed_password_hash,
+            interests=["Cooking", "Stories"]
         )
         
         youth = User(
@@ -37,14 +65,12 @@ def seed_data():
             full_name='Ryan Lee',
             age=19,
             role='youth',
-            password_hash=generate_password_hash('password123'),
-            interests_json='["Tech", "Games"]'
+            password_hash=seed_password_hash,
+            interests=["Tech", "Games"]
         )
         
-        db.session.add(admin)
-        db.session.add(senior)
-        db.session.add(youth)
-        db.session.commit()
+        db.session.add_all([admin, senior, youth])
+        db.session.flush()  # ids for the created_by / user_id columns below
 
         # Create Communities
         print("Creating communities...")
@@ -153,196 +179,149 @@ def seed_data():
             }
         ]
 
-        # Add Senior Communities
-        for c in senior_comms:
-            if not Community.query.filter_by(name=c['name']).first():
-                comm = Community(
-                    name=c['name'],
-                    type=c['type'],
-                    icon=c['icon'],
-                    banner_class=c['banner_class'],
-                    tags=c['tags'],
-                    description=c['desc'],
-                    created_by=admin.id,
-                    member_count=0 
-                )
-                db.session.add(comm)
-        
-        # Add Youth Communities
-        for c in youth_comms:
-            if not Community.query.filter_by(name=c['name']).first():
-                comm = Community(
-                    name=c['name'],
-                    type=c['type'],
-                    icon=c['icon'],
-                    banner_class=c['banner_class'],
-                    tags=c['tags'],
-                    description=c['desc'],
-                    created_by=admin.id,
-                    member_count=0 
-                )
-                db.session.add(comm)
-
-        db.session.commit()
+        # Add Senior and Youth Communities (the tables were just recreated,
+        # so there are no existing names to skip)
+        db.session.execute(insert(Community), [{
+            'name': c['name'],
+            'type': c['type'],
+            'icon': c['icon'],
+            'banner_class': c['banner_class'],
+            'tags': c['tags'],
+            'description': c['desc'],
+            'created_by': admin.id,
+            'member_count': 0
+        } for c in senior_comms + youth_comms])
         print("Database seeded with communities.")
 
         # Create Events
         print("Creating events...")
-        from datetime import datetime, timedelta
-
-        event1 = Event(
-            title='Traditional Storytelling Session',
-            description='Learn the art of storytelling from experienced seniors. Help document their life stories and preserve cultural heritage.',
-            event_type='in-person',
-            location='Toa Payoh Community Center',
-            date=datetime.utcnow() + timedelta(days=10),
-            capacity=20,
-            created_by=admin.id
-        )
-
-        event2 = Event(
-            title='Digital Literacy Workshop for Seniors',
-            description='A workshop for youth volunteers to learn how to teach seniors basic digital skills like using a smartphone and video calling.',
-            event_type='online',
-            location='Zoom',
-            date=datetime.utcnow() + timedelta(days=15),
-            capacity=50,
-            created_by=admin.id
-        )
-        
-        event3 = Event(
-            title='Heritage Cooking Class',
-            description='Learn to cook traditional dishes from senior chefs. Document recipes and cooking techniques passed down through generations.',
-            event_type='in-person',
-            location='Ang Mo Kio Community Kitchen',
-            date=datetime.utcnow() + timedelta(days=25),
-            capacity=15,
-            created_by=admin.id
-        )
-
-        db.session.add(event1)
-        db.session.add(event2)
-        db.session.add(event3)
-        db.session.commit()
+        db.session.execute(insert(Event), [
+            {
+                'title': 'Traditional Storytelling Session',
+                'description': 'Learn the art of storytelling from experienced seniors. Help document their life stories and preserve cultural heritage.',
+                'event_type': 'in-person',
+                'location': 'Toa Payoh Community Center',
+                'date': datetime.utcnow() + timedelta(days=10),
+                'capacity': 20,
+                'created_by': admin.id
+            },
+            {
+                'title': 'Digital Literacy Workshop for Seniors',
+                'description': 'A workshop for youth volunteers to learn how to teach seniors basic digital skills like using a smartphone and video calling.',
+                'event_type': 'online',
+                'location': 'Zoom',
+                'date': datetime.utcnow() + timedelta(days=15),
+                'capacity': 50,
+                'created_by': admin.id
+            },
+            {
+                'title': 'Heritage Cooking Class',
+                'description': 'Learn to cook traditional dishes from senior chefs. Document recipes and cooking techniques passed down through generations.',
+                'event_type': 'in-person',
+                'location': 'Ang Mo Kio Community Kitchen',
+                'date': datetime.utcnow() + timedelta(days=25),
+                'capacity': 15,
+                'created_by': admin.id
+            }
+        ])
         print("Database seeded with events.")
 
         # Create Streaks and Badges for Youth
         print("Seeding youth progress...")
-        from models import Badge, Streak
-        
-        # Streak for Ryan
-        ryan_streak = Streak(
-            user_id=youth.id,
-            current_streak=5,
-            longest_streak=12,
-            points=450,
-            games_played=12,
-            games_won=8
-        )
-        db.session.add(ryan_streak)
 
-        # Streak for Senior
-        senior_streak = Streak(
-            user_id=senior.id,
-            current_streak=3,
-            points=350,
-            games_played=15,
-            games_won=10
-        )
-        db.session.add(senior_streak)
+        # Streaks for Ryan and the Senior
+        streak_rows = [
+            {'user_id': youth.id, 'current_streak': 5, 'longest_streak': 12,
+             'points': 450, 'games_played': 12, 'games_won': 8},
+            {'user_id': senior.id, 'current_streak': 3,
+             'points': 350, 'games_played': 15, 'games_won': 10}
+        ]
 
         # Badges for Ryan
-        badges = [
-            Badge(user_id=youth.id, badge_type='First Steps'),
-            Badge(user_id=youth.id, badge_type='Story Keeper'),
-            Badge(user_id=youth.id, badge_type='Tech Wizard'),
-            Badge(user_id=youth.id, badge_type='Heritage Champion')
+        badge_rows = [
+            {'user_id': youth.id, 'badge_type': badge_type}
+            for badge_type in ('First Steps', 'Story Keeper', 'Tech Wizard', 'Heritage Champion')
         ]
-        for b in badges:
-            db.session.add(b)
 
-        # Create other youth for leaderboard
-        other_youth_data = [
-            ('sarah_chen', 'Sarah Chen', 1250, 18, 127),
-            ('david_tan', 'David Tan', 980, 15, 98),
-            ('emily_wong', 'Emily Wong', 850, 11, 87),
-            ('marcus_lim', 'Marcus Lim', 720, 10, 75)
-        ]
-        
+        # One INSERT ... RETURNING for all of them gives the ids their
+        # streak and badge rows need
+        user_ids = dict(db.session.execute(
+            insert(User).returning(User.username, User.id),
+            [{
+                'username': username,
+                'email': f"{username}@gencon.sg",
+                'full_name': name,
+                'age': 20,
+                'role': 'youth',
+                'password_hash': seed_password_hash
+            } for username, name, pts, badge_count, hours in other_youth_data]
+        ).all())
+
         for username, name, pts, badge_count, hours in other_youth_data:
-            u = User(
-                username=username,
-                email=f"{username}@gencon.sg",
-                full_name=name,
-                age=20,
-                role='youth',
-                password_hash=generate_password_hash('password123')
-            )
-            db.session.add(u)
-            db.session.flush() # Get ID
-            
+            user_id = user_ids[username]
+
             # Add streak/points
-            s = Streak(user_id=u.id, points=pts, current_streak=badge_count) # Using current_streak as proxy for badges for now
-            db.session.add(s)
-            
+            streak_rows.append({'user_id': user_id, 'points': pts, 'current_streak': badge_count}) # Using current_streak as proxy for badges for now
+
             # Add some badges to make them show up in counts
-            for i in range(badge_count):
-                db.session.add(Badge(user_id=u.id, badge_type=f'Badge {i}'))
+            badge_rows.extend({'user_id': user_id, 'badge_type': f'Badge {i}'} for i in range(badge_count))
 
-        db.session.commit()
+        db.session.execute(insert(Streak), streak_rows)
+        db.session.execute(insert(Badge), badge_rows)
         print("Database seeded successfully!")
 
         # Create Games
         print("Seeding games...")
-        games_list = [
-            Game(
-                title='International Chess',
-                description='The classic game of strategy. Command your army, protect your King, and checkmate your opponent!',
-                icon='fas fa-chess-king',
-                badge_label='Strategy',
-                badge_class='modern',
-                badge_icon='fas fa-brain',
-                players_text='2 Players',
-                duration_text='20-40 min',
-                type_label='Strategy',
-                type_icon='fas fa-brain',
-                bg_gradient='background: linear-gradient(135deg, #2C3E50 0%, #4CA1AF 100%);'
-            ),
-            Game(
-                title='Chinese Chess (Xiangqi)',
-                description='A traditional strategy board game for two players. Capture the enemy General to win!',
-                icon='fas fa-chess-board',
-                badge_label='Traditional',
-                badge_class='traditional',
-                badge_icon='fas fa-landmark',
-                players_text='2 Players',
-                duration_text='20-40 min',
-                type_label='Strategy',
-                type_icon='fas fa-brain',
-                bg_gradient='background: linear-gradient(135deg, #C0392B 0%, #E74C3C 100%);'
-            ),
-            Game(
-                title='Tic-Tac-Toe',
-                description='Simple, fast, and fun! Get three in a row to win. A perfect quick game to play during a chat session.',
-                icon='fas fa-th',
-                badge_label='Classic',
-                badge_class='modern',
-                badge_icon='fas fa-laptop',
-                players_text='2 Players',
-                duration_text='2-5 min',
-                type_label='Logic',
-                type_icon='fas fa-lightbulb',
-                bg_gradient='' # specific class handles it
-            )
-        ]
-        
-        for g in games_list:
-            db.session.add(g)
-        db.session.commit()
-        
+        # Plain row dicts in one INSERT ... RETURNING, keyed back by kind for
+        # the seeded session below
+        game_ids = dict(db.session.execute(insert(Game).returning(Game.kind, Game.id), [
+            {
+                'title': 'International Chess',
+                'kind': 'chess',
+                'description': 'The classic game of strategy. Command your army, protect your King, and checkmate your opponent!',
+                'icon': 'fas fa-chess-king',
+                'badge_label': 'Strategy',
+                'badge_class': 'modern',
+                'badge_icon': 'fas fa-brain',
+                'players_text': '2 Players',
+                'duration_text': '20-40 min',
+                'type_label': 'Strategy',
+                'type_icon': 'fas fa-brain',
+                'bg_gradient': 'background: linear-gradient(135deg, #2C3E50 0%, #4CA1AF 100%);'
+            },
+            {
+                'title': 'Chinese Chess (Xiangqi)',
+                'kind': 'xiangqi',
+                'description': 'A traditional strategy board game for two players. Capture the enemy General to win!',
+                'icon': 'fas fa-chess-board',
+                'badge_label': 'Traditional',
+                'badge_class': 'traditional',
+                'badge_icon': 'fas fa-landmark',
+                'players_text': '2 Players',
+                'duration_text': '20-40 min',
+                'type_label': 'Strategy',
+                'type_icon': 'fas fa-brain',
+                'bg_gradient': 'background: linear-gradient(135deg, #C0392B 0%, #E74C3C 100%);'
+            },
+            {
+                'title': 'Tic-Tac-Toe',
+                'kind': 'tictactoe',
+                'description': 'Simple, fast, and fun! Get three in a row to win. A perfect quick game to play during a chat session.',
+                'icon': 'fas fa-th',
+                'badge_label': 'Classic',
+                'badge_class': 'modern',
+                'badge_icon': 'fas fa-laptop',
+                'players_text': '2 Players',
+                'duration_text': '2-5 min',
+                'type_label': 'Logic',
+                'type_icon': 'fas fa-lightbulb',
+                'bg_gradient': '' # specific class handles it
+            }
+        ]).all())
+
         # Create active game session
-        chess = Game.query.filter_by(title='International Chess').first()
-        
+        chess_id = game_ids['chess']
+
         # Create Buddy Pair (ESSENTIAL for buddy features to work)
         if senior and youth:
             pair = Pair(
@@ -352,20 +331,23 @@ def seed_data():
                 status='active'
             )
             db.session.add(pair)
-            db.session.commit()
             print("Seeded buddy pair.")
 
-        if chess and senior and youth:
+        if chess_id and senior and youth:
             gs = GameSession(
-                game_id=chess.id,
+                game_id=chess_id,
                 player1_id=senior.id,
                 player2_id=youth.id,
                 current_turn_id=senior.id, # Senior's turn
                 status='waiting' # Set to waiting to test readiness
             )
             db.session.add(gs)
-            db.session.commit()
             print("Seeded waiting game session.")
 
+        # Everything above goes in as one transaction. Nothing is committed
+        # before this point, so if any step raises, leaving the app context
+        # closes the session and rolls the whole seed back
+        db.session.commit()
+
 if __name__ == '__main__':
     seed_data()
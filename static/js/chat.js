@@ -4,7 +4,7 @@
  * Author: to be assigned
  * Date: January 2026
  * Description: 
- *   - Polls the server for new messages every 3 seconds
+ *   - Polls the server for new messages every 3 seconds (after_id cursor)
  *   - Updates the chat UI dynamically without page reload
  *   - Auto-scrolls to the newest message
  */
@@ -18,28 +18,96 @@ document.addEventListener('DOMContentLoaded', function() {
     const role = window.location.pathname.split('/')[1]; // 'senior' or 'youth'
     const apiEndpoint = `/${role}/api/messages`;
     
-    let lastMessageCount = 0;
+    // Highest message id rendered so far - sent as ?after_id= so each poll
+    // only returns messages we haven't seen yet
+    let lastMessageId = null;
+
+    /**
+     * Format an ISO timestamp from the API as "02:30 PM" (Singapore time).
+     * Server stores UTC without an offset, so we append 'Z' before parsing.
+     * @param {string} iso - created_at value from the API
+     */
+    function formatTime(iso) {
+        const date = new Date(iso.endsWith('Z') ? iso : iso + 'Z');
+        if (isNaN(date)) return iso; // Already a display string (?fmt=display)
+        return date.toLocaleTimeString('en-US', {
+            hour: '2-digit', minute: '2-digit', hour12: true, timeZone: 'Asia/Singapore'
+        });
+    }
 
     /**
      * Fetch messages from the server and update the UI
      */
     function fetchMessages() {
-        fetch(apiEndpoint)
+        const url = lastMessageId === null ? apiEndpoint : `${apiEndpoint}?after_id=${lastMessageId}`;
+        fetch(url)
             .then(response => response.json())
             .then(data => {
                 const messages = data.messages;
                 
-                // Only update if we have new messages or if it's the first load
-                // This is a simple optimization. Ideally, we'd check IDs.
-                if (messages.length !== lastMessageCount) {
+                if (lastMessageId === null) {
+                    // First load: render the full history
                     renderMessages(messages);
-                    lastMessageCount = messages.length;
                     scrollToBottom();
+                } else if (messages.length > 0) {
+                    // Later polls: append only the new messages
+                    appendMessages(messages);
+                    scrollToBottom();
+                }
+                
+                if (messages.length > 0) {
+                    lastMessageId = messages[messages.length - 1].id;
+                } else if (lastMessageId === null) {
+                    lastMessageId = 0;
                 }
             })
             .catch(error => console.error('Error fetching messages:', error));
     }
 
+    /**
+     * Build the HTML for a single message bubble
+     * @param {Object} msg - Message object from API
+     */
+    function messageHtml(msg) {
+        const sideClass = msg.is_me ? 'me' : 'other';
+        
+        // Flagged content warning
+        const flaggedAlert = msg.is_flagged ? `
+            <div class="flagged-warning">
+                <i class="fas fa-exclamation-triangle me-1"></i>
+                <small>Unkind language detected</small>
+            </div>
+        ` : '';
+
+        // Translation box (if applicable)
+        const translationBox = msg.translated_content ? `
+            <div class="translation-text">
+                <i class="fas fa-language"></i> ${msg.translated_content}
+            </div>
+        ` : '';
+
+        // Report button (only for received messages)
+        const reportBtn = !msg.is_me ? `
+            <button class="btn btn-link btn-sm text-muted p-0 ms-2 report-btn" onclick="openReportModal(${msg.id})" title="Report Message">
+                <i class="far fa-flag" style="font-size: 0.8rem;"></i>
+            </button>
+        ` : '';
+
+        return `
+            <div class="message-wrapper ${sideClass}">
+                <div class="message-bubble">
+                    ${flaggedAlert}
+                    <div class="content-text">${msg.content}</div>
+                    ${translationBox}
+                    <div class="d-flex justify-content-end align-items-center mt-1">
+                        <div class="time-stamp mb-0">${formatTime(msg.created_at)}</div>
+                        ${reportBtn}
+                    </div>
+                </div>
+            </div>
+        `;
+    }
+
     /**
      * Render the list of messages into the chat container
      * @param {Array} messages - List of message objects from API
@@ -58,47 +126,21 @@ document.addEventListener('DOMContentLoaded', function() {
         }
 
         // Build HTML string for all messages
-        const messagesHtml = messages.map(msg => {
-            const sideClass = msg.is_me ? 'me' : 'other';
-            
-            // Flagged content warning
-            const flaggedAlert = msg.is_flagged ? `
-                <div class="flagged-warning">
-                    <i class="fas fa-exclamation-triangle me-1"></i>
-                    <small>Unkind language detected</small>
-                </div>
-            ` : '';
-
-            // Translation box (if applicable)
-            const translationBox = msg.translated_content ? `
-                <div class="translation-text">
-                    <i class="fas fa-language"></i> ${msg.translated_content}
-                </div>
-            ` : '';
-
-            // Report button (only for received messages)
-            const reportBtn = !msg.is_me ? `
-                <button class="btn btn-link btn-sm text-muted p-0 ms-2 report-btn" onclick="openReportModal(${msg.id})" title="Report Message">
-                    <i class="far fa-flag" style="font-size: 0.8rem;"></i>
-                </button>
-            ` : '';
-
-            return `
-                <div class="message-wrapper ${sideClass}">
-                    <div class="message-bubble">
-                        ${flaggedAlert}
-                        <div class="content-text">${msg.content}</div>
-                        ${translationBox}
-                        <div class="d-flex justify-content-end align-items-center mt-1">
-                            <div class="time-stamp mb-0">${msg.created_at}</div>
-                            ${reportBtn}
-                        </div>
-                    </div>
-                </div>
-            `;
-        }).join('');
+        chatMessages.innerHTML = messages.map(messageHtml).join('');
+    }
 
-        chatMessages.innerHTML = messagesHtml;
+    /**
+     * Append newly received messages below the existing ones
+     * @param {Array} messages - New message objects from API
+     */
+    function appendMessages(messages) {
+        if (!chatMessages) return;
+        
+        // Drop the empty-state placeholder once the first message arrives
+        const emptyState = chatMessages.querySelector('.empty-chat-state');
+        if (emptyState) emptyState.remove();
+        
+        chatMessages.insertAdjacentHTML('beforeend', messages.map(messageHtml).join(''));
     }
 
     /**
@@ -1,5 +1,108 @@
+import fnmatch
+import hashlib
+import os
 import re
-from config import Config
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from datetime import datetime, timedelta
+from pathlib import Path
+from werkzeug.utils import secure_filename
+from flask import abort, current_app, g, request, session
+from flask.json.provider import DefaultJSONProvider
+from flask_caching import Cache
+from sqlalchemy import and_, delete, exists, func, literal, or_, select, union_all, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import aliased, contains_eager, joinedload, load_only, raiseload
+from config import Config, orjson
+from models import (db, Community, CommunityMember, CommunityPost, Event, EventParticipant, Game, GameSession,
+                    Message, MessageTranslation, Pair, Story, StoryComment, StoryReaction, User)
+
+# Shared cache (initialised in app.py; backend chosen by CACHE_TYPE in config)
+cache = Cache()
+
+# Timestamps are stored in UTC and shown in Singapore time (UTC+8). Built
+# once here instead of a new timedelta per formatted row.
+SG_OFFSET = timedelta(hours=8)
+CHAT_TIME_FORMAT = '%I:%M %p' # e.g. 02:30 PM
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson (installed in app.py as app.json
+    when orjson is available).
+    Every `return {...}` / jsonify response is encoded in C and the bytes go
+    straight into the response body, without the stdlib encoder or a str copy.
+    Dates are passed through to Flask's default handler, so they keep the
+    same RFC 822 format as before; so does anything else orjson can't encode.
+
+    Calls that pass stdlib options (the session cookie serializer uses
+    separators= and object_hook= to round-trip tuples) go to the stdlib
+    implementation, since orjson would silently ignore them.
+    """
+    if orjson is not None:
+        _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._OPTIONS).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self._OPTIONS),
+            mimetype=self.mimetype
+        )
+
+def _asterisks(match):
+    """Replacement for one unkind-word match: asterisks of the same length."""
+    return '*' * (match.end() - match.start())
+
+
+# The word list is fixed at import, so the compiled pattern's sub is bound
+# once here rather than looked up through Config on every filter_text call
+# (None when there are no unkind words configured)
+_unkind_sub = Config.UNKIND_WORDS_RE.sub if Config.UNKIND_WORDS_RE is not None else None
+
+
+def _is_word_char(char):
+    """Same test as the regex \\w: letters, digits and underscore."""
+    return char.isalnum() or char == '_'
+
+
+def _mask_with_automaton(text, automaton):
+    """
+    Masks whole-word unkind matches using the app's Aho-Corasick automaton.
+
+    The automaton reports every word ending at each position in one C-level
+    pass; a hit is masked only if it sits on word boundaries, as the regex's
+    \\b requires. Returns None when lower-casing changes the text's length
+    (a few Unicode characters do), since match offsets would no longer line
+    up - the caller then uses the regex.
+    """
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        return None
+
+    chars = None
+    last = len(lowered) - 1
+    for end, word in automaton.iter(lowered):
+        start = end - len(word) + 1
+        if start > 0 and _is_word_char(lowered[start - 1]):
+            continue
+        if end < last and _is_word_char(lowered[end + 1]):
+            continue
+        if chars is None:
+            chars = list(text)
+        chars[start:end + 1] = '*' * len(word)
+    return text if chars is None else ''.join(chars)
+
 
 def filter_text(text):
     """
@@ -14,15 +117,896 @@ def filter_text(text):
     """
     if not text:
         return ""
-        
-    filtered_text = text
-    # Get words from config, default to empty list if not found
-    unkind_words = getattr(Config, 'UNKIND_WORDS', [])
-    
-    for word in unkind_words:
-        # Use regex to replace whole words only, case-insensitive
-        # \b ensures we match "word" but not "sword"
-        pattern = re.compile(r'\b' + re.escape(word) + r'\b', re.IGNORECASE)
-        filtered_text = pattern.sub('*' * len(word), filtered_text)
-        
-    return filtered_text
+    # No word list configured: nothing can match
+    if _unkind_sub is None:
+        return text
+
+    # With pyahocorasick installed, app.py's automaton finds every word in
+    # a single scan whatever the list's size
+    matcher = current_app.extensions.get('unkind_ac')
+    if matcher is not None and not isinstance(matcher, re.Pattern):
+        masked = _mask_with_automaton(text, matcher)
+        if masked is not None:
+            return masked
+
+    # Otherwise one pass over the text with the precompiled alternation from
+    # config; each match becomes asterisks of the same length (a module-level
+    # callback, sized from the match span without copying the word out)
+    return _unkind_sub(_asterisks, text)
+
+
+def strict_loading(*options):
+    """
+    Builds loader options for hot JSON endpoints.
+
+    In debug/testing the given eager-load options are followed by
+    raiseload('*'), so any relationship touched without being loaded up front
+    raises instead of silently issuing one SELECT per row (N+1). In
+    production only the given options are applied.
+
+    Args:
+        *options: Loader options the endpoint actually needs (e.g. selectinload).
+
+    Returns:
+        list: Options to pass to Query.options(*...).
+    """
+    opts = list(options)
+    if current_app.debug or current_app.testing:
+        opts.append(raiseload('*'))
+    return opts
+
+
+
+def no_autoflush(f):
+    """
+    Decorator for read-only routes: runs the view with autoflush disabled.
+
+    Read routes never have pending changes worth flushing, so this skips the
+    flush check SQLAlchemy otherwise performs before every query.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        with db.session.no_autoflush:
+            return f(*args, **kwargs)
+    return decorated_function
+
+def get_user(user_id):
+    """
+    Returns a User by id, loaded at most once per request.
+
+    Lookups are memoised in a dict on flask.g keyed by id, so repeated
+    lookups of the same user (the current user, a buddy, both players of a
+    game) skip even the identity-map dispatch after the first one.
+
+    Args:
+        user_id (int): The user's id.
+
+    Returns:
+        User | None: The user, or None if no such user exists.
+    """
+    users = g.setdefault('_user_cache', {})
+    if user_id not in users:
+        users[user_id] = db.session.get(User, user_id)
+    return users[user_id]
+
+
+def get_current_user():
+    """
+    Returns the logged-in User, loaded at most once per request.
+
+    The row comes from get_user() (identity-map aware and memoised on
+    flask.g), so a route, its helpers and the context processor all share one
+    SELECT. Requests that never ask for the user don't pay for it at all.
+
+    Returns:
+        User | None: The current user, or None if nobody is logged in.
+    """
+    user_id = session.get('user_id')
+    return get_user(user_id) if user_id else None
+
+
+def get_current_pair():
+    """
+    Returns the logged-in user's active buddy Pair, loaded once per request.
+
+    Looks the pair up by senior_id or youth_id depending on the session role
+    and memoises it on flask.g alongside the current user.
+
+    Returns:
+        Pair | None: The active pair, or None if unpaired / not a senior or youth.
+    """
+    if 'current_pair' not in g:
+        user_id = session.get('user_id')
+        role = session.get('role')
+        pair = None
+        # The buddy is joined in the same SELECT, so pair.senior / pair.youth
+        # (see get_current_buddy) never needs a follow-up query
+        if user_id and role == 'youth':
+            pair = Pair.query.options(joinedload(Pair.senior))\
+                .filter_by(youth_id=user_id, status='active').first()
+        elif user_id and role == 'senior':
+            pair = Pair.query.options(joinedload(Pair.youth))\
+                .filter_by(senior_id=user_id, status='active').first()
+        g.current_pair = pair
+    return g.current_pair
+
+
+def get_current_buddy():
+    """
+    Returns the logged-in user's buddy (the other side of the active pair).
+
+    Returns:
+        User | None: The paired senior for a youth, the paired youth for a
+        senior, or None if unpaired.
+    """
+    pair = get_current_pair()
+    if pair is None:
+        return None
+    return pair.senior if session.get('role') == 'youth' else pair.youth
+
+
+def conversation_select(user_id, buddy_id, *entities, after_id=0):
+    """
+    Builds the "messages between two users" statement used by the chat views.
+
+    A UNION ALL of the two directions: each branch is an index seek on
+    ix_msg_conv (sender_id, recipient_id, created_at), which a single OR
+    across both pairs can't use. Callers add their own ORDER BY/LIMIT.
+
+    Args:
+        user_id (int): One side of the conversation.
+        buddy_id (int): The other side.
+        *entities: What to select - Message itself or individual columns.
+        after_id (int): Only include messages with a higher id (poll cursor).
+
+    Returns:
+        CompoundSelect: The UNION ALL statement.
+    """
+    def direction(sender_id, recipient_id):
+        return select(*entities).where(
+            Message.sender_id == sender_id,
+            Message.recipient_id == recipient_id,
+            Message.id > after_id
+        )
+
+    return union_all(direction(user_id, buddy_id), direction(buddy_id, user_id))
+
+
+def player_sessions_select(user_id, *entities, statuses=None):
+    """
+    Builds the "game sessions this user is playing in" statement.
+
+    Same idea as conversation_select: a UNION ALL of the player1 and player2
+    seats, so each branch seeks ix_gs_p1_status_created / ix_gs_p2_status_created
+    instead of the OR forcing a scan. Callers add their own ORDER BY/LIMIT.
+
+    Args:
+        user_id (int): The player.
+        *entities: What to select - GameSession itself or individual columns.
+        statuses (tuple): Session statuses to include (default: open sessions).
+
+    Returns:
+        CompoundSelect: The UNION ALL statement.
+    """
+    status_filter = GameSession.status.in_(statuses) if statuses else GameSession.is_open()
+
+    def seat(column):
+        return select(*entities).where(column == user_id, status_filter)
+
+    return union_all(seat(GameSession.player1_id), seat(GameSession.player2_id))
+
+
+# Chunk size used when streaming uploads to disk
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def save_upload_hashed(file, upload_folder):
+    """
+    Streams an uploaded file to disk under a content-hashed name.
+
+    The upload is copied in UPLOAD_CHUNK_SIZE chunks (never read fully into
+    memory) into a temp file in the upload folder while being hashed with
+    SHA-256, then atomically renamed to '<sha256>.<ext>'. Identical images
+    map to the same file, which can then be shared between users or posts:
+    check upload_in_use before deleting a replaced one.
+
+    Args:
+        file (FileStorage): The uploaded file from the form.
+        upload_folder (str): Directory to store the file in.
+
+    Returns:
+        str: The stored filename (relative to upload_folder).
+    """
+    ext = Path(secure_filename(file.filename)).suffix.lower()
+    hasher = hashlib.sha256()
+
+    fd, tmp_path = tempfile.mkstemp(dir=upload_folder, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = file.stream.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                out.write(chunk)
+
+        filename = f"{hasher.hexdigest()}{ext}"
+        # Atomic rename; re-uploading the same image just replaces identical bytes
+        os.replace(tmp_path, os.path.join(upload_folder, filename))
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+    return filename
+
+
+def upload_in_use(url):
+    """
+    Whether a content-hashed upload is still referenced after a change.
+
+    save_upload_hashed gives identical images the same file, so a replaced
+    profile picture may still be another user's picture or a community
+    post's photo (the two places those URLs are stored).
+
+    Args:
+        url (str): The stored URL, e.g. 'images/uploads/<sha256>.png'.
+
+    Returns:
+        bool: True if any user or community post still points at it.
+    """
+    return db.session.query(or_(
+        exists().where(User.profile_picture == url),
+        exists().where(CommunityPost.photo_url == url)
+    )).scalar()
+
+
+# Small pool for fire-and-forget file removals (old photos etc.)
+_DELETE_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix='upload-delete')
+
+
+def _unlink_quiet(path):
+    """Removes a file, ignoring a missing file or any OS error."""
+    try:
+        Path(path).unlink(missing_ok=True)
+    except OSError:
+        pass
+
+
+def delete_upload_async(path):
+    """
+    Schedules an uploaded file for removal on a background thread.
+
+    The request returns without waiting on the unlink syscall (slow on
+    networked storage). Call it after the DB commit that stops referencing
+    the file.
+
+    Args:
+        path (str): Absolute path of the file to delete.
+    """
+    _DELETE_POOL.submit(_unlink_quiet, path)
+
+
+def release_upload(url):
+    """
+    Deletes a replaced upload in the background once nothing references it.
+
+    Call after the commit that switched to the new file. The default avatar
+    and files still in use elsewhere (see upload_in_use) are kept.
+
+    Args:
+        url (str): The old stored URL, e.g. 'images/uploads/<sha256>.png'.
+    """
+    if not url or 'default-avatar' in url or upload_in_use(url):
+        return
+    delete_upload_async(os.path.join(current_app.config['UPLOAD_FOLDER'], os.path.basename(url)))
+
+
+# Characters that make an UNKIND_WORDS entry a shell-style glob pattern
+_GLOB_CHARS = frozenset('*?[')
+# Splits a message into words for glob matching (punctuation dropped)
+_WORD_RE = re.compile(r"[\w']+")
+
+
+def _is_glob(pattern):
+    """Cheap check for glob syntax, so plain words skip fnmatch entirely."""
+    return not _GLOB_CHARS.isdisjoint(pattern)
+
+
+def build_unkind_automaton(words):
+    """
+    Builds an Aho-Corasick automaton over the lower-cased plain unkind words.
+
+    Built once at app startup and stored on app.extensions['unkind_ac'], so
+    flagging a message is a single linear C-level scan instead of one Python
+    substring search per word. If pyahocorasick is not installed, falls back
+    to one precompiled alternation regex (longest words first), which is
+    still a single pass over the message. Glob entries (e.g. 'stup*d') are
+    left to build_unkind_glob_matcher.
+
+    Args:
+        words (list): Unkind words from config.
+
+    Returns:
+        ahocorasick.Automaton | re.Pattern | None: The matcher, or None if no words.
+    """
+    lowered = sorted({word.lower() for word in words if not _is_glob(word)}, key=len, reverse=True)
+    if not lowered:
+        return None
+
+    try:
+        import ahocorasick
+    except ImportError:
+        return re.compile('|'.join(map(re.escape, lowered)))
+
+    automaton = ahocorasick.Automaton()
+    for word in lowered:
+        automaton.add_word(word, word)
+    automaton.make_automaton()
+    return automaton
+
+
+def build_unkind_glob_matcher(words):
+    """
+    Compiles the glob-style unkind patterns into one regex, matched per word.
+
+    Only entries containing '*', '?' or '[' end up here; with today's plain
+    word list this returns None and message checks never touch fnmatch.
+
+    Args:
+        words (list): Unkind words from config.
+
+    Returns:
+        re.Pattern | None: Combined fnmatch regex, or None if there are no globs.
+    """
+    globs = sorted({word.lower() for word in words if _is_glob(word)})
+    if not globs:
+        return None
+    return re.compile('|'.join(fnmatch.translate(glob) for glob in globs))
+
+
+def contains_unkind_words(text):
+    """
+    Checks whether text contains any unkind word (case-insensitive substring)
+    or any word matching an unkind glob pattern.
+
+    Args:
+        text (str): The message to check.
+
+    Returns:
+        bool: True if at least one unkind word appears in the text.
+    """
+    if not text:
+        return False
+
+    # Lower once; the matchers stop at the first hit
+    lowered = text.lower()
+    matcher = current_app.extensions.get('unkind_ac')
+    if matcher is not None:
+        if isinstance(matcher, re.Pattern):
+            if matcher.search(lowered) is not None:
+                return True
+        elif next(matcher.iter(lowered), None) is not None:
+            return True
+
+    globs = current_app.extensions.get('unkind_globs')
+    if globs is not None:
+        return any(globs.match(word) for word in _WORD_RE.findall(lowered))
+    return False
+
+
+# ==================== NOTIFICATIONS ====================
+def queue_notification(**fields):
+    """
+    Queues a Notification to be written with the request's next commit.
+
+    Queued notifications are added to the session just before it commits
+    (see app.py), so they land atomically with whatever the route commits
+    next and several of them go out as one multi-row INSERT. Anything still
+    queued when the request finishes is committed in an after_request hook.
+
+    Args:
+        **fields: Notification column values (user_id, title, message, ...).
+    """
+    g.setdefault('queued_notifications', []).append(fields)
+
+
+# ==================== BADGES ====================
+# Icon shown for each badge type on profiles (unknown types get a medal)
+BADGE_ICONS = {
+    'First Steps': '🌟', 'Story Keeper': '📖', 'Tech Wizard': '💻',
+    'Game Master': '🎮', 'Community Builder': '🏘️', 'Event Organizer': '📅',
+    'Heritage Champion': '🏛️', 'Conversation Partner': '💬',
+    'Week Warrior': '🔥', 'Month Master': '🏆', 'Century Champion': '💯', 'Year Legend': '👑'
+}
+
+
+# ==================== CONVERSATION CACHING ====================
+# chat.js polls /api/messages every few seconds. Each conversation (an
+# unordered pair of user ids) has a version token that every new message
+# replaces; the poll payload is cached under that token and doubles as the
+# ETag, so an unchanged poll is a cache hit or a bodiless 304.
+
+def _conversation_version_key(user_a, user_b):
+    """Builds the cache key holding a conversation's version token."""
+    low, high = sorted((user_a, user_b))
+    return f'msgs:version:{low}:{high}'
+
+
+def get_conversation_version(user_a, user_b):
+    """
+    Returns the current version token for the conversation between two users.
+
+    A fresh token (nanosecond timestamp) is minted if none is cached, so a
+    token is never reused after an eviction or expiry and old ETags can't
+    match. Tokens live for CONVERSATION_VERSION_TIMEOUT (see config.py).
+    """
+    key = _conversation_version_key(user_a, user_b)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        cache.set(key, version, timeout=current_app.config['CONVERSATION_VERSION_TIMEOUT'])
+    return version
+
+
+def invalidate_conversation_cache(user_a, user_b):
+    """Drops cached polls for a conversation. Call after saving a Message."""
+    cache.set(_conversation_version_key(user_a, user_b), time.time_ns(),
+              timeout=current_app.config['CONVERSATION_VERSION_TIMEOUT'])
+
+
+def message_poll_response(user_id, buddy_id):
+    """
+    Builds the /api/messages response for a conversation (shared by the youth
+    and senior blueprints).
+
+    Cursor: chat.js sends the highest id it has rendered as ?after_id=, so a
+    poll only returns newer messages instead of the whole history again.
+    Timestamps go out as ISO strings (orjson encodes datetimes natively) and
+    chat.js formats them; strftime per row is only paid when a client
+    explicitly asks for display strings with ?fmt=display.
+
+    Returns:
+        Response: The JSON payload with its ETag, or a bodiless 304.
+    """
+    after_id = request.args.get('after_id', 0, type=int)
+    display = request.args.get('fmt') == 'display'
+
+    # The conversation's version token keys the cached payload and is the
+    # ETag: an unchanged poll is answered with a 304 or straight from the
+    # cache without touching the database.
+    etag = f"{user_id}-{get_conversation_version(user_id, buddy_id)}-{after_id}-{int(display)}"
+    if etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+
+    cache_key = f'msgs:{etag}'
+    payload = cache.get(cache_key)
+    if payload is None:
+        # Ordered by id (insertion order) to show conversation history.
+        # A Core select of just the serialized columns returns plain row tuples,
+        # so no ORM objects are hydrated and no lazy load can fire per row.
+        query = conversation_select(
+            user_id, buddy_id,
+            Message.id, Message.content, Message.sender_id, Message.created_at,
+            Message.is_flagged, Message.original_language,
+            after_id=after_id
+        ).order_by('id')
+        if after_id:
+            query = query.limit(current_app.config['MESSAGES_PER_POLL'])
+        rows = db.session.execute(query).all()
+        translations = get_message_translations((row.id, row.original_language) for row in rows)
+
+        # Build the JSON-serializable dicts straight from the row tuples
+        messages_data = [{
+            'id': msg_id,
+            'content': content,
+            'sender_id': sender_id,
+            'is_me': sender_id == user_id,
+            'created_at': (created_at + SG_OFFSET).strftime(CHAT_TIME_FORMAT) if display else created_at,
+            'is_flagged': is_flagged,
+            'translated_content': translations.get(msg_id)
+        } for msg_id, content, sender_id, created_at, is_flagged, original_language in rows]
+
+        # orjson encodes in C - noticeably faster than the stdlib encoder on long chats
+        payload = orjson.dumps({'messages': messages_data})
+        cache.set(cache_key, payload, timeout=60)
+
+    response = current_app.response_class(payload, mimetype='application/json')
+    response.set_etag(etag)
+    # Let the browser keep the body but revalidate it on every poll
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def get_message_translations(messages, lang=None):
+    """
+    Looks up stored translations for a page of chat messages.
+
+    Only messages written in another language can have one, so a
+    conversation entirely in the target language costs no query; otherwise
+    it is one primary-key lookup per translated message, in a single SELECT.
+
+    Args:
+        messages: (message_id, original_language) pairs.
+        lang (str): Target language code (defaults to DEFAULT_LANGUAGE).
+
+    Returns:
+        dict: message_id -> translated text, for messages that have one.
+    """
+    lang = lang or Config.DEFAULT_LANGUAGE
+    ids = [message_id for message_id, original_language in messages
+           if original_language != lang]
+    if not ids:
+        return {}
+    return dict(db.session.execute(
+        db.select(MessageTranslation.message_id, MessageTranslation.content)
+        .where(MessageTranslation.lang == lang, MessageTranslation.message_id.in_(ids))
+    ).all())
+
+
+# ==================== STORY CACHING ====================
+# Story lists are the same for every viewer, so they are cached as plain
+# dicts for a short TTL. Keys carry a version number that any story write
+# bumps, which drops every cached variant (each category/role filter) at once.
+
+def _story_cache_key(name):
+    """Builds a versioned cache key for a story list."""
+    version = cache.get('stories:version') or 0
+    return f'stories:{version}:{name}'
+
+
+def invalidate_story_cache():
+    """Drops all cached story lists. Call after any story/reaction/comment write."""
+    cache.set('stories:version', (cache.get('stories:version') or 0) + 1, timeout=0)
+
+
+def get_story_engagement(stories):
+    """
+    Per-story reaction counts by type plus comment counts for a list page.
+
+    Reaction counts are unpacked from Story.reaction_counts; comments come
+    from one grouped query for the whole page instead of a COUNT per story
+    in the template (Story.comments is lazy='raise').
+
+    Returns:
+        dict: story_id -> {'heart': n, 'smile': n, 'clap': n, 'comments': n}
+    """
+    engagement = {}
+    for story in stories:
+        counts = {reaction_type: story.reaction_count(reaction_type)
+                  for reaction_type in story.REACTION_TYPES}
+        counts['comments'] = 0
+        engagement[story.id] = counts
+
+    story_ids = list(engagement)
+    if story_ids:
+        for story_id, count in (
+            db.session.query(StoryComment.story_id, func.count(StoryComment.id))
+            .filter(StoryComment.story_id.in_(story_ids))
+            .group_by(StoryComment.story_id)
+        ):
+            engagement[story_id]['comments'] = count
+    return engagement
+
+
+def _serialize_stories(stories):
+    """
+    Converts stories to template-ready dicts with author info and counts.
+
+    Reaction and heart counts are read from the packed Story.reaction_counts;
+    comment counts come from get_story_engagement's grouped query over the
+    whole page of stories rather than per-story COUNTs in the template.
+    """
+    engagement = get_story_engagement(stories)
+
+    return [{
+        **story.as_dict(),
+        'user': story.user.as_dict(),
+        'reaction_count': story.total_reactions,
+        'heart_count': engagement[story.id]['heart'],
+        'comment_count': engagement[story.id]['comments']
+    } for story in stories]
+
+
+def get_recent_stories(limit=10):
+    """
+    Returns the newest stories (as dicts), cached for a short TTL.
+
+    Args:
+        limit (int): Number of stories to return.
+
+    Returns:
+        list: Story dicts, newest first.
+    """
+    key = _story_cache_key(f'recent_{limit}')
+    stories = cache.get(key)
+    if stories is None:
+        stories = _serialize_stories(
+            Story.query.options(joinedload(Story.user))
+            .order_by(Story.created_at.desc()).limit(limit).all()
+        )
+        cache.set(key, stories)
+    return stories
+
+
+def get_user_stories(user_id, limit=5):
+    """
+    Returns a user's own newest stories (as dicts), cached for a short TTL.
+
+    Args:
+        user_id (int): Author of the stories.
+        limit (int): Number of stories to return.
+
+    Returns:
+        list: Story dicts, newest first.
+    """
+    key = _story_cache_key(f'user_{user_id}_{limit}')
+    stories = cache.get(key)
+    if stories is None:
+        stories = _serialize_stories(
+            Story.query.options(joinedload(Story.user)).filter_by(user_id=user_id)
+            .order_by(Story.created_at.desc()).limit(limit).all()
+        )
+        cache.set(key, stories)
+    return stories
+
+
+def get_story_feed(category='all', role='all', before=None):
+    """
+    Returns one page of the story feed (as dicts) for a category/author-role
+    filter, cached.
+
+    Pages use a keyset cursor on (created_at, id) rather than OFFSET, so each
+    page is an index range scan that stops at the LIMIT no matter how deep
+    the reader has scrolled.
+
+    Args:
+        category (str): Story category, or 'all'.
+        role (str): Author role, or 'all'.
+        before (int): Id of the last story on the previous page (None = newest).
+
+    Returns:
+        list: Story dicts, newest first (at most STORY_FEED_LIMIT).
+    """
+    key = _story_cache_key(f'feed_{category}_{role}_{before}')
+    stories = cache.get(key)
+    if stories is None:
+        # Query stories with user join for role filtering. Category goes
+        # first so the planner can walk ix_story_cat_created backwards and
+        # stop at the LIMIT.
+        query = Story.query.join(User).options(contains_eager(Story.user))
+        if category != 'all':
+            query = query.filter(Story.category == category)
+        if role != 'all':
+            query = query.filter(User.role == role)
+        if before is not None:
+            # Everything strictly older than the cursor story (id breaks ties)
+            cursor = aliased(Story)
+            cursor_created = select(cursor.created_at).where(cursor.id == before).scalar_subquery()
+            query = query.filter(or_(
+                Story.created_at < cursor_created,
+                and_(Story.created_at == cursor_created, Story.id < before)
+            ))
+        stories = _serialize_stories(
+            query.order_by(Story.created_at.desc(), Story.id.desc())
+            .limit(current_app.config.get('STORY_FEED_LIMIT', 20)).all()
+        )
+        cache.set(key, stories)
+    return stories
+
+
+# ==================== GAMES ====================
+# Game page endpoint per Game.kind, the same name in both blueprints
+# (e.g. 'youth.chess_game' and 'senior.chess_game')
+GAME_PAGES = {
+    'chess': 'chess_game',
+    'xiangqi': 'xiangqi_game',
+    'tictactoe': 'tictactoe_game',
+}
+
+
+def get_game_session_or_404(session_id):
+    """
+    get_or_404 for a game session with both players JOINed into the same
+    SELECT, so session.player1 / session.player2 need no further queries.
+    session.get checks the identity map first, so a session already loaded
+    in this request costs no SQL at all.
+    """
+    return db.session.get(
+        GameSession, session_id,
+        options=[joinedload(GameSession.player1), joinedload(GameSession.player2)]
+    ) or abort(404)
+
+
+# ==================== GAME CACHING ====================
+# Game rows are reference data (seeded once, never edited in the app), so the
+# challenge route reads title/kind from the cache instead of SELECTing every press.
+
+@cache.memoize(timeout=3600)
+def get_game_summary(game_id):
+    """
+    Returns a game's (title, kind), or None if the game doesn't exist.
+    Missing games aren't memoized, so a game added later is picked up.
+    """
+    row = db.session.execute(
+        db.select(Game.title, Game.kind).where(Game.id == game_id)
+    ).first()
+    return tuple(row) if row else None
+
+
+def invalidate_game_cache(game_id):
+    """Drops a memoized game summary. Call after editing or deleting a Game."""
+    cache.delete_memoized(get_game_summary, game_id)
+
+
+# ==================== TOGGLES ====================
+# The join/register/react toggles behind both blueprints' JSON endpoints.
+# Each returns the route's response.
+
+def toggle_event_registration(event_id, user_id):
+    """
+    Registers the user for an event, or unregisters them if already registered.
+
+    Returns:
+        dict | tuple: The JSON response, with a 400 when the event is full.
+    """
+    # 404 guard - only the primary key is loaded
+    if not db.session.get(Event, event_id, options=[load_only(Event.id)]):
+        abort(404)
+
+    # Unregister if already registered (one DELETE; rowcount says whether it was)
+    unregistered = db.session.execute(
+        delete(EventParticipant)
+        .where(EventParticipant.event_id == event_id, EventParticipant.user_id == user_id)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+    if unregistered:
+        status = 'unregistered'
+    else:
+        # Register only while there is room: the capacity check and the
+        # INSERT are one statement, so two concurrent requests can't both
+        # see a free spot and over-book. The (event_id, user_id) primary
+        # key makes a double-click a no-op.
+        taken = select(func.count(EventParticipant.user_id))\
+            .where(EventParticipant.event_id == event_id).scalar_subquery()
+        capacity = select(Event.capacity).where(Event.id == event_id).scalar_subquery()
+        inserted = db.session.execute(
+            sqlite_insert(EventParticipant).from_select(
+                ['event_id', 'user_id', 'registered_at'],
+                select(literal(event_id), literal(user_id), literal(datetime.utcnow()))
+                .where(or_(capacity.is_(None), taken < capacity))
+            ).on_conflict_do_nothing()
+        ).rowcount
+        if not inserted:
+            db.session.rollback()
+            return {'success': False, 'message': 'Event is full'}, 400
+        status = 'registered'
+
+    db.session.commit()
+
+    participant_count = db.session.query(func.count(EventParticipant.user_id))\
+        .filter_by(event_id=event_id).scalar()
+
+    return {
+        'success': True,
+        'status': status,
+        'participant_count': participant_count
+    }
+
+
+def toggle_community_membership(community_id, user_id):
+    """
+    Joins a community, or leaves it if the user is already a member.
+
+    Joining is a single INSERT ... ON CONFLICT DO NOTHING RETURNING; if no row
+    comes back the user was already a member, so the toggle becomes a leave.
+    member_count is adjusted in SQL (member_count + 1 / - 1) rather than read
+    and rewritten in Python, so concurrent joins can't lose an increment.
+
+    Returns:
+        dict: The JSON response.
+    """
+    # 404 guard only - the counter itself is read back from the UPDATE below
+    if not db.session.get(Community, community_id, options=[load_only(Community.id)]):
+        abort(404)
+
+    # Try to join - the (community_id, user_id) primary key decides
+    joined = db.session.execute(
+        sqlite_insert(CommunityMember)
+        .values(community_id=community_id, user_id=user_id)
+        .on_conflict_do_nothing()
+        .returning(CommunityMember.user_id)
+    ).scalar()
+
+    if joined:
+        delta = Community.member_count + 1
+        status = 'joined'
+    else:
+        # Already a member - leave community
+        CommunityMember.query.filter_by(
+            community_id=community_id,
+            user_id=user_id
+        ).delete(synchronize_session=False)
+        delta = func.max(Community.member_count - 1, 0)
+        status = 'left'
+
+    member_count = db.session.execute(
+        update(Community)
+        .where(Community.id == community_id)
+        .values(member_count=delta)
+        .returning(Community.member_count)
+    ).scalar()
+
+    db.session.commit()
+
+    return {
+        'success': True,
+        'status': status,
+        'member_count': member_count
+    }
+
+
+def toggle_story_reaction(story_id, user_id, reaction_type):
+    """
+    Adds, switches or removes (same type again) the user's reaction to a story.
+
+    Returns:
+        dict | tuple: The JSON response, with a 400 for a missing or unknown type.
+    """
+    if not reaction_type:
+        return {'success': False, 'message': 'Missing reaction type'}, 400
+    if reaction_type not in Story.REACTION_TYPES:
+        return {'success': False, 'message': 'Unknown reaction type'}, 400
+
+    # 404 guard before any write - the reaction INSERT would otherwise hit
+    # the story_id foreign key
+    if not db.session.get(Story, story_id, options=[load_only(Story.id)]):
+        abort(404)
+
+    # Resolve the toggle in SQL with RETURNING instead of loading the row.
+    # The user's existing reaction (if any) is deleted first:
+    #   it was the same type     -> that's the toggle off
+    #   it was a different type  -> INSERT the new one (switch)
+    #   there was none           -> INSERT the new one (add)
+    mine = (StoryReaction.story_id == story_id) & (StoryReaction.user_id == user_id)
+
+    old_types = db.session.scalars(
+        delete(StoryReaction).where(mine).returning(StoryReaction.reaction_type)
+    ).all()
+    delta = -sum(Story.reaction_delta(old_type) for old_type in old_types)
+
+    if reaction_type in old_types:
+        # Toggle off (remove reaction)
+        action = 'removed'
+    else:
+        db.session.execute(
+            sqlite_insert(StoryReaction)
+            .values(story_id=story_id, user_id=user_id, reaction_type=reaction_type)
+            .on_conflict_do_nothing()
+        )
+        delta += Story.reaction_delta(reaction_type)
+        # Change reaction type, or create a new one
+        action = 'updated' if old_types else 'added'
+
+    # Apply the change to the packed counters in SQL and read them back
+    packed = db.session.execute(
+        update(Story)
+        .where(Story.id == story_id)
+        .values(reaction_counts=func.coalesce(Story.reaction_counts, 0) + delta)
+        .returning(Story.reaction_counts)
+    ).scalar()
+    if packed is None:
+        db.session.rollback()
+        abort(404)
+    count = Story.unpack_reaction_count(packed, reaction_type)
+
+    db.session.commit()
+    invalidate_story_cache()
+
+    return {
+        'success': True,
+        'action': action,
+        'count': count
+    }
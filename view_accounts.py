@@ -10,34 +10,32 @@ db_path = os.path.join(os.path.dirname(__file__), 'database.db')
 conn = sqlite3.connect(db_path)
 cursor = conn.cursor()
 
-# Get table structure
+# Get table structure. The password hash is never displayed, so it is left
+# out of the query instead of being read for every row and then hidden.
 cursor.execute('PRAGMA table_info(users)')
-columns = cursor.fetchall()
+columns = [col[1] for col in cursor.fetchall() if col[1] != 'password_hash']
 
 print("=" * 80)
 print("GENCON SG - USER ACCOUNTS")
 print("=" * 80)
 
-# Get all users
-cursor.execute('SELECT * FROM users')
-users = cursor.fetchall()
-
-print(f"\nTotal Accounts: {len(users)}\n")
-
-if users:
-    for user in users:
-        print("-" * 80)
-        for i, col in enumerate(columns):
-            col_name = col[1]
-            value = user[i]
-
-            # Don't display password hash for security
-            if col_name == 'password_hash':
-                value = '[HIDDEN]'
-
-            print(f"{col_name:20s}: {value}")
-        print("-" * 80)
-        print()
+cursor.execute('SELECT COUNT(*) FROM users')
+total = cursor.fetchone()[0]
+
+print(f"\nTotal Accounts: {total}\n")
+
+if total:
+    # Explicit column list, and rows are printed as the cursor yields them
+    # rather than fetching every account into a list first
+    cursor.execute(f'SELECT {", ".join(columns)} FROM users')
+    # Labels are padded once; each row is zipped against them and its whole
+    # block printed in one write instead of one print per column
+    labels = [f"{col_name:20s}: " for col_name in columns]
+    separator = "-" * 80
+    hidden = f"{'password_hash':20s}: [HIDDEN]"
+    for user in cursor:
+        fields = "\n".join(label + str(value) for label, value in zip(labels, user))
+        print(f"{separator}\n{fields}\n{hidden}\n{separator}\n")
 else:
     print("No accounts found in database.\n")
 